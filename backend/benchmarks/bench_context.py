@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from generator.context_packer import pack_context
+from generator.generate_readme import _format_context
+from generator.retrieval import mmr_select
+from services.chunk_features import compute_chunk_features
+
+
+@pytest.fixture(scope="module")
+def indexed_chunks(chunks):
+    # Same shape as search results: features were stored at index time
+    out = []
+    for i, c in enumerate(chunks):
+        metadata = dict(c["metadata"], features=compute_chunk_features(c["file_path"], c["content"]))
+        out.append(dict(c, metadata=metadata, similarity=1.0 - i / (2 * len(chunks))))
+    return out
+
+
+@pytest.mark.benchmark(group="context")
+def bench_format_context(benchmark, indexed_chunks):
+    context = benchmark(_format_context, indexed_chunks)
+    assert context
+
+
+@pytest.mark.benchmark(group="context")
+def bench_pack_context(benchmark, indexed_chunks):
+    packed = benchmark(pack_context, indexed_chunks)
+    assert packed
+
+
+@pytest.mark.benchmark(group="context")
+def bench_compute_chunk_features(benchmark, chunks):
+    benchmark(lambda: [compute_chunk_features(c["file_path"], c["content"]) for c in chunks])
+
+
+@pytest.mark.benchmark(group="context")
+def bench_mmr_select(benchmark, chunks):
+    rng = np.random.RandomState(0)
+    candidates = [dict(c, similarity=float(s), embedding=rng.rand(384).tolist()) for c, s in zip(chunks, rng.rand(len(chunks)))]
+    selected = benchmark(mmr_select, candidates, 80)
+    assert len(selected) == min(80, len(candidates))
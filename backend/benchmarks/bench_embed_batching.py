@@ -0,0 +1,48 @@
+"""
+Micro-batched vs. direct local embedding under concurrent single-query load.
+
+Each round fires `concurrency` concurrent one-text embed calls (what concurrent
+/search_chunks requests do) and records per-call latency; extra_info has the
+throughput and latency percentiles. Compare `direct` and `batched` per concurrency.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from fakes import MatmulEmbedder
+from services.embed_batcher import EmbeddingBatcher
+
+QUERIES = [f"how does module {i} compute the total of items {i % 7}" for i in range(256)]
+
+
+@pytest.fixture(scope="module")
+def embedder():
+    return MatmulEmbedder()
+
+
+@pytest.mark.benchmark(group="embed_batching")
+@pytest.mark.parametrize("concurrency", [1, 16, 64])
+@pytest.mark.parametrize("mode", ["direct", "batched"])
+def bench_embed_concurrent_queries(benchmark, embedder, concurrency, mode):
+    batcher = EmbeddingBatcher(embedder.embed_texts, max_batch_size=64, max_wait_ms=2)
+    latencies = []
+
+    async def one(text):
+        start = time.perf_counter()
+        if mode == "batched":
+            await batcher.embed([text])
+        else:
+            await asyncio.to_thread(embedder.embed_texts, [text])
+        latencies.append(time.perf_counter() - start)
+
+    async def burst():
+        await asyncio.gather(*(one(QUERIES[i % len(QUERIES)]) for i in range(concurrency)))
+
+    benchmark.pedantic(lambda: asyncio.run(burst()), rounds=20, iterations=1, warmup_rounds=2)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    benchmark.extra_info["texts_per_sec"] = concurrency / benchmark.stats.stats.mean
+    benchmark.extra_info["latency_p50_ms"] = float(p50) * 1000
+    benchmark.extra_info["latency_p99_ms"] = float(p99) * 1000
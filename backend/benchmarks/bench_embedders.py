@@ -0,0 +1,48 @@
+import pytest
+
+
+def _texts(chunks, n=200):
+    return [c["content"] for c in chunks[:n]]
+
+
+@pytest.mark.benchmark(group="embed_texts")
+def bench_embed_tfidf(benchmark, chunks):
+    from services.tfidf_client import TFIDFEmbeddingClient
+
+    client = TFIDFEmbeddingClient()
+    texts = _texts(chunks)
+    client.embed_texts(texts)  # fit once; the benchmark measures steady-state embedding
+    vectors = benchmark(client.embed_texts, texts)
+    assert len(vectors) == len(texts)
+
+
+@pytest.mark.benchmark(group="embed_texts")
+def bench_embed_nn(benchmark, chunks):
+    from services.simple_nn_client import SimpleNNEmbeddingClient
+
+    client = SimpleNNEmbeddingClient(embedding_dim=128)
+    texts = _texts(chunks)
+    client.embed_texts(texts)
+    vectors = benchmark(client.embed_texts, texts)
+    assert len(vectors) == len(texts)
+
+
+@pytest.mark.benchmark(group="embed_texts")
+def bench_embed_hf_local(benchmark, chunks, monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    import services.hf_client as hf_client
+
+    monkeypatch.setattr(hf_client, "HF_USE_INFERENCE", False)
+    client = hf_client.HuggingFaceEmbeddingClient()
+    texts = _texts(chunks, 64)
+    vectors = benchmark(client.embed_texts, texts)
+    assert len(vectors) == len(texts)
+
+
+@pytest.mark.benchmark(group="embed_query")
+def bench_embed_single_query_tfidf(benchmark, chunks):
+    from services.tfidf_client import TFIDFEmbeddingClient
+
+    client = TFIDFEmbeddingClient()
+    client.embed_texts(_texts(chunks))
+    benchmark(client.embed_texts, ["overview architecture setup usage api"])
@@ -0,0 +1,63 @@
+"""
+README generation without a model: the extractive draft, and single-prompt vs.
+section-parallel generation against a fake model whose latency grows with the
+length of its answer (as decoding does).
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from generator.draft import DraftReadmeClient, build_draft_readme
+from generator.generate_readme import generate_readme_markdown
+from generator.sections import generate_readme_sections
+from services.chunk_features import compute_chunk_features
+from synthetic_repo import synthetic_chunks
+
+# Fake decode speed, ~100x a real model's so the benchmark stays short
+DECODE_CHARS_PER_SEC = 20_000
+
+
+class DecodingClient(DraftReadmeClient):
+    """DraftReadmeClient that takes as long as a model would to write its answer."""
+
+    def __init__(self, chars_per_sec: float = DECODE_CHARS_PER_SEC) -> None:
+        self.chars_per_sec = chars_per_sec
+
+    def generate_markdown(self, system_prompt: str, user_prompt: str) -> str:
+        answer = super().generate_markdown(system_prompt, user_prompt)
+        time.sleep(len(answer) / self.chars_per_sec)
+        return answer
+
+
+@pytest.mark.benchmark(group="generate")
+@pytest.mark.parametrize("files", [500, 5000])
+def bench_draft_readme(benchmark, files):
+    chunks = synthetic_chunks(files)
+    markdown = benchmark(build_draft_readme, "https://example.com/bench/repo", chunks)
+    assert "## Project Structure" in markdown
+    benchmark.extra_info["megabytes"] = sum(len(c["content"]) for c in chunks) / 1e6
+
+
+@pytest.fixture(scope="module")
+def indexed_chunks(chunks):
+    # Features are stored at index time, as in search results
+    return [dict(c, metadata=dict(c["metadata"], features=compute_chunk_features(c["file_path"], c["content"]))) for c in chunks]
+
+
+@pytest.mark.benchmark(group="generate")
+@pytest.mark.parametrize("mode", ["single", "sections"])
+def bench_generate_readme(benchmark, indexed_chunks, mode):
+    client = DecodingClient()
+    generate = generate_readme_markdown if mode == "single" else generate_readme_sections
+
+    async def run():
+        # As in the API (BLOCKING_THREADS): enough threads for every concurrent model call
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=16))
+        return await generate(client, "https://example.com/bench/repo", indexed_chunks)
+
+    markdown = benchmark.pedantic(lambda: asyncio.run(run()), rounds=5, iterations=1, warmup_rounds=1)
+    assert markdown.startswith("# ")
+    benchmark.extra_info["readme_chars"] = len(markdown)
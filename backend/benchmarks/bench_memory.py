@@ -0,0 +1,106 @@
+"""
+Peak memory of parse + index: compact chunks with batched indexing vs. chunk dicts indexed in one go.
+
+Each mode runs in a fresh interpreter (peak RSS only ever grows) against the
+same synthetic checkout, with a local matmul embedder and a Supabase stand-in
+that serialises rows and drops them, so only the indexer's own memory counts.
+The peaks land in the saved results' extra_info:
+    BENCH_MEMORY_FILES=5000 pytest benchmarks/bench_memory.py
+
+Run directly to measure one mode: python benchmarks/bench_memory.py <checkout>
+"""
+
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+
+import pytest
+
+BENCH_MEMORY_FILES = int(os.getenv("BENCH_MEMORY_FILES", "2000"))
+# ~15 KB per file: a 30 MB checkout at the default size
+BENCH_MEMORY_FUNCTIONS = int(os.getenv("BENCH_MEMORY_FUNCTIONS", "60"))
+
+MODES = {
+    "dicts": {"COMPACT_CHUNKS": "false", "INDEX_BATCH_SIZE": str(10**9)},
+    "compact": {"COMPACT_CHUNKS": "true"},
+}
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss survives fork + exec, so it would report the benchmark runner's peak
+    try:
+        return _status_kb("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _rss_kb() -> int:
+    try:
+        return _status_kb("VmRSS")
+    except OSError:
+        return _peak_rss_kb()
+
+
+def measure(checkout: str) -> dict:
+    """Parse and index `checkout` in this process; RSS in KiB before, and the peak."""
+    import asyncio
+
+    from fakes import MatmulEmbedder, SinkSupabaseClient
+    from parser.extract_code import extract_repository_chunks
+    from services.embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(embedder=MatmulEmbedder(), supabase=SinkSupabaseClient())
+    before = _rss_kb()
+
+    async def run() -> int:
+        graph: dict = {}
+        chunks = extract_repository_chunks(checkout, "https://example.com/bench/memory", None, False, None, graph)
+        await store.index_chunks(chunks, symbol_graph=graph)
+        return len(chunks)
+
+    count = asyncio.run(run())
+    return {"chunks": count, "rows": store.supabase.inserted, "baseline_kb": before, "peak_kb": _peak_rss_kb()}
+
+
+@pytest.fixture(scope="module")
+def memory_checkout(tmp_path_factory) -> str:
+    from synthetic_repo import generate_repo
+
+    path = str(tmp_path_factory.mktemp("memory_repo"))
+    return generate_repo(path, files=BENCH_MEMORY_FILES, functions_per_file=BENCH_MEMORY_FUNCTIONS, git=False)
+
+
+@pytest.mark.benchmark(group="index_memory")
+@pytest.mark.parametrize("mode", list(MODES))
+def bench_index_memory(benchmark, memory_checkout, mode):
+    env = dict(os.environ, EMBEDDING_CACHE_ENABLED="false", EMBED_MICRO_BATCH="false", **MODES[mode])
+    script = str(pathlib.Path(__file__).resolve())
+
+    def run() -> dict:
+        out = subprocess.run(
+            [sys.executable, script, memory_checkout], env=env, check=True, capture_output=True, text=True
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    result = benchmark.pedantic(run, rounds=1, iterations=1)
+    source_mb = sum(p.stat().st_size for p in pathlib.Path(memory_checkout).rglob("*") if p.is_file()) / 2**20
+    benchmark.extra_info.update(result, source_mb=round(source_mb, 1))
+    benchmark.extra_info["indexing_mb"] = round((result["peak_kb"] - result["baseline_kb"]) / 1024, 1)
+    assert result["rows"] == result["chunks"] > 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+    print(json.dumps(measure(sys.argv[1])))
@@ -0,0 +1,14 @@
+import asyncio
+
+import pytest
+
+from parser.extract_code import parse_repository
+
+
+@pytest.mark.benchmark(group="parse_repository")
+@pytest.mark.parametrize("sparse", [True, False], ids=["sparse", "full"])
+def bench_parse_repository(benchmark, synthetic_repo_url, sparse):
+    chunks = benchmark.pedantic(
+        lambda: asyncio.run(parse_repository(synthetic_repo_url, sparse=sparse)), rounds=3, iterations=1
+    )
+    assert chunks
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from fakes import InMemorySupabaseClient
+from services.embedding_store import EmbeddingStore
+from services.tfidf_client import TFIDFEmbeddingClient
+
+
+@pytest.fixture(scope="module")
+def store(chunks):
+    store = EmbeddingStore(embedder=TFIDFEmbeddingClient(), supabase=InMemorySupabaseClient())
+    asyncio.run(store.index_chunks(chunks))
+    return store
+
+
+@pytest.mark.benchmark(group="search_chunks")
+@pytest.mark.parametrize("top_k", [20, 80])
+@pytest.mark.parametrize("cached", [False, True], ids=["cold", "cached"])
+def bench_search_chunks(benchmark, store, chunks, top_k, cached):
+    repo_url = chunks[0]["repo_url"]
+
+    def run():
+        if not cached:
+            store._query_embeddings.clear()
+            store._search_results.clear()
+        return asyncio.run(store.search_chunks(repo_url, "compute total over the given items", top_k=top_k))
+
+    results = benchmark(run)
+    assert results
+
+
+@pytest.mark.benchmark(group="index_chunks")
+def bench_index_chunks(benchmark, chunks):
+    def run():
+        store = EmbeddingStore(embedder=TFIDFEmbeddingClient(), supabase=InMemorySupabaseClient())
+        asyncio.run(store.index_chunks(chunks))
+
+    benchmark.pedantic(run, rounds=3, iterations=1)
+
+
+@pytest.fixture(scope="module")
+def search_payload(store, chunks):
+    results = asyncio.run(store.search_chunks(chunks[0]["repo_url"], "compute total over the given items", top_k=200))
+    return {"ok": True, "results": results}
+
+
+@pytest.mark.benchmark(group="search_response")
+@pytest.mark.parametrize("encoder", ["stdlib", "orjson", "orjson_gzip", "orjson_br"])
+def bench_search_response(benchmark, search_payload, encoder):
+    # What /search_chunks spends turning results into bytes on the wire
+    import gzip
+    import json
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+
+    from services.compression import BROTLI_QUALITY, GZIP_LEVEL
+
+    if encoder == "stdlib":
+        def run():
+            return json.dumps(jsonable_encoder(search_payload)).encode("utf-8")
+    elif encoder == "orjson":
+        def run():
+            return orjson.dumps(search_payload)
+    elif encoder == "orjson_gzip":
+        def run():
+            return gzip.compress(orjson.dumps(search_payload), compresslevel=GZIP_LEVEL)
+    else:
+        brotli = pytest.importorskip("brotli")
+
+        def run():
+            return brotli.compress(orjson.dumps(search_payload), quality=BROTLI_QUALITY)
+
+    body = benchmark(run)
+    benchmark.extra_info["bytes"] = len(body)
@@ -0,0 +1,25 @@
+import os
+import sys
+import pathlib
+
+import pytest
+
+# Benchmarks import the backend packages the same way main.py does
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+from synthetic_repo import generate_repo, synthetic_chunks  # noqa: E402
+
+# Scale knobs, e.g. BENCH_FILES=2000 pytest benchmarks
+BENCH_FILES = int(os.getenv("BENCH_FILES", "200"))
+BENCH_CHUNKS = int(os.getenv("BENCH_CHUNKS", "500"))
+
+
+@pytest.fixture(scope="session")
+def synthetic_repo_url(tmp_path_factory) -> str:
+    return generate_repo(str(tmp_path_factory.mktemp("synthetic_repo")), files=BENCH_FILES)
+
+
+@pytest.fixture(scope="session")
+def chunks():
+    return synthetic_chunks(BENCH_CHUNKS)
@@ -0,0 +1,251 @@
+"""
+Local HTTP stand-ins for the services the backend talks to, for load tests.
+
+- a PostgREST/RPC subset backing SupabaseClient (code_chunks, match_code_chunks, readme_history, repo_symbol_graphs)
+- an OpenAI-style chat-completions endpoint backing PerplexityClient
+- a git smart-HTTP host serving bare repositories, so /parse_repo can clone over http://
+
+Each server runs uvicorn on its own thread and event loop. Latency and error
+injection are configured per server with `Faults`.
+"""
+
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from fakes import DuplicateKeyError, InMemorySupabaseClient
+
+# supabase-py only checks that the key looks like a JWT
+FAKE_SUPABASE_KEY = "fake.loadtest.key"
+
+
+@dataclass
+class Faults:
+    """Per-request latency (base + uniform jitter) and injected error responses."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    async def apply(self) -> Optional[Response]:
+        delay = self.latency_ms + random.uniform(0.0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            return JSONResponse({"error": {"message": "injected failure"}}, status_code=self.error_status)
+        return None
+
+
+def create_fake_supabase(faults: Faults, store: Optional[InMemorySupabaseClient] = None) -> FastAPI:
+    # pgvector would drop rows under match_threshold; the fake always returns the
+    # nearest rows so that the response size (and generate load) stays stable
+    store = store if store is not None else InMemorySupabaseClient(match_threshold=-1.0)
+    app = FastAPI()
+
+    @app.post("/rest/v1/code_chunks")
+    async def insert_chunks(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        body = await request.json()
+        rows = body if isinstance(body, list) else [body]
+        store.insert_code_chunks(rows)
+        return JSONResponse([], status_code=201)
+
+    @app.delete("/rest/v1/code_chunks")
+    async def delete_chunks(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        params = request.query_params
+        repo_url = params.get("repo_url", "").removeprefix("eq.")
+        store.delete_index_run(repo_url, params.get("metadata->>index_run", "").removeprefix("eq."))
+        return JSONResponse([], status_code=200)
+
+    @app.get("/rest/v1/code_chunks")
+    async def select_chunks(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        params = request.query_params
+        repo_url = params.get("repo_url", "").removeprefix("eq.")
+        offset = int(params.get("offset", "0"))
+        limit = int(params.get("limit", "1000"))
+        rows = store.fetch_code_chunks(repo_url, limit=offset + limit)
+        return rows[offset:offset + limit]
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def match_code_chunks(function: str, request: Request):
+        if function not in {"match_code_chunks", "match_code_chunks_with_embeddings"}:
+            return JSONResponse({"message": f"function {function} not found"}, status_code=404)
+        error = await faults.apply()
+        if error is not None:
+            return error
+        body = await request.json()
+        return store.search_code_chunks(
+            body["repo_url_filter"], body["query_embedding"], body["match_count"],
+            include_embeddings=function == "match_code_chunks_with_embeddings",
+        )
+
+    @app.post("/rest/v1/repo_symbol_graphs")
+    async def upsert_graph(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        body = await request.json()
+        store.upsert_symbol_graph(body["repo_url"], body["graph"])
+        return JSONResponse([], status_code=201)
+
+    @app.post("/rest/v1/readme_history")
+    async def insert_history(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        body = await request.json()
+        try:
+            store.insert_readme_version(body)
+        except DuplicateKeyError as e:
+            return JSONResponse({"code": e.code, "message": str(e), "details": None, "hint": None}, status_code=409)
+        return JSONResponse([], status_code=201)
+
+    @app.get("/rest/v1/readme_history")
+    async def select_history(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        params = request.query_params
+        bounds: Dict[str, int] = {}
+        for value in params.getlist("version"):
+            op, _, number = value.partition(".")
+            bounds[op] = int(number)
+        limit = params.get("limit")
+        return store.fetch_readme_versions(
+            params.get("repo_url", "").removeprefix("eq."),
+            columns=params.get("select", "*"),
+            limit=int(limit) if limit else None,
+            min_version=bounds.get("gte"),
+            max_version=bounds.get("lte"),
+            descending=params.get("order", "version.desc") == "version.desc",
+        )
+
+    app.state.store = store
+    return app
+
+
+def create_fake_perplexity(faults: Faults) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        error = await faults.apply()
+        if error is not None:
+            return error
+        body = await request.json()
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        content = f"# Project\n\nGenerated from a {len(prompt)}-character prompt.\n\n## Usage\n\n```bash\nmake run\n```\n"
+        return {
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        }
+
+    return app
+
+
+def create_git_host(root: str) -> FastAPI:
+    """Serve bare repositories under `root` over git's smart HTTP protocol (via `git http-backend`)."""
+    app = FastAPI()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def git_http_backend(path: str, request: Request):
+        env = dict(
+            os.environ,
+            GIT_PROJECT_ROOT=root,
+            GIT_HTTP_EXPORT_ALL="1",
+            PATH_INFO="/" + path,
+            QUERY_STRING=request.url.query,
+            REQUEST_METHOD=request.method,
+            CONTENT_TYPE=request.headers.get("content-type", ""),
+            REMOTE_ADDR="127.0.0.1",
+        )
+        if "content-encoding" in request.headers:
+            env["HTTP_CONTENT_ENCODING"] = request.headers["content-encoding"]
+        if "git-protocol" in request.headers:
+            env["GIT_PROTOCOL"] = request.headers["git-protocol"]
+        body = await request.body()
+        proc = await asyncio.create_subprocess_exec(
+            "git", "http-backend", env=env,
+            stdin=asyncio.subprocess.PIPE if body else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await proc.communicate(body or None)
+        head, _, payload = out.partition(b"\r\n\r\n")
+        status, headers = 200, {}
+        for line in head.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.lower() == "status":
+                status = int(value.split()[0])
+            elif name:
+                headers[name] = value.strip()
+        return Response(payload, status_code=status, headers=headers)
+
+    return app
+
+
+def publish_bare_repo(source: str, root: str, name: str) -> str:
+    """Copy a working repository into `root/name.git` for the git host; returns its path."""
+    target = os.path.join(root, f"{name}.git")
+    subprocess.run(["git", "clone", "-q", "--bare", source, target], check=True)
+    # Partial clones (--filter=blob:none) need the server to allow filters
+    subprocess.run(["git", "-C", target, "config", "uploadpack.allowFilter", "true"], check=True)
+    return target
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app with uvicorn on a background thread with its own event loop."""
+
+    def __init__(self, app: Any, port: Optional[int] = None) -> None:
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, name=f"uvicorn-{self.port}", daemon=True)
+
+    def _run(self) -> None:
+        self.server.config.setup_event_loop()
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        await self.server.serve()
+
+    def start(self, timeout: float = 10.0) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10.0)
@@ -0,0 +1,137 @@
+"""In-process stand-ins for external services used by the benchmarks."""
+
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class DuplicateKeyError(Exception):
+    """What postgrest raises for a unique violation, reduced to the parts callers inspect."""
+
+    code = "23505"
+
+
+class InMemorySupabaseClient:
+    """Implements the SupabaseClient surface with NumPy cosine search instead of PostgREST/pgvector."""
+
+    def __init__(self, match_threshold: float = 0.0) -> None:
+        self.match_threshold = match_threshold
+        self.rows: List[Dict[str, Any]] = []
+        self.readme_history: List[Dict[str, Any]] = []
+        self.symbol_graphs: Dict[str, Dict[str, Any]] = {}
+        self._matrix = None
+
+    def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.rows.append({"id": str(uuid.uuid4()), **row})
+        self._matrix = None
+
+    def delete_index_run(self, repo_url: str, index_run: str) -> None:
+        self.rows = [
+            r for r in self.rows if r["repo_url"] != repo_url or r.get("metadata", {}).get("index_run") != index_run
+        ]
+        self._matrix = None
+
+    def _vectors(self) -> np.ndarray:
+        if self._matrix is None:
+            matrix = np.asarray([r["embedding"] for r in self.rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.maximum(norms, 1e-8)
+        return self._matrix
+
+    def search_code_chunks(
+        self, repo_url: str, embedding: List[float], top_k: int, include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        if not self.rows:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-8)
+        scores = self._vectors() @ query
+        order = np.argsort(-scores)
+        results = []
+        for i in order:
+            row = self.rows[i]
+            if row["repo_url"] != repo_url or scores[i] <= self.match_threshold:
+                continue
+            fields = row if include_embeddings else {k: v for k, v in row.items() if k != "embedding"}
+            results.append(fields | {"similarity": float(scores[i])})
+            if len(results) >= top_k:
+                break
+        return results
+
+    def fetch_code_chunks(self, repo_url: str, limit: int = 5000, page_size: int = 1000) -> List[Dict[str, Any]]:
+        rows = [{k: v for k, v in r.items() if k != "embedding"} for r in self.rows if r["repo_url"] == repo_url]
+        return sorted(rows, key=lambda r: r["file_path"])[:limit]
+
+    def upsert_symbol_graph(self, repo_url: str, graph: Dict[str, Any]) -> None:
+        self.symbol_graphs[repo_url] = graph
+
+    def insert_readme_version(self, row: Dict[str, Any]) -> None:
+        if any(r["repo_url"] == row["repo_url"] and r["version"] == row["version"] for r in self.readme_history):
+            raise DuplicateKeyError("duplicate key value violates unique constraint \"readme_history_version_idx\"")
+        self.readme_history.append({"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat(), **row})
+
+    def fetch_readme_versions(
+        self,
+        repo_url: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        min_version: Optional[int] = None,
+        max_version: Optional[int] = None,
+        descending: bool = True,
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            r for r in self.readme_history
+            if r["repo_url"] == repo_url
+            and (min_version is None or r["version"] >= min_version)
+            and (max_version is None or r["version"] <= max_version)
+        ]
+        rows.sort(key=lambda r: r["version"], reverse=descending)
+        if columns != "*":
+            names = columns.split(",")
+            rows = [{k: r.get(k) for k in names} for r in rows]
+        return rows[:limit] if limit is not None else rows
+
+
+class SinkSupabaseClient(InMemorySupabaseClient):
+    """Serialises inserted rows like the PostgREST client does, then drops them: for measuring the indexer's own memory."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.inserted = 0
+        self.inserted_bytes = 0
+
+    def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        body = json.dumps(rows)
+        self.inserted += len(rows)
+        self.inserted_bytes += len(body)
+
+
+class MatmulEmbedder:
+    """
+    Stand-in for a local transformer: hashed token features through two dense layers.
+
+    Like a real forward pass, a call has a fixed cost (weights streamed through the
+    cache once per call) plus a per-text cost that BLAS runs far more efficiently
+    for a whole batch than for one row at a time.
+    """
+
+    def __init__(self, features: int = 4096, hidden: int = 1024, dim: int = 384, seed: int = 0) -> None:
+        rng = np.random.RandomState(seed)
+        self.features = features
+        self.w1 = rng.standard_normal((features, hidden)).astype(np.float32) / np.sqrt(features)
+        self.w2 = rng.standard_normal((hidden, dim)).astype(np.float32) / np.sqrt(hidden)
+        self.calls = 0
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        x = np.zeros((len(texts), self.features), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.split():
+                x[i, hash(token) % self.features] += 1.0
+        out = np.tanh(np.tanh(x @ self.w1) @ self.w2)
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-8)
+        return out.tolist()
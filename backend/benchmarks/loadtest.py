@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: the FastAPI app against local stand-ins for Supabase
+(PostgREST/RPC), Perplexity (chat completions) and a git host.
+
+Drives a weighted mix of /parse_repo, /search_chunks and /generate_readme calls
+from `--concurrency` clients and reports throughput, p50/p95/p99 latency and the
+app's event-loop lag per endpoint. The load generator, the fakes and the app share
+one process (separate threads and loops), so numbers are conservative.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --concurrency 16 --duration 30 --mix parse=1,search=8,generate=2
+    python benchmarks/loadtest.py --pplx-latency-ms 3000 --supabase-error-rate 0.02 --json results.json
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+from fake_servers import (  # noqa: E402
+    FAKE_SUPABASE_KEY,
+    Faults,
+    ServerThread,
+    create_fake_perplexity,
+    create_fake_supabase,
+    create_git_host,
+    publish_bare_repo,
+)
+from synthetic_repo import generate_repo  # noqa: E402
+
+ENDPOINTS = {"parse": "/parse_repo", "search": "/search_chunks", "generate": "/generate_readme"}
+QUERIES = [
+    "compute total over the given items",
+    "items value total",
+    "overview architecture setup usage api",
+    "export function number items",
+    "func range items total",
+]
+
+# (endpoint, start, end, status, Server-Timing header)
+Sample = Tuple[str, float, float, int, str]
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires on the app's event loop."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+        self._task = None
+
+    async def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.samples.append((now, max(0.0, now - expected)))
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _payload(endpoint: str, repo_url: str, args: argparse.Namespace, rng: random.Random) -> Dict[str, Any]:
+    if endpoint == "parse":
+        return {"repo_url": repo_url, "force_reparse": True}
+    if endpoint == "search":
+        return {"repo_url": repo_url, "query": rng.choice(QUERIES), "top_k": 20}
+    return {"repo_url": repo_url, "mode": args.generate_mode}
+
+
+async def run_load(base_url: str, repo_urls: List[str], args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    samples: List[Sample] = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+
+        async def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                endpoint = rng.choices(names, weights)[0]
+                payload = _payload(endpoint, rng.choice(repo_urls), args, rng)
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.post(ENDPOINTS[endpoint], json=payload)
+                    status, timing = resp.status_code, resp.headers.get("server-timing", "")
+                except httpx.HTTPError:
+                    status, timing = 0, ""
+                samples.append((endpoint, t0, time.perf_counter(), status, timing))
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        return samples, time.perf_counter() - start
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(max(values))}
+
+
+def _stage_means(timings: List[str]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for header in timings:
+        for entry in filter(None, (e.strip() for e in header.split(","))):
+            stage, _, dur = entry.partition(";dur=")
+            if dur:
+                totals[stage] = totals.get(stage, 0.0) + float(dur) / 1000.0
+    return {stage: total / max(1, len(timings)) for stage, total in totals.items()}
+
+
+def summarise(samples: List[Sample], elapsed: float, lag: List[Tuple[float, float]]) -> Dict[str, Any]:
+    lag_times = [t for t, _ in lag]
+    report: Dict[str, Any] = {"elapsed_s": elapsed, "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        rows = [s for s in samples if s[0] == endpoint]
+        if not rows:
+            continue
+        latencies = [end - start for _, start, end, _, _ in rows]
+        # Worst event-loop lag observed while each request was in flight
+        in_flight_lag = []
+        for _, start, end, _, _ in rows:
+            lo, hi = bisect.bisect_left(lag_times, start), bisect.bisect_right(lag_times, end)
+            in_flight_lag.append(max((lag[i][1] for i in range(lo, hi)), default=0.0))
+        statuses: Dict[str, int] = {}
+        for row in rows:
+            statuses[str(row[3])] = statuses.get(str(row[3]), 0) + 1
+        ok = [r for r in rows if r[3] == 200]
+        report["endpoints"][endpoint] = {
+            "requests": len(rows),
+            "errors": len(rows) - len(ok),
+            "statuses": statuses,
+            "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+            "latency_s": _percentiles(latencies),
+            "loop_lag_s": _percentiles(in_flight_lag),
+            "stage_means_s": _stage_means([r[4] for r in ok]),
+        }
+    report["loop_lag_s"] = _percentiles([value for _, value in lag])
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n=== Load test: {report['elapsed_s']:.1f}s ===")
+    print(
+        f"{'endpoint':<9} {'reqs':>6} {'errors':>6} {'ok rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}"
+        f" {'lag p95':>8} {'lag max':>8}"
+    )
+    for endpoint, row in report["endpoints"].items():
+        lat, lag = row["latency_s"], row["loop_lag_s"]
+        print(
+            f"{endpoint:<9} {row['requests']:>6} {row['errors']:>6} {row['throughput_rps']:>7.2f}"
+            f" {lat['p50'] * 1000:>6.0f}ms {lat['p95'] * 1000:>6.0f}ms {lat['p99'] * 1000:>6.0f}ms"
+            f" {lag['p95'] * 1000:>6.0f}ms {lag['max'] * 1000:>6.0f}ms"
+        )
+    for endpoint, row in report["endpoints"].items():
+        stages = sorted(row["stage_means_s"].items(), key=lambda kv: -kv[1])
+        print(f"  {endpoint} mean stages: " + ", ".join(f"{s}={v * 1000:.0f}ms" for s, v in stages[:6]))
+    lag = report["loop_lag_s"]
+    print(f"Event-loop lag overall: p50={lag['p50'] * 1000:.1f}ms p99={lag['p99'] * 1000:.1f}ms max={lag['max'] * 1000:.0f}ms")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds of load after warm-up")
+    ap.add_argument("--mix", default="parse=1,search=8,generate=2", help="endpoint weights")
+    ap.add_argument("--generate-mode", default="single", choices=["single", "hierarchical", "summaries"])
+    ap.add_argument("--repos", type=int, default=3, help="synthetic repositories to serve")
+    ap.add_argument("--files", type=int, default=100, help="files per synthetic repository")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--supabase-latency-ms", type=float, default=20.0)
+    ap.add_argument("--supabase-jitter-ms", type=float, default=10.0)
+    ap.add_argument("--supabase-error-rate", type=float, default=0.0)
+    ap.add_argument("--pplx-latency-ms", type=float, default=1500.0)
+    ap.add_argument("--pplx-jitter-ms", type=float, default=500.0)
+    ap.add_argument("--pplx-error-rate", type=float, default=0.0)
+    ap.add_argument("--pplx-error-status", type=int, default=429)
+    ap.add_argument("--json", help="also write the full report to this file")
+    args = ap.parse_args()
+
+    supabase_faults = Faults(args.supabase_latency_ms, args.supabase_jitter_ms, args.supabase_error_rate)
+    pplx_faults = Faults(args.pplx_latency_ms, args.pplx_jitter_ms, args.pplx_error_rate, args.pplx_error_status)
+
+    with tempfile.TemporaryDirectory(prefix="autodoc_loadtest_") as tmp:
+        git_root = os.path.join(tmp, "git")
+        os.makedirs(git_root)
+        for i in range(args.repos):
+            source = generate_repo(os.path.join(tmp, f"src_{i}"), files=args.files, seed=i)
+            publish_bare_repo(source.removeprefix("file://"), git_root, f"repo_{i}")
+
+        servers = [
+            ServerThread(create_git_host(git_root)).start(),
+            ServerThread(create_fake_supabase(supabase_faults)).start(),
+            ServerThread(create_fake_perplexity(pplx_faults)).start(),
+        ]
+        git_host, supabase, pplx = servers
+        os.environ.update(
+            {
+                "SUPABASE_URL": supabase.url,
+                "SUPABASE_ANON_KEY": FAKE_SUPABASE_KEY,
+                "PPLX_API_KEY": "loadtest",
+                "PPLX_API_URL": f"{pplx.url}/chat/completions",
+                "PPLX_MODEL": "sonar",
+                # Keeps the summary cache and profiles of the run out of the working tree
+                "AUTODOC_CACHE_DIR": os.path.join(tmp, "cache"),
+            }
+        )
+        os.environ.setdefault("EMBEDDINGS_PROVIDER", "tfidf")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+        # Configuration is read at import time, so the app is imported only now
+        import main as backend
+
+        app = ServerThread(backend.app).start()
+        servers.append(app)
+        monitor = LoopLagMonitor()
+        asyncio.run_coroutine_threadsafe(monitor.start(), app.loop).result()
+        try:
+            repo_urls = [f"{git_host.url}/repo_{i}.git" for i in range(args.repos)]
+            print(f"Warming up: parsing {len(repo_urls)} repositories of {args.files} files")
+            with httpx.Client(base_url=app.url, timeout=args.timeout) as client:
+                for url in repo_urls:
+                    resp = client.post("/parse_repo", json={"repo_url": url, "force_reparse": True})
+                    resp.raise_for_status()
+            print(
+                f"Running mix {args.mix} with {args.concurrency} clients for {args.duration:.0f}s "
+                f"(supabase {asdict(supabase_faults)}, perplexity {asdict(pplx_faults)})"
+            )
+            lag_start = len(monitor.samples)
+            samples, elapsed = asyncio.run(run_load(app.url, repo_urls, args))
+            report = summarise(samples, elapsed, monitor.samples[lag_start:])
+        finally:
+            for server in reversed(servers):
+                server.stop()
+
+    print_report(report)
+    if args.json:
+        report["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+        pathlib.Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Synthetic repository generator for benchmarks: configurable file count, size and language mix."""
+
+import os
+import random
+import subprocess
+from typing import Dict, Optional
+
+from parser.extract_code import SUPPORTED_EXTS
+
+DEFAULT_LANGUAGE_MIX = {".py": 0.5, ".ts": 0.3, ".go": 0.1, ".js": 0.1}
+
+_PY_FUNC = '''
+def {name}(value: int, items: list) -> int:
+    """Compute {name} over the given items."""
+    total = value
+    for item in items:
+        if item % {k} == 0:
+            total += item * {k}
+    return total
+'''
+_TS_FUNC = '''
+/** Compute {name} over the given items. */
+export function {name}(value: number, items: number[]): number {{
+  let total = value;
+  for (const item of items) {{
+    if (item % {k} === 0) total += item * {k};
+  }}
+  return total;
+}}
+'''
+_GO_FUNC = '''
+// {name} computes a total over the given items.
+func {name}(value int, items []int) int {{
+	total := value
+	for _, item := range items {{
+		if item%{k} == 0 {{
+			total += item * {k}
+		}}
+	}}
+	return total
+}}
+'''
+_TEMPLATES = {".py": _PY_FUNC, ".ts": _TS_FUNC, ".js": _TS_FUNC.replace(": number[]", "").replace(": number", ""), ".go": _GO_FUNC}
+_DIRS = ["api", "services", "models", "utils", "core", "auth", "handlers", "lib"]
+
+
+def _file_content(ext: str, functions: int, rng: random.Random) -> str:
+    header = "package main\n" if ext == ".go" else ""
+    body = "".join(
+        _TEMPLATES[ext].format(name=f"fn_{rng.randrange(10**6)}_{i}", k=rng.randint(2, 9)) for i in range(functions)
+    )
+    return header + body
+
+
+def generate_repo(
+    path: str,
+    files: int = 200,
+    functions_per_file: int = 12,
+    language_mix: Optional[Dict[str, float]] = None,
+    depth: int = 3,
+    seed: int = 0,
+    git: bool = True,
+) -> str:
+    """Write a synthetic repository under `path` and return its file:// URL (or path if git=False)."""
+    rng = random.Random(seed)
+    mix = language_mix or DEFAULT_LANGUAGE_MIX
+    exts, weights = zip(*mix.items())
+    os.makedirs(path, exist_ok=True)
+    for i in range(files):
+        ext = rng.choices(exts, weights)[0]
+        parts = [rng.choice(_DIRS) for _ in range(rng.randint(0, depth))]
+        directory = os.path.join(path, *parts)
+        os.makedirs(directory, exist_ok=True)
+        functions = max(1, int(rng.gauss(functions_per_file, functions_per_file / 3)))
+        with open(os.path.join(directory, f"module_{i}{ext}"), "w", encoding="utf-8") as f:
+            f.write(_file_content(ext, functions, rng))
+    with open(os.path.join(path, "main.py"), "w", encoding="utf-8") as f:
+        f.write("from fastapi import FastAPI\n\napp = FastAPI()\n\n\n@app.get('/')\nasync def root():\n    return {'ok': True}\n")
+    if not git:
+        return path
+    env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+    subprocess.run(["git", "init", "-q", path], check=True, env=env)
+    subprocess.run(["git", "-C", path, "add", "-A"], check=True, env=env)
+    subprocess.run(["git", "-C", path, "commit", "-q", "-m", "synthetic"], check=True, env=env)
+    # Let partial clones (--filter=blob:none) work against the local repository
+    subprocess.run(["git", "-C", path, "config", "uploadpack.allowFilter", "true"], check=True, env=env)
+    return "file://" + os.path.abspath(path)
+
+
+def synthetic_chunks(count: int = 500, seed: int = 0, repo_url: str = "https://example.com/bench/repo"):
+    """Chunk dicts shaped like parse_repository output, without touching the filesystem."""
+    rng = random.Random(seed)
+    exts, weights = zip(*DEFAULT_LANGUAGE_MIX.items())
+    chunks = []
+    for i in range(count):
+        ext = rng.choices(exts, weights)[0]
+        parts = [rng.choice(_DIRS) for _ in range(rng.randint(0, 3))]
+        chunks.append(
+            {
+                "repo_url": repo_url,
+                "file_path": "/".join(["/tmp/autodoc_bench", *parts, f"module_{i}{ext}"]),
+                "content": _file_content(ext, rng.randint(2, 30), rng),
+                "metadata": {"language": SUPPORTED_EXTS[ext]},
+            }
+        )
+    return chunks
@@ -0,0 +1,105 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from services.chunk_features import CHARS_PER_TOKEN, estimate_tokens, get_chunk_features
+
+# Prompt budget for the code context, in (estimated) tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("README_CONTEXT_TOKENS", "6000"))
+# No single chunk may take more than this many tokens of the budget
+MAX_CHUNK_TOKENS = int(os.getenv("README_MAX_CHUNK_TOKENS", "750"))
+# Chunks smaller than this are costed as if they were this big, so that
+# near-empty files do not win on value/token ratio alone
+MIN_CHUNK_TOKENS = 128
+# Fence, header and separators around each chunk
+CHUNK_OVERHEAD_TOKENS = 16
+
+# Order in which role groups are emitted into the prompt
+ROLE_ORDER = ["entrypoint", "security", "api", "data_model", "other", "test"]
+ROLE_HEADERS = {"security": "Security", "api": "API", "data_model": "Data Model"}
+
+# Lines that start a new top-level construct are good places to cut
+_BOUNDARY_RE = re.compile(
+    r"^(?:def |async def |class |function |export |const |let |var |func |fn |pub |impl |struct |interface |type |@)"
+)
+
+
+def trim_to_tokens(content: str, max_tokens: int) -> Tuple[str, bool]:
+    """Trim `content` to roughly `max_tokens`, cutting at a syntactic boundary when possible."""
+    if estimate_tokens(content) <= max_tokens:
+        return content, False
+    limit = max_tokens * CHARS_PER_TOKEN
+    head = content[:limit]
+    lines = head.split("\n")[:-1]  # drop the partial last line
+    # Prefer cutting right before a top-level definition, then at a blank line,
+    # and only then at any line end; never keep less than half of the budget
+    floor = len(lines) // 2
+    for predicate in (
+        lambda line: _BOUNDARY_RE.match(line) is not None,
+        lambda line: not line.strip(),
+    ):
+        for i in range(len(lines) - 1, floor, -1):
+            if predicate(lines[i]):
+                return "\n".join(lines[:i]).rstrip() + "\n", True
+    if lines:
+        return "\n".join(lines) + "\n", True
+    return head, True
+
+
+def pack_context(
+    chunks: List[Dict[str, Any]],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    max_chunk_tokens: int = MAX_CHUNK_TOKENS,
+) -> List[Dict[str, Any]]:
+    """
+    Select and trim chunks to fill `token_budget` with the most useful context.
+
+    Greedy knapsack: candidates are ranked by value per token (index-time
+    priority, scaled by retrieval similarity when present) and taken while
+    they fit. Only the selected chunks are trimmed, so the per-chunk work
+    before selection is a metadata lookup.
+    """
+    candidates = []
+    seen_paths = set()
+    for chunk in chunks:
+        path = chunk.get("file_path", "")
+        # The same file may come back several times (e.g. after a re-index)
+        if path in seen_paths:
+            continue
+        seen_paths.add(path)
+        features = get_chunk_features(chunk)
+        cost = min(features["tokens"], max_chunk_tokens) + CHUNK_OVERHEAD_TOKENS
+        value = features["priority"]
+        similarity = chunk.get("similarity")
+        if similarity is not None:
+            value *= 0.5 + float(similarity)
+        density = value / max(cost, MIN_CHUNK_TOKENS)
+        candidates.append((density, cost, chunk, features))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+
+    selected = []
+    remaining = token_budget
+    for density, cost, chunk, features in candidates:
+        if cost > remaining:
+            continue
+        remaining -= cost
+        selected.append((density, chunk, features))
+
+    role_rank = {role: i for i, role in enumerate(ROLE_ORDER)}
+    selected.sort(key=lambda item: (role_rank.get(item[2]["role"], len(ROLE_ORDER)), -item[0]))
+
+    packed = []
+    for _density, chunk, features in selected:
+        content, truncated = trim_to_tokens(chunk.get("content", ""), max_chunk_tokens)
+        packed.append(
+            {
+                "file_path": chunk.get("file_path", ""),
+                "language": (chunk.get("metadata") or {}).get("language", ""),
+                "role": features["role"],
+                "content": content,
+                "truncated": truncated,
+                "tokens": estimate_tokens(content),
+            }
+        )
+    return packed
@@ -0,0 +1,408 @@
+"""
+Extractive "draft" README built from indexed chunks alone, without a model.
+
+Everything comes from the code: the directory tree, languages, entry points and
+HTTP routes, module docstrings, top-level symbols, environment variables and
+dependencies (manifests when indexed, otherwise third-party imports). The
+output is deterministic and built with a handful of regex passes per file, so
+even repositories with thousands of files take well under a second.
+
+DraftReadmeClient wraps the same builder in the MarkdownModelClient protocol,
+for environments without a model API key and as the fake model in benchmarks.
+"""
+
+import json
+import os
+import re
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.chunk_features import classify_role
+from services.metrics import timed
+from generator.map_reduce import _relative_paths
+from generator.sections import anchor
+
+DRAFT_MODEL = "draft"
+
+TREE_MAX_DEPTH = 3
+TREE_MAX_ENTRIES = 12  # per directory
+MAX_KEY_MODULES = 10
+MAX_SYMBOLS = 8
+MAX_TABLE_ROWS = 40
+
+LANGUAGE_NAMES = {
+    "python": "Python", "typescript": "TypeScript", "tsx": "TypeScript (TSX)", "javascript": "JavaScript",
+    "go": "Go", "rust": "Rust", "java": "Java", "c_sharp": "C#",
+}
+
+# One line-anchored pass per file finds definitions, imports, routes and entry
+# points together; the patterns that match mid-line start with a literal. Both
+# keep the scan well under a second for tens of megabytes of code
+_LINE_RES = {
+    "python": re.compile(
+        r"^(?:(?:async\s+def|def|class)\s+(?P<symbol>[A-Za-z]\w*)"
+        r"|[ \t]*(?:from\s+(?P<module>[\w.]+)\s+import|import\s+(?P<import>[\w.]+))"
+        # FastAPI / Flask decorators, followed by the handler
+        r"|@\w+\.(?P<method>get|post|put|patch|delete|route|websocket)\(\s*[\"'](?P<route>[^\"']*)[\"']"
+        r"[\s\S]{0,400}?^(?:async\s+)?def\s+(?P<handler>\w+)"
+        r"|(?P<main>if\s+__name__\s*==\s*[\"']__main__[\"'])"
+        r"|(?P<app>\w+)\s*=\s*(?:FastAPI|Flask|Starlette)\()",
+        re.M,
+    ),
+    "typescript": re.compile(
+        r"^(?:export\s+(?:default\s+)?(?:async\s+)?(?:function\*?|class|const|interface|type|enum)\s+(?P<symbol>\w+)"
+        r"|[ \t]*(?:(?:import|export|\})[^'\"\n;]*?\bfrom|import)\s*[\"'](?P<module>[^\"'./][^\"']*)[\"'])",
+        re.M,
+    ),
+    "go": re.compile(
+        r"^(?:(?:func(?:\s+\([^)]*\))?|type)\s+(?P<symbol>[A-Z]\w*)"
+        r"|[ \t]*(?:import\s+)?(?:\w+\s+)?\"(?P<module>[\w.-]+\.[\w.-]+/[^\"]+)\""
+        r"|(?P<main>func\s+main\(\)))",
+        re.M,
+    ),
+    "rust": re.compile(r"^(?:pub\s+(?:async\s+)?(?:fn|struct|enum|trait)\s+(?P<symbol>\w+)|(?P<main>fn\s+main\(\)))", re.M),
+    "java": re.compile(
+        r"^[ \t]*public\s+(?:(?:abstract|final|static)\s+)*(?:class|interface|record|enum)\s+(?P<symbol>\w+)", re.M
+    ),
+}
+_LINE_RES.update(tsx=_LINE_RES["typescript"], javascript=_LINE_RES["typescript"], c_sharp=_LINE_RES["java"])
+# Found anywhere in a line: routes, requires and environment variables
+_INLINE_RES = {
+    "python": (
+        re.compile(
+            r"os\.(?:getenv\(|environ\.get\(|environ\[)\s*[\"'](?P<env>\w+)[\"']"
+            r"(?:\s*,\s*[\"'](?P<default>[^\"'\n]*)[\"'])?"
+        ),
+    ),
+    "typescript": (
+        # Express-style routers
+        re.compile(
+            r"\.(?:(?<=\bapp\.)|(?<=\brouter\.)|(?<=\bserver\.))(?P<method>get|post|put|patch|delete|all)"
+            r"\(\s*[\"'`](?P<route>[^\"'`]+)[\"'`]\s*,\s*(?:async\s+)?(?P<handler>\w*)"
+        ),
+        re.compile(r"require\(\s*[\"'](?P<module>[^\"'./][^\"']*)[\"']"),
+        re.compile(r"process\.env\.(?P<env>\w+)"),
+    ),
+    "go": (
+        re.compile(r"HandleFunc\(\s*\"(?P<route>[^\"]+)\"\s*,\s*(?P<handler>[\w.]*)"),
+        re.compile(r"os\.Getenv\(\s*\"(?P<env>\w+)\""),
+    ),
+    "rust": (re.compile(r"env::var\(\s*\"(?P<env>\w+)\""),),
+    "java": (re.compile(r"System\.getenv\(\s*\"(?P<env>\w+)\""),),
+    "c_sharp": (re.compile(r"GetEnvironmentVariable\(\s*\"(?P<env>\w+)\""),),
+}
+_INLINE_RES.update(tsx=_INLINE_RES["typescript"], javascript=_INLINE_RES["typescript"])
+_DOCSTRING_RES = (
+    re.compile(r"\A(?:\s*#[^\n]*\n)*\s*[rbu]?(?:\"\"\"|''')\s*(.+?)(?:\"\"\"|'''|\n\s*\n)", re.S),
+    re.compile(r"\A\s*/\*\*?\s*(.+?)(?:\*/|\n\s*\*?\s*\n)", re.S),
+    re.compile(r"\A(?:\s*//[^\n]*\n)*?\s*//\s*(.+?)\n"),
+)
+
+_NODE_BUILTINS = {
+    "assert", "buffer", "child_process", "crypto", "events", "fs", "http", "https", "net", "os", "path",
+    "process", "querystring", "readline", "stream", "url", "util", "zlib",
+}
+_MANIFESTS = {"requirements.txt", "package.json", "pyproject.toml", "go.mod", "cargo.toml"}
+
+
+def _first_sentence(text: str, limit: int = 200) -> str:
+    text = " ".join(line.strip(" *#/") for line in text.strip().splitlines() if line.strip(" *#/"))
+    # A sentence ends before a capital letter, so "e.g." and "vs." do not cut it short
+    match = re.match(r"(.+?[.!?])(?=\s+[A-Z]|\s*$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= limit else sentence[: limit - 3].rstrip() + "..."
+
+
+def _docstring(content: str) -> str:
+    for pattern in _DOCSTRING_RES:
+        match = pattern.match(content)
+        if match:
+            sentence = _first_sentence(match.group(1))
+            # Licence headers and tool directives say nothing about the module
+            if sentence and not re.match(r"(?i)(copyright|license|eslint|@ts-|go:build|\+build|!)", sentence):
+                return sentence
+    return ""
+
+
+def _manifest_dependencies(name: str, content: str) -> List[str]:
+    name = name.lower()
+    try:
+        if name == "requirements.txt":
+            lines = (line.split("#", 1)[0].strip() for line in content.splitlines())
+            return [line for line in lines if line and not line.startswith("-")]
+        if name == "package.json":
+            data = json.loads(content)
+            deps = {**data.get("dependencies", {}), **data.get("devDependencies", {})}
+            return [f"{pkg}@{version}" for pkg, version in deps.items()]
+        if name == "go.mod":
+            return re.findall(r"^\s*(?:require\s+)?([\w.-]+\.[\w.-]+/\S+ v\S+)", content, re.M)
+    except ValueError:
+        pass
+    return []
+
+
+class _Repo:
+    """Facts about a repository, gathered in one pass over its files."""
+
+    def __init__(self, repo_url: str, chunks: Sequence[Dict[str, Any]]) -> None:
+        self.repo_url = repo_url
+        self.name = repo_url.rstrip("/").rsplit("/", 1)[-1].removesuffix(".git") or repo_url
+        # Chunks are whole files today; join them per file in case that changes
+        self.files: Dict[str, Dict[str, Any]] = {}
+        for path, chunk in zip(_relative_paths(chunks), chunks):
+            metadata = chunk.get("metadata") or {}
+            entry = self.files.setdefault(
+                path, {"language": metadata.get("language") or "unknown", "content": [], "centrality": None}
+            )
+            entry["content"].append(chunk.get("content") or "")
+            if metadata.get("centrality") is not None:
+                entry["centrality"] = metadata["centrality"]
+
+        self.languages: Counter = Counter()
+        self.lines: Counter = Counter()
+        self.routes: List[Tuple[str, str, str, str]] = []
+        self.env: Dict[str, Tuple[str, List[str]]] = {}
+        self.entrypoints: List[Tuple[str, str]] = []
+        self.modules: List[Tuple[float, str, str, List[str]]] = []
+        self.imports: Counter = Counter()
+        self.manifest_deps: List[str] = []
+        # Every directory and module name in the repository; imports of these are not dependencies
+        local = {os.path.splitext(part)[0] for p in self.files for part in p.split("/")}
+
+        for path, entry in sorted(self.files.items()):
+            content = "\n".join(entry["content"])
+            language = entry["language"]
+            basename = os.path.basename(path)
+            if basename.lower() in _MANIFESTS:
+                self.manifest_deps.extend(_manifest_dependencies(basename, content))
+                continue
+            self.languages[language] += 1
+            self.lines[language] += content.count("\n") + 1
+            self._scan(path, language, content, local)
+
+    def _scan(self, path: str, language: str, content: str, local: set) -> None:
+        symbols: List[str] = []
+        app = main = None
+        patterns = ([_LINE_RES[language]] if language in _LINE_RES else []) + list(_INLINE_RES.get(language, ()))
+        for pattern in patterns:
+            for match in pattern.finditer(content):
+                groups = match.groupdict()
+                if groups.get("symbol"):
+                    symbols.append(groups["symbol"])
+                elif groups.get("module") or groups.get("import"):
+                    package = self._package(language, groups.get("module") or groups["import"], local)
+                    if package:
+                        self.imports[package] += 1
+                elif groups.get("route") is not None:
+                    method = (groups.get("method") or "any").upper().replace("ROUTE", "ANY")
+                    self.routes.append((method, groups["route"], groups.get("handler") or "", path))
+                elif groups.get("env"):
+                    default, paths = self.env.setdefault(groups["env"], ("", []))
+                    if path not in paths:
+                        paths.append(path)
+                    if groups.get("default") and not default:
+                        self.env[groups["env"]] = (groups["default"], paths)
+                elif groups.get("app"):
+                    app = groups["app"]
+                elif groups.get("main"):
+                    main = True
+        # Next.js API routes are defined by their file path
+        if path.startswith("pages/api/") or "/pages/api/" in path:
+            route = "/" + path[path.index("pages/api/") + len("pages/"):].rsplit(".", 1)[0]
+            self.routes.append(("ANY", route.removesuffix("/index"), "handler", path))
+
+        if app:
+            directory, module = os.path.split(path.rsplit(".", 1)[0])
+            where = f" (from `{directory}/`)" if directory else ""
+            self.entrypoints.append((path, f"`uvicorn {module}:{app}`{where}"))
+        elif main:
+            command = {"python": f"python {path}", "go": f"go run ./{os.path.dirname(path) or '.'}"}.get(language)
+            self.entrypoints.append((path, f"`{command}`" if command else "program entry point"))
+        elif classify_role(path) == "entrypoint":
+            self.entrypoints.append((path, "entry module"))
+
+        doc = _docstring(content)
+        symbols = list(dict.fromkeys(symbols))[:MAX_SYMBOLS]
+        self.modules.append((self._rank(path, bool(doc)), path, doc, symbols))
+
+    def _rank(self, path: str, documented: bool) -> float:
+        centrality = self.files[path]["centrality"]
+        if centrality is not None:
+            return float(centrality)
+        # No symbol graph for this index: rank by role, like the context packer
+        role = {"entrypoint": 3.0, "api": 2.0, "security": 2.0, "data_model": 1.5, "test": 0.1}.get(
+            classify_role(path), 1.0
+        )
+        return role + (0.5 if documented else 0.0)
+
+    @staticmethod
+    def _package(language: str, name: str, local: set) -> Optional[str]:
+        if language == "python":
+            top = name.split(".", 1)[0]
+            if not top or top in local or top in sys.stdlib_module_names or top == "__future__":
+                return None
+            return top
+        if language == "go":
+            return name
+        # JavaScript / TypeScript: bare specifiers only, keeping scoped packages whole
+        if name.startswith(("node:", "@/", "~/")) or name in _NODE_BUILTINS:
+            return None
+        parts = name.split("/")
+        return "/".join(parts[:2]) if name.startswith("@") else parts[0]
+
+    def tree(self) -> str:
+        root: Dict[str, Any] = {}
+        for path in self.files:
+            node = root
+            for part in path.split("/")[:-1]:
+                node = node.setdefault(part + "/", {})
+            node.setdefault("", []).append(path.rsplit("/", 1)[-1])
+
+        def count(node: Dict[str, Any]) -> int:
+            return len(node.get("", [])) + sum(count(child) for key, child in node.items() if key)
+
+        lines = [f"{self.name}/"]
+
+        def render(node: Dict[str, Any], prefix: str, depth: int) -> None:
+            entries = [(key, node[key]) for key in sorted(k for k in node if k)]
+            entries += [(name, None) for name in sorted(node.get("", []))]
+            shown = entries[:TREE_MAX_ENTRIES]
+            for i, (name, child) in enumerate(shown):
+                last = i == len(shown) - 1 and len(entries) <= TREE_MAX_ENTRIES
+                branch, extension = ("└── ", "    ") if last else ("├── ", "│   ")
+                if child is None:
+                    lines.append(f"{prefix}{branch}{name}")
+                elif depth >= TREE_MAX_DEPTH:
+                    lines.append(f"{prefix}{branch}{name} ({count(child)} files)")
+                else:
+                    lines.append(f"{prefix}{branch}{name}")
+                    render(child, prefix + extension, depth + 1)
+            if len(entries) > TREE_MAX_ENTRIES:
+                lines.append(f"{prefix}└── ... {len(entries) - TREE_MAX_ENTRIES} more")
+
+        render(root, "", 1)
+        return "\n".join(lines)
+
+
+def _table(header: Sequence[str], rows: Sequence[Sequence[str]]) -> str:
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for row in rows[:MAX_TABLE_ROWS]:
+        lines.append("| " + " | ".join(str(cell).replace("|", "\\|") for cell in row) + " |")
+    if len(rows) > MAX_TABLE_ROWS:
+        lines.append(f"| ... {len(rows) - MAX_TABLE_ROWS} more |" + " |" * (len(header) - 1))
+    return "\n".join(lines)
+
+
+def draft_sections(repo_url: str, chunks: Sequence[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """The draft README as (section title, Markdown body) pairs; empty sections are left out."""
+    repo = _Repo(repo_url, chunks)
+    modules = sorted(repo.modules, key=lambda m: (-m[0], m[1]))
+    sections: List[Tuple[str, str]] = []
+
+    total_lines = sum(repo.lines.values()) or 1
+    languages = [
+        (LANGUAGE_NAMES.get(lang, lang), str(files), f"{repo.lines[lang]:,}", f"{100 * repo.lines[lang] / total_lines:.0f}%")
+        for lang, files in repo.languages.most_common()
+    ]
+    summary = next((doc for _, _, doc, _ in modules if doc), "")
+    overview = [summary] if summary else []
+    overview.append(
+        f"{sum(repo.languages.values())} source files, {total_lines:,} lines of code"
+        + (f", {len(repo.routes)} HTTP routes" if repo.routes else "")
+        + "."
+    )
+    overview.append(_table(("Language", "Files", "Lines", "Share"), languages))
+    sections.append(("Overview", "\n\n".join(overview)))
+
+    sections.append(("Project Structure", f"```text\n{repo.tree()}\n```"))
+
+    if repo.entrypoints:
+        sections.append(("Entry Points", "\n".join(f"- `{path}`: {how}" for path, how in repo.entrypoints)))
+
+    if repo.routes:
+        rows = [(method, f"`{route}`", f"`{handler}`" if handler else "", f"`{path}`") for method, route, handler, path in repo.routes]
+        sections.append(("API Endpoints", _table(("Method", "Path", "Handler", "File"), rows)))
+
+    key_modules = []
+    for _, path, doc, symbols in modules[:MAX_KEY_MODULES]:
+        line = f"- **`{path}`**" + (f": {doc}" if doc else "")
+        if symbols:
+            line += "\n  " + ", ".join(f"`{s}`" for s in symbols)
+        key_modules.append(line)
+    if key_modules:
+        sections.append(("Key Modules", "\n".join(key_modules)))
+
+    if repo.env:
+        rows = [
+            (f"`{name}`", f"`{default}`" if default else "", ", ".join(f"`{p}`" for p in paths[:3]))
+            for name, (default, paths) in sorted(repo.env.items())
+        ]
+        sections.append(("Configuration", _table(("Variable", "Default", "Read in"), rows)))
+
+    if repo.manifest_deps:
+        sections.append(("Dependencies", "\n".join(f"- `{dep}`" for dep in repo.manifest_deps)))
+    elif repo.imports:
+        deps = [f"- `{name}`" for name, _ in repo.imports.most_common(MAX_TABLE_ROWS)]
+        sections.append(("Dependencies", "Third-party packages imported by the code:\n\n" + "\n".join(deps)))
+    return sections
+
+
+def build_draft_readme(repo_url: str, chunks: Sequence[Dict[str, Any]]) -> str:
+    """A complete draft README.md for the indexed `chunks` of `repo_url`."""
+    name = repo_url.rstrip("/").rsplit("/", 1)[-1].removesuffix(".git") or repo_url
+    with timed("draft_readme"):
+        sections = draft_sections(repo_url, chunks)
+    toc = "\n".join(f"- [{title}](#{anchor(title)})" for title, _ in sections)
+    parts = [
+        f"# {name}",
+        f"> Draft README generated from the indexed code of {repo_url}, without a language model.",
+        f"## Table of Contents\n\n{toc}",
+    ]
+    parts.extend(f"## {title}\n\n{body}" for title, body in sections)
+    return "\n\n".join(parts) + "\n"
+
+
+_PROMPT_REPO_RE = re.compile(r"^Repository URL: (\S+)", re.M)
+_PROMPT_FILE_RE = re.compile(r"^### File: (.+?)\n\n```(\w*)\n(.*?)\n```$", re.M | re.S)
+_PROMPT_SECTION_RE = re.compile(r"^Section: (.+)$", re.M)
+# Draft sections that answer each generator.sections section
+_SECTION_SOURCES = {
+    "Project Overview": ("Overview",),
+    "Core Features": ("Key Modules", "API Endpoints"),
+    "Technology Foundation": ("Overview", "Dependencies"),
+    "Getting Started": ("Entry Points", "Configuration"),
+    "Developer Guide": ("Project Structure", "Key Modules"),
+    "API Documentation": ("API Endpoints",),
+    "Deployment Guide": ("Entry Points", "Configuration"),
+}
+
+
+class DraftReadmeClient:
+    """
+    MarkdownModelClient that answers with an extractive draft instead of calling a model.
+
+    The files are recovered from the "### File:" blocks of the prompt, so it
+    works behind every generation mode. Section prompts (generator.sections)
+    get the matching draft section, or an empty one.
+    """
+
+    model = DRAFT_MODEL
+
+    def generate_markdown(self, system_prompt: str, user_prompt: str) -> str:
+        repo = _PROMPT_REPO_RE.search(user_prompt)
+        repo_url = repo.group(1) if repo else "repository"
+        chunks = [
+            {"file_path": path, "content": content, "metadata": {"language": language}}
+            for path, language, content in _PROMPT_FILE_RE.findall(user_prompt)
+        ]
+        section = _PROMPT_SECTION_RE.search(system_prompt)
+        if section is None:
+            return build_draft_readme(repo_url, chunks)
+        bodies = dict(draft_sections(repo_url, chunks))
+        sources = _SECTION_SOURCES.get(section.group(1).strip(), ())
+        parts = [(title, bodies[title]) for title in sources if title in bodies]
+        if not parts:
+            return "_Nothing in the indexed code covers this section yet._"
+        # The section heading is the caller's; only the parts after the first need their own
+        return "\n\n".join([parts[0][1]] + [f"### {title}\n\n{body}" for title, body in parts[1:]])
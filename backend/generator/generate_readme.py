@@ -1,5 +1,14 @@
+import asyncio
+import hashlib
+import logging
 from typing import List, Dict, Protocol
 
+from services.metrics import timed
+from services.single_flight import SingleFlight
+from generator.context_packer import CONTEXT_TOKEN_BUDGET, ROLE_HEADERS, pack_context
+
+logger = logging.getLogger(__name__)
+
 class MarkdownModelClient(Protocol):
     def generate_markdown(self, system_prompt: str, user_prompt: str) -> str: ...
 
@@ -96,108 +105,55 @@ SYSTEM_PROMPT = (
 )
 
 
-def _format_context(chunks: List[Dict]) -> str:
+def _format_context(chunks: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    with timed("format_context"):
+        return _format_packed(chunks, token_budget)
+
+
+def _format_packed(chunks: List[Dict], token_budget: int) -> str:
     lines = []
-    total_size = 0
-    max_content_size = 3000  # Increased for more comprehensive analysis
-    max_chunks = 25  # Balanced for important context
-    
-    # Enhanced priority sorting with more nuanced categories
-    def chunk_priority(chunk):
-        path = chunk.get('file_path', '').lower()
-        content = chunk.get('content', '').lower()
-        score = 5  # Default priority
-        
-        # Core application files
-        if 'main.py' in path or 'app.js' in path:
-            score = 0
-        # Security-related files
-        elif any(term in path for term in ['auth', 'security', 'encrypt']):
-            score = 1
-        # API and routing files
-        elif any(term in path for term in ['routes', 'api', 'controller']):
-            score = 2
-        # Data model and schema files
-        elif any(term in path for term in ['model', 'schema', 'database']):
-            score = 3
-        # Healthcare-specific files
-        elif any(term in content for term in ['patient', 'doctor', 'medical', 'health']):
-            score = 4
-            
-        # Boost score for files with substantial documentation
-        if content.count('"""') > 1 or content.count('/**') > 1:
-            score -= 0.5
-        # Boost for files with type hints or interfaces
-        if any(term in content for term in ['type ', 'interface ', '@types']):
-            score -= 0.3
-            
-        return score
-    
-    # Sort chunks by priority score
-    sorted_chunks = sorted(chunks, key=chunk_priority)
-    
-    # Group related files together
-    grouped_chunks = []
-    current_group = []
-    current_type = None
-    
-    for c in sorted_chunks[:max_chunks]:
-        path = c.get('file_path', '')
-        content = c.get('content', '')
-        file_type = None
-        
-        if 'routes' in path or 'api' in path:
-            file_type = 'API'
-        elif 'model' in path or 'schema' in path:
-            file_type = 'Data Model'
-        elif 'auth' in path or 'security' in path:
-            file_type = 'Security'
-        
-        if file_type != current_type and current_group:
-            grouped_chunks.extend(current_group)
-            current_group = []
-        
-        current_type = file_type
-        current_group.append((path, content, file_type))
-    
-    grouped_chunks.extend(current_group)
-    
-    # Format chunks with section headers and contextual information
-    for path, content, file_type in grouped_chunks:
-        if total_size > 24000:  # Leave room for system prompt
-            break
-            
-        # Add section header if it's a categorized file
-        if file_type:
-            lines.append(f"\n### {file_type} Component")
-            
-        header = f"File: {path}"
-        content = c.get("content", "")
-        
-        # Truncate content if too long
-        if len(content) > max_content_size:
-            content = content[:max_content_size] + "\n... (truncated)\n"
-        
-        # Build code block
-        code_block = f"### {header}\n\n```{c.get('metadata', {}).get('language', '')}\n{content}\n```\n"
-        
-        # Check if adding this chunk would exceed reasonable size
-        if total_size + len(code_block) > 24000:  # Leave room for system prompt and other content
-            print(f"Truncating context at {len(lines)} chunks to stay within size limits")
-            break
-            
-        lines.append(code_block)
-        total_size += len(code_block)
-    
-    print(f"Formatted {len(lines)} chunks, total size: {total_size} characters")
+    total_tokens = 0
+    current_role = None
+
+    for packed in pack_context(chunks, token_budget=token_budget):
+        # Add section header when entering a categorized group of files
+        role = packed["role"]
+        if role != current_role and role in ROLE_HEADERS:
+            lines.append(f"\n### {ROLE_HEADERS[role]} Component")
+        current_role = role
+
+        content = packed["content"]
+        if packed["truncated"]:
+            content += "... (truncated)\n"
+        lines.append(f"### File: {packed['file_path']}\n\n```{packed['language']}\n{content}\n```\n")
+        total_tokens += packed["tokens"]
+
+    logger.info("Formatted %d context blocks, ~%d tokens", len(lines), total_tokens)
     return "\n\n".join(lines)
 
 
-async def generate_readme_markdown(client: MarkdownModelClient, repo_url: str, chunks: List[Dict]) -> str:
-    context = _format_context(chunks)
+# Identical in-flight generations (same client, same prompts) share one model call
+_generation_flight = SingleFlight()
+
+
+async def run_model(client: MarkdownModelClient, system_prompt: str, user_prompt: str) -> str:
+    digest = hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+    with timed("generate"):
+        return await _generation_flight.do(
+            (id(client), digest),
+            # Model clients are blocking; keep the event loop free for other requests.
+            # The thread cannot be cancelled: once sent, the request runs to completion
+            lambda: asyncio.to_thread(client.generate_markdown, system_prompt, user_prompt),
+        )
+
+
+async def generate_readme_markdown(
+    client: MarkdownModelClient, repo_url: str, chunks: List[Dict], token_budget: int = CONTEXT_TOKEN_BUDGET
+) -> str:
+    context = _format_context(chunks, token_budget=token_budget)
     user_prompt = (
         f"Repository URL: {repo_url}\n\n"
         f"Relevant code context (selected snippets):\n\n{context}\n\n"
         "Please produce a single complete README.md in Markdown."
     )
-    return client.generate_markdown(SYSTEM_PROMPT, user_prompt)
+    return await run_model(client, SYSTEM_PROMPT, user_prompt)
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+from services.chunk_features import estimate_tokens, get_chunk_features
+from generator.context_packer import CHUNK_OVERHEAD_TOKENS, CONTEXT_TOKEN_BUDGET, MAX_CHUNK_TOKENS, trim_to_tokens
+from generator.generate_readme import (
+    SYSTEM_PROMPT,
+    MarkdownModelClient,
+    _format_context,
+    generate_readme_markdown,
+    run_model,
+)
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of summarisation calls in flight at once
+MAP_CONCURRENCY = int(os.getenv("README_MAP_CONCURRENCY", "4"))
+# Safety net: stop reducing after this many levels and trim instead
+MAX_REDUCE_LEVELS = 6
+
+MAP_SYSTEM_PROMPT = (
+    "You are a senior engineer summarising one part of a larger software repository "
+    "so that another writer can produce the project's README. "
+    "Describe what this part does, its main modules, classes, functions and entry points, "
+    "configuration and environment variables, external services and notable dependencies. "
+    "Be factual and concise: use short Markdown bullet points, at most 300 words, "
+    "and do not write a README yourself."
+)
+
+REDUCE_SYSTEM_PROMPT = (
+    "You are a senior engineer merging summaries of several parts of a software repository "
+    "into one summary of the combined area, for another writer who will produce the README. "
+    "Keep every entry point, API, configuration option and integration that is mentioned, "
+    "drop repetition, and answer in short Markdown bullet points, at most 400 words."
+)
+
+Item = Tuple[str, int, Any]  # (relative path, token cost, payload)
+
+
+def _relative_paths(chunks: Sequence[Dict[str, Any]]) -> List[str]:
+    paths = [c.get("file_path", "") for c in chunks]
+    dirs = [os.path.dirname(p) for p in paths if p]
+    try:
+        root = os.path.commonpath(dirs) if dirs else ""
+    except ValueError:  # mix of absolute and relative paths
+        root = ""
+    return [os.path.relpath(p, root).replace("\\", "/") if root and p else p for p in paths]
+
+
+def _pack_sequential(items: Sequence[Item], budget: int) -> List[List[Item]]:
+    bins: List[List[Item]] = []
+    current: List[Item] = []
+    used = 0
+    for item in items:
+        if current and used + item[1] > budget:
+            bins.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += item[1]
+    if current:
+        bins.append(current)
+    return bins
+
+
+def partition_by_directory(items: Sequence[Item], budget: int, depth: int = 0) -> List[List[Item]]:
+    """
+    Split items into groups of at most `budget` tokens following the directory tree.
+
+    A directory whose whole subtree fits becomes one group; larger ones are split
+    into their subdirectories. Adjacent small groups are then merged back
+    together, so the number of groups (the fan-out) tracks repository size.
+    """
+    if sum(cost for _, cost, _ in items) <= budget:
+        return [list(items)] if items else []
+
+    files_here: List[Item] = []
+    subdirs: Dict[str, List[Item]] = {}
+    for item in items:
+        parts = item[0].split("/")
+        if len(parts) <= depth + 1:
+            files_here.append(item)
+        else:
+            subdirs.setdefault(parts[depth], []).append(item)
+
+    groups = _pack_sequential(files_here, budget)
+    for name in sorted(subdirs):
+        groups.extend(partition_by_directory(subdirs[name], budget, depth + 1))
+
+    merged: List[List[Item]] = []
+    for group in groups:
+        if merged and sum(c for _, c, _ in merged[-1]) + sum(c for _, c, _ in group) <= budget:
+            merged[-1].extend(group)
+        else:
+            merged.append(group)
+    return merged
+
+
+ROOT_LABEL = "(repository root)"
+
+
+def _common_label(dirs: Sequence[str]) -> str:
+    dirs = [d for d in dirs if d != ROOT_LABEL]
+    try:
+        label = os.path.commonpath(dirs) if dirs else ""
+    except ValueError:
+        label = ""
+    return label or ROOT_LABEL
+
+
+def fit_summaries(summaries: Sequence[Tuple[str, str]], budget: int) -> List[str]:
+    """
+    `### label` sections for (label, summary) pairs, within about `budget` tokens.
+
+    When they do not all fit, every summary is trimmed to an equal share of the
+    budget rather than dropping the ones that come last.
+    """
+    total = sum(estimate_tokens(summary) for _, summary in summaries)
+    if total > budget and summaries:
+        share = max(64, budget // len(summaries))
+        logger.warning(
+            "%d summaries (%d tokens) exceed the %d-token budget, trimming each to %d tokens",
+            len(summaries), total, budget, share,
+        )
+        summaries = [(label, trim_to_tokens(summary, share)[0]) for label, summary in summaries]
+    return [f"### {label}\n\n{summary}" for label, summary in summaries]
+
+
+async def generate_readme_hierarchical(
+    client: MarkdownModelClient,
+    repo_url: str,
+    chunks: List[Dict[str, Any]],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    concurrency: int = MAP_CONCURRENCY,
+) -> str:
+    """
+    Map-reduce README generation for repositories larger than one prompt.
+
+    Map: every directory group (at most `token_budget` tokens of code) is
+    summarised in parallel. Reduce: summaries are merged level by level, again
+    in budget-sized groups, until they fit in the final README prompt. Each
+    level runs concurrently (bounded by `concurrency`), so wall-clock time
+    grows with the number of levels rather than with the repository size.
+    """
+    rel_paths = _relative_paths(chunks)
+    items: List[Item] = []
+    for path, chunk in zip(rel_paths, chunks):
+        tokens = get_chunk_features(chunk)["tokens"]
+        items.append((path, min(tokens, MAX_CHUNK_TOKENS) + CHUNK_OVERHEAD_TOKENS, chunk))
+    items.sort(key=lambda item: item[0])
+
+    if sum(cost for _, cost, _ in items) <= token_budget:
+        return await generate_readme_markdown(client, repo_url, chunks, token_budget=token_budget)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def call(system_prompt: str, user_prompt: str) -> str:
+        async with semaphore:
+            return await run_model(client, system_prompt, user_prompt)
+
+    groups = partition_by_directory(items, token_budget)
+    logger.info("Map step: summarising %d groups of %d chunks", len(groups), len(items))
+
+    async def summarise(group: List[Item]) -> Item:
+        label = _common_label([os.path.dirname(path) for path, _, _ in group])
+        context = _format_context([chunk for _, _, chunk in group], token_budget=token_budget)
+        summary = await call(
+            MAP_SYSTEM_PROMPT,
+            f"Repository URL: {repo_url}\nPart: {label}\n\nCode:\n\n{context}",
+        )
+        return (label, estimate_tokens(summary), summary)
+
+    summaries = list(await asyncio.gather(*(summarise(g) for g in groups)))
+
+    level = 0
+    while len(summaries) > 1 and sum(cost for _, cost, _ in summaries) > token_budget:
+        level += 1
+        groups = _pack_sequential(summaries, token_budget)
+        if level > MAX_REDUCE_LEVELS or len(groups) == len(summaries):
+            # Summaries are not shrinking; trim what is left to fit instead
+            logger.warning("Reduce step stalled at level %d, trimming summaries", level)
+            break
+        logger.info("Reduce level %d: merging %d summaries into %d", level, len(summaries), len(groups))
+
+        async def reduce(group: List[Item]) -> Item:
+            label = _common_label([path for path, _, _ in group])
+            body = "\n\n".join(f"## {path}\n\n{summary}" for path, _, summary in group)
+            summary = await call(REDUCE_SYSTEM_PROMPT, f"Repository URL: {repo_url}\n\nSummaries:\n\n{body}")
+            return (label, estimate_tokens(summary), summary)
+
+        summaries = list(await asyncio.gather(*(reduce(g) for g in groups)))
+
+    sections = fit_summaries([(path, summary) for path, _, summary in summaries], token_budget)
+    user_prompt = (
+        f"Repository URL: {repo_url}\n\n"
+        "Summaries of the repository's parts:\n\n" + "\n\n".join(sections) + "\n\n"
+        "Please produce a single complete README.md in Markdown."
+    )
+    return await run_model(client, SYSTEM_PROMPT, user_prompt)
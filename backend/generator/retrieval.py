@@ -0,0 +1,112 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.embedding_store import EmbeddingStore
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# One retrieval query per README section, so every section gets some evidence
+SECTION_QUERIES: Dict[str, str] = {
+    "overview": "project overview purpose main entry point application",
+    "architecture": "architecture components modules services data flow",
+    "setup": "installation setup configuration environment variables settings",
+    "usage": "usage example command line interface main function",
+    "api": "api endpoints routes request response handlers",
+    "data": "database schema models tables storage",
+    "security": "authentication authorization security tokens permissions",
+    "deployment": "deployment docker build ci pipeline infrastructure",
+    "testing": "tests test cases fixtures assertions",
+}
+
+# 1.0 ranks purely by relevance, 0.0 purely by novelty
+MMR_LAMBDA = float(os.getenv("README_MMR_LAMBDA", "0.6"))
+MAX_CHUNKS_PER_FILE = int(os.getenv("README_MAX_CHUNKS_PER_FILE", "2"))
+
+
+def mmr_select(
+    candidates: List[Dict[str, Any]],
+    k: int,
+    lambda_: float = MMR_LAMBDA,
+    max_per_file: int = MAX_CHUNKS_PER_FILE,
+) -> List[Dict[str, Any]]:
+    """
+    Maximal Marginal Relevance over candidates carrying "similarity" and "embedding".
+
+    Each step picks argmax(lambda * relevance - (1 - lambda) * max cosine to the
+    picks so far), skipping files that already have `max_per_file` picks. The
+    pairwise similarities are one matrix product; each step is a vector update.
+    """
+    if not candidates or k <= 0:
+        return []
+    relevance = np.array([float(c.get("similarity") or 0.0) for c in candidates], dtype=np.float32)
+    dims = {len(c["embedding"]) for c in candidates if c.get("embedding") is not None}
+    dim = max(dims) if dims else 1
+    vectors = np.zeros((len(candidates), dim), dtype=np.float32)
+    for i, c in enumerate(candidates):
+        if c.get("embedding") is not None and len(c["embedding"]) == dim:
+            vectors[i] = c["embedding"]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-8)
+    pairwise = vectors @ vectors.T
+
+    paths = [c.get("file_path", "") for c in candidates]
+    per_file: Dict[str, int] = {}
+    available = np.ones(len(candidates), dtype=bool)
+    max_sim = np.zeros(len(candidates), dtype=np.float32)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        scores = lambda_ * relevance - (1.0 - lambda_) * max_sim
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        path = paths[best]
+        if per_file.get(path, 0) >= max_per_file:
+            continue
+        per_file[path] = per_file.get(path, 0) + 1
+        selected.append(best)
+        np.maximum(max_sim, pairwise[best], out=max_sim)
+    return [candidates[i] for i in selected]
+
+
+async def retrieve_sections(
+    store: EmbeddingStore,
+    repo_url: str,
+    top_k: int = 80,
+    per_query_k: Optional[int] = None,
+    queries: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Retrieve README context with one query per section, merged and diversified with MMR.
+
+    All queries are embedded in one batch and searched concurrently. Chunks found
+    by several queries keep their best similarity and list the sections in
+    "sections". Embeddings are dropped from the returned chunks.
+    """
+    queries = queries or SECTION_QUERIES
+    # A pool a few times larger than top_k leaves MMR room to trade relevance for coverage
+    per_query_k = per_query_k or max(20, 3 * top_k // len(queries))
+    results = await store.search_many(repo_url, list(queries.values()), top_k=per_query_k, include_embeddings=True)
+
+    with timed("rerank"):
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for section, rows in zip(queries, results):
+            for row in rows:
+                key = row.get("id") or (row.get("file_path"), row.get("content"))
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = current = dict(row, sections=[])
+                elif float(row.get("similarity") or 0.0) > float(current.get("similarity") or 0.0):
+                    current["similarity"] = row["similarity"]
+                current["sections"].append(section)
+        selected = mmr_select(list(merged.values()), top_k)
+
+    covered = {section for chunk in selected for section in chunk["sections"]}
+    logger.info(
+        "Section retrieval: %d candidates, %d selected, %d/%d sections covered",
+        len(merged), len(selected), len(covered), len(queries),
+    )
+    return [{k: v for k, v in chunk.items() if k != "embedding"} for chunk in selected]
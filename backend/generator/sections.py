@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+from services.metrics import timed
+from generator.generate_readme import MarkdownModelClient, _format_context, run_model
+from generator.map_reduce import _relative_paths
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of section calls in flight at once; the default runs every section together
+SECTION_CONCURRENCY = int(os.getenv("README_SECTION_CONCURRENCY", "12"))
+# Code context per section prompt, in (estimated) tokens
+SECTION_TOKEN_BUDGET = int(os.getenv("README_SECTION_CONTEXT_TOKENS", "2000"))
+# Paths listed in the repository outline every section prompt starts with
+OUTLINE_MAX_FILES = 60
+
+
+class ReadmeSection(NamedTuple):
+    key: str
+    title: str
+    # What the section covers; the whole of its system prompt besides the shared preamble
+    instructions: str
+    # retrieval.SECTION_QUERIES keys whose chunks are relevant to this section
+    queries: Tuple[str, ...]
+
+
+# The sections of SYSTEM_PROMPT, each small enough to be written in one short decode
+README_SECTIONS: List[ReadmeSection] = [
+    ReadmeSection(
+        "overview", "Project Overview",
+        "An executive summary: what the project is for, the problem it solves and how, "
+        "who it is for, and what sets it apart.",
+        ("overview", "architecture"),
+    ),
+    ReadmeSection(
+        "features", "Core Features",
+        "The features the code actually implements, as a list or table with a one-line "
+        "explanation each, and the main use cases.",
+        ("overview", "usage", "api"),
+    ),
+    ReadmeSection(
+        "technology", "Technology Foundation",
+        "The technology stack, the main components and how they interact (a Mermaid diagram "
+        "where it helps), the data model and data flow, and external service integrations.",
+        ("architecture", "data"),
+    ),
+    ReadmeSection(
+        "getting_started", "Getting Started",
+        "Prerequisites, step-by-step installation, configuration and environment variables, "
+        "and a quick-start example with exact commands.",
+        ("setup", "usage"),
+    ),
+    ReadmeSection(
+        "developer_guide", "Developer Guide",
+        "The project structure, code organisation and patterns, the development setup and "
+        "how tests are run.",
+        ("architecture", "testing"),
+    ),
+    ReadmeSection(
+        "api", "API Documentation",
+        "The API endpoints or public interfaces with example requests and responses, "
+        "authentication and error handling.",
+        ("api",),
+    ),
+    ReadmeSection(
+        "security", "Security & Compliance",
+        "Authentication, authorisation, data protection and secrets handling as implemented, "
+        "and healthcare compliance considerations (HIPAA) where relevant.",
+        ("security",),
+    ),
+    ReadmeSection(
+        "deployment", "Deployment Guide",
+        "Infrastructure requirements, building and deploying for each environment, "
+        "configuration management, monitoring and logging.",
+        ("deployment", "setup"),
+    ),
+    ReadmeSection(
+        "contributing", "Contributing",
+        "How to contribute: workflow, branches, code style and review, based on the tooling "
+        "the repository uses.",
+        ("testing", "deployment"),
+    ),
+    ReadmeSection(
+        "roadmap", "Roadmap & Vision",
+        "The current state of the project, known limitations visible in the code, and "
+        "sensible next steps.",
+        ("overview",),
+    ),
+    ReadmeSection(
+        "license", "Legal & Licensing",
+        "The license if one is evident, third-party dependencies and their licenses, and "
+        "usage restrictions; say so plainly when no license is present.",
+        ("setup",),
+    ),
+]
+
+SECTION_SYSTEM_PROMPT = (
+    "You are an expert technical documentation writer writing one section of a README.md "
+    "for a repository; other writers produce the other sections in parallel. "
+    "Write only the section's body in Markdown: no top-level title, no heading for the section "
+    "itself (use ### for subsections), no table of contents and no content belonging to other "
+    "sections. Base every statement on the code provided, use tables and fenced code blocks "
+    "where they help, and keep it under 400 words.\n\n"
+    "Section: {title}\n"
+    "Cover: {instructions}"
+)
+
+_LEADING_HEADING_RE = re.compile(r"^\s*#{1,6}\s+[^\n]*\n+")
+
+
+def anchor(title: str) -> str:
+    """GitHub-style heading anchor."""
+    slug = re.sub(r"[^\w\- ]", "", title.strip().lower())
+    return slug.replace(" ", "-")
+
+
+def _repository_outline(chunks: Sequence[Dict[str, Any]]) -> str:
+    paths = sorted(set(_relative_paths(chunks)))
+    lines = [f"- {path}" for path in paths[:OUTLINE_MAX_FILES]]
+    if len(paths) > OUTLINE_MAX_FILES:
+        lines.append(f"- ... and {len(paths) - OUTLINE_MAX_FILES} more files")
+    return "\n".join(lines)
+
+
+def section_chunks(section: ReadmeSection, chunks: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The chunks relevant to `section`: those retrieved for one of its queries.
+
+    Chunks without "sections" (retrieved with a single query) count as relevant
+    to every section, and so does everything when none matched, leaving the
+    choice to the context packer.
+    """
+    wanted = set(section.queries)
+    relevant = [c for c in chunks if "sections" not in c or wanted.intersection(c["sections"])]
+    return relevant or list(chunks)
+
+
+def _clean_section(markdown: str) -> str:
+    # Models tend to repeat the section's heading despite being asked not to
+    return _LEADING_HEADING_RE.sub("", markdown.strip(), count=1).strip()
+
+
+def stitch_sections(repo_url: str, bodies: Sequence[Tuple[ReadmeSection, str]]) -> str:
+    """Join section bodies in order under a title and a table of contents."""
+    name = repo_url.rstrip("/").rsplit("/", 1)[-1].removesuffix(".git") or repo_url
+    toc = "\n".join(f"- [{section.title}](#{anchor(section.title)})" for section, _ in bodies)
+    parts = [f"# {name}", f"## Table of Contents\n\n{toc}"]
+    parts.extend(f"## {section.title}\n\n{body}" for section, body in bodies)
+    return "\n\n".join(parts) + "\n"
+
+
+async def generate_readme_sections(
+    client: MarkdownModelClient,
+    repo_url: str,
+    chunks: List[Dict[str, Any]],
+    sections: Sequence[ReadmeSection] = README_SECTIONS,
+    token_budget: int = SECTION_TOKEN_BUDGET,
+    concurrency: int = SECTION_CONCURRENCY,
+) -> str:
+    """
+    Generate every README section concurrently, each from its own small prompt.
+
+    A section's prompt holds its instructions, a short outline of the repository
+    and only the chunks retrieved for it, packed into `token_budget`. Sections
+    are decoded in parallel (bounded by `concurrency`), so wall-clock time is
+    about that of the slowest section instead of one long README-sized decode.
+    """
+    outline = _repository_outline(chunks)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def write(section: ReadmeSection) -> Tuple[ReadmeSection, str]:
+        relevant = section_chunks(section, chunks)
+        context = _format_context(relevant, token_budget=token_budget)
+        system_prompt = SECTION_SYSTEM_PROMPT.format(title=section.title, instructions=section.instructions)
+        user_prompt = (
+            f"Repository URL: {repo_url}\n\n"
+            f"Repository files:\n{outline}\n\n"
+            f"Relevant code context:\n\n{context}\n\n"
+            f"Write the \"{section.title}\" section."
+        )
+        async with semaphore:
+            body = await run_model(client, system_prompt, user_prompt)
+        return section, _clean_section(body)
+
+    logger.info(
+        "Generating %d README sections from %d chunks (concurrency %d)", len(sections), len(chunks), concurrency
+    )
+    with timed("generate_sections"):
+        bodies = await asyncio.gather(*(write(section) for section in sections))
+    return stitch_sections(repo_url, bodies)
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.chunk_features import estimate_tokens, get_chunk_features
+from services.summary_cache import SummaryCache, content_hash
+from generator.context_packer import CONTEXT_TOKEN_BUDGET, MAX_CHUNK_TOKENS, ROLE_ORDER, trim_to_tokens
+from generator.generate_readme import SYSTEM_PROMPT, MarkdownModelClient, run_model
+from generator.map_reduce import (
+    MAP_CONCURRENCY,
+    REDUCE_SYSTEM_PROMPT,
+    _relative_paths,
+    fit_summaries,
+    partition_by_directory,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump these whenever the corresponding prompt (or heuristic) changes so that
+# stale summaries stop matching
+FILE_PROMPT_VERSION = "file-v2"
+MODULE_PROMPT_VERSION = "module-v2"
+HEURISTIC_MODEL = "heuristic"
+
+# 'llm' summarises changed files with the model, 'heuristic' extracts them locally
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "llm").lower()
+
+FILE_SYSTEM_PROMPT = (
+    "You are a senior engineer summarising a single source file for someone who will write "
+    "the project's README. State the file's purpose, its public classes, functions or endpoints, "
+    "configuration it reads and services it talks to. "
+    "Do not mention the file's name or path; it is shown next to your summary. "
+    "Answer in at most 5 short Markdown bullet points."
+)
+
+_DEFINITION_RE = re.compile(
+    r"^\s*(?:async def |def |class |export |function |func |fn |pub fn |interface |type |public |@app\.|@router\.)"
+)
+_DOCSTRING_RE = re.compile(r'^\s*(?:"""|\'\'\'|/\*\*)\s*(.*?)\s*(?:"""|\'\'\'|\*/)?\s*$')
+
+
+def model_name(client: Optional[MarkdownModelClient]) -> str:
+    if client is None:
+        return HEURISTIC_MODEL
+    return f"{type(client).__name__}:{getattr(client, 'model', '')}"
+
+
+def heuristic_summary(content: str, max_lines: int = 12) -> str:
+    """Summarise a file without a model: leading docstring plus its definitions."""
+    lines = content.splitlines()
+    parts = [f"- {len(lines)} lines"]
+    for line in lines[:5]:
+        match = _DOCSTRING_RE.match(line)
+        if match and match.group(1):
+            parts.append(f"- {match.group(1)}")
+            break
+    definitions = [line.strip().rstrip(":{").strip() for line in lines if _DEFINITION_RE.match(line)]
+    for definition in definitions[:max_lines]:
+        parts.append(f"  - `{definition[:160]}`")
+    if len(definitions) > max_lines:
+        parts.append(f"  - ... and {len(definitions) - max_lines} more definitions")
+    return "\n".join(parts)
+
+
+async def _summarise_missing(
+    client: Optional[MarkdownModelClient],
+    cache: SummaryCache,
+    prompt_version: str,
+    wanted: Dict[str, Tuple[str, str]],
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, str]:
+    """
+    Resolve summaries for {hash: (label, user_prompt or raw content)}, calling the model only on misses.
+
+    Summaries are cached by hash alone, so the prompt (or content) must not mention
+    anything the hash does not cover, such as the file's path or the repository.
+    Fresh summaries are stored even when others in the batch fail.
+    """
+    model = model_name(client)
+    summaries = await asyncio.to_thread(cache.get_many, wanted.keys(), model, prompt_version)
+    missing = [h for h in wanted if h not in summaries]
+    logger.info("Summary cache (%s): %d hits, %d misses", prompt_version, len(wanted) - len(missing), len(missing))
+    if not missing:
+        return summaries
+
+    system_prompt = FILE_SYSTEM_PROMPT if prompt_version == FILE_PROMPT_VERSION else REDUCE_SYSTEM_PROMPT
+
+    async def summarise(h: str) -> Tuple[str, str]:
+        label, body = wanted[h]
+        if client is None:
+            return h, heuristic_summary(body)
+        async with semaphore:
+            return h, await run_model(client, system_prompt, body)
+
+    results = await asyncio.gather(*(summarise(h) for h in missing), return_exceptions=True)
+    fresh = [result for result in results if not isinstance(result, BaseException)]
+    if fresh:
+        await asyncio.to_thread(cache.put_many, fresh, model, prompt_version)
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("%d of %d summaries failed; %d were cached", len(results) - len(fresh), len(results), len(fresh))
+            raise result
+    summaries.update(fresh)
+    return summaries
+
+
+async def generate_readme_from_summaries(
+    client: MarkdownModelClient,
+    repo_url: str,
+    chunks: List[Dict[str, Any]],
+    cache: SummaryCache,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    concurrency: int = MAP_CONCURRENCY,
+) -> str:
+    """
+    Build the README prompt from cached per-file (and, if needed, per-module) summaries.
+
+    Only files whose content changed since a previous run are summarised again,
+    so regenerating after a small commit costs a handful of model calls plus
+    the final README call.
+    """
+    summariser = None if SUMMARY_MODE == "heuristic" else client
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    paths = _relative_paths(chunks)
+
+    files: List[Tuple[str, str, Dict[str, Any]]] = []
+    wanted: Dict[str, Tuple[str, str]] = {}
+    for path, chunk in zip(paths, chunks):
+        content = chunk.get("content", "")
+        h = content_hash(content)
+        files.append((path, h, chunk))
+        if h not in wanted:
+            if summariser is None:
+                wanted[h] = (path, content)
+            else:
+                body, _ = trim_to_tokens(content, MAX_CHUNK_TOKENS * 4)
+                # Content only: the same file elsewhere (a fork, a copy, a rename) shares the summary
+                wanted[h] = (path, f"Source file:\n\n```\n{body}\n```")
+
+    file_summaries = await _summarise_missing(summariser, cache, FILE_PROMPT_VERSION, wanted, semaphore)
+
+    role_rank = {role: i for i, role in enumerate(ROLE_ORDER)}
+    files.sort(key=lambda f: (role_rank.get(get_chunk_features(f[2])["role"], len(ROLE_ORDER)), f[0]))
+    items = [(path, estimate_tokens(file_summaries[h]), (path, h)) for path, h, _ in files]
+
+    if sum(cost for _, cost, _ in items) <= token_budget:
+        sections = [f"### {path}\n\n{file_summaries[h]}" for path, h, _ in files]
+    else:
+        # Too many files for one prompt: fold them into per-directory module summaries,
+        # keyed by the hashes of their member files so unchanged modules stay cached
+        items.sort(key=lambda item: item[0])
+        groups = partition_by_directory(items, token_budget)
+        modules: List[Tuple[str, str]] = []
+        wanted = {}
+        for group in groups:
+            label = os.path.commonpath([os.path.dirname(p) for p, _, _ in group]) or "(repository root)"
+            key = content_hash("\n".join(f"{p}:{h}" for p, _, (_, h) in group))
+            modules.append((label, key))
+            # The key covers the member paths, so module prompts may name them (but not the repository)
+            if summariser is None:
+                wanted[key] = (label, "\n".join(f"- `{p}`\n{file_summaries[h]}" for p, _, (_, h) in group))
+            else:
+                body = "\n\n".join(f"## {p}\n\n{file_summaries[h]}" for p, _, (_, h) in group)
+                wanted[key] = (label, f"Module: {label}\n\nSummaries:\n\n{body}")
+        if summariser is None:
+            # Heuristic module summary: the member summaries, trimmed to a fair share of the budget
+            share = max(64, token_budget // max(1, len(groups)))
+            module_summaries = {key: trim_to_tokens(body, share)[0] for key, (_, body) in wanted.items()}
+        else:
+            module_summaries = await _summarise_missing(summariser, cache, MODULE_PROMPT_VERSION, wanted, semaphore)
+
+        sections = fit_summaries([(label, module_summaries[key]) for label, key in modules], token_budget)
+
+    user_prompt = (
+        f"Repository URL: {repo_url}\n\n"
+        "Summaries of the repository's files and modules:\n\n" + "\n\n".join(sections) + "\n\n"
+        "Please produce a single complete README.md in Markdown."
+    )
+    return await run_model(client, SYSTEM_PROMPT, user_prompt)
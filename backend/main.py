@@ -1,18 +1,75 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import pathlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Literal, Optional, TypeVar
+
+import orjson
 
 from services.embedding_store import EmbeddingStore
 from services.supabase_client import SupabaseClient
 from services.perplexity_client import PerplexityClient
+from services.summary_cache import SummaryCache, content_hash
+from services.readme_history import ReadmeHistory
+from services import profiling
+from services.compression import CompressionMiddleware
+from services.metrics import (
+    HTTP_REQUEST_SECONDS,
+    REGISTRY,
+    end_request_timings,
+    server_timing_header,
+    start_request_timings,
+)
 from parser.extract_code import parse_repository
+from parser.bulk_index import BATCH_ID_RE, BulkIndexer, BulkIndexState, state_path
 from generator.generate_readme import generate_readme_markdown
+from generator.map_reduce import generate_readme_hierarchical
+from generator.summaries import generate_readme_from_summaries
+from generator.sections import generate_readme_sections
+from generator.draft import build_draft_readme
+from generator.retrieval import retrieve_sections
 
 load_dotenv()  # Load environment variables from .env file
 
-app = FastAPI(title="AutoDoc.AI API", version="0.1.0")
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("autodoc")
+
+# Threads for asyncio.to_thread work. Most of it waits on the network (model
+# calls, Supabase), so the default min(32, cpus + 4) would serialise e.g. the
+# concurrent section calls of one README on a small machine
+BLOCKING_THREADS = int(os.getenv("BLOCKING_THREADS", "32"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="blocking")
+    )
+    yield
+    # Interrupted batches keep their state file and resume when resubmitted
+    for task in list(_bulk_tasks.values()):
+        task.cancel()
+    # Close pooled database connections (SEARCH_BACKEND=postgres)
+    if _store is not None:
+        await _store.close()
+
+
+app = FastAPI(
+    title="AutoDoc.AI API", version="0.1.0", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 origins = [
     "http://localhost:3000",
@@ -25,28 +82,107 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser read per-stage timings and README ETags on cross-origin calls
+    expose_headers=["Server-Timing", "ETag"],
 )
+# br/gzip by Accept-Encoding; streamed (NDJSON) bodies are flushed chunk by chunk
+app.add_middleware(CompressionMiddleware)
+
+
+@app.middleware("http")
+async def stage_timing(request: Request, call_next):
+    """Collect per-request stage timings and report them in a Server-Timing header."""
+    timings, token = start_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        timings["total"] = time.perf_counter() - start
+        response.headers["Server-Timing"] = server_timing_header(timings)
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, path=path, status=str(status))
+        end_request_timings(token)
+
+
+@app.middleware("http")
+async def request_profiling(request: Request, call_next):
+    """Opt-in sampling profiler: by header (PROFILE_TOKEN) or at PROFILE_SAMPLE_RATE."""
+    if request.url.path.startswith("/admin/") or not profiling.should_profile(
+        request.headers.get(profiling.PROFILE_HEADER)
+    ):
+        return await call_next(request)
+    profile_id = profiling.start_profile()
+    try:
+        response = await call_next(request)
+    finally:
+        name = await asyncio.to_thread(profiling.finish_profile, profile_id, f"{request.method}-{request.url.path}")
+        logger.info("Stored profile %s", name)
+    response.headers["X-Autodoc-Profile-Id"] = name
+    return response
 
 
 class RepoRequest(BaseModel):
     repo_url: HttpUrl
     force_reparse: Optional[bool] = False
+    # Only ingest this directory of the repository (monorepos)
+    subdir: Optional[str] = None
+
+
+SearchField = Literal["id", "repo_url", "file_path", "content", "metadata", "similarity"]
+
+
+class BulkIndexRequest(BaseModel):
+    repo_urls: List[HttpUrl]
+    # Reuse an id to resume an interrupted batch; repositories already done are skipped
+    batch_id: Optional[str] = None
+    subdir: Optional[str] = None
+    retry_failed: bool = True
 
 
 class SearchRequest(BaseModel):
     repo_url: HttpUrl
     query: str
     top_k: int = 20
+    # Only return these fields of each result (e.g. leave out "content")
+    fields: Optional[List[SearchField]] = None
+    # 'json': one {"ok", "results"} document; 'ndjson': one result per line, streamed
+    format: Literal["json", "ndjson"] = "json"
+
+
+class ProfilingRequest(BaseModel):
+    sample_rate: float
 
 
 class GenerateRequest(BaseModel):
     repo_url: HttpUrl
     top_k: int = 80
+    # 'single': one prompt from the top_k retrieved chunks
+    # 'hierarchical': map-reduce over every indexed chunk, for large repositories
+    # 'summaries': README from cached per-file summaries; only changed files are summarised
+    # 'sections': every README section generated concurrently from its own small prompt
+    # 'draft': extractive README from the indexed code alone; no model call, no API key needed
+    mode: Literal["single", "hierarchical", "summaries", "sections", "draft"] = "single"
+    # How 'single' mode picks its chunks: 'query': one generic query;
+    # 'sections': one query per README section, diversified with MMR ('sections' mode always uses it)
+    retrieval: Literal["query", "sections"] = "query"
+
 
+T = TypeVar("T")
+
+# How often a long-running handler checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
 
 _store = None
 _supabase_client = None
 _perplexity = None
+_summary_cache = None
+_readme_history = None
+# batch id -> running bulk index task
+_bulk_tasks: Dict[str, "asyncio.Task[Any]"] = {}
 
 
 def get_store():
@@ -70,53 +206,295 @@ def get_perplexity():
     return _perplexity
 
 
+def get_summary_cache():
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SummaryCache()
+    return _summary_cache
+
+
+def get_readme_history():
+    global _readme_history
+    if _readme_history is None:
+        _readme_history = ReadmeHistory(get_supabase())
+    return _readme_history
+
+
+def _context_hash(req: GenerateRequest, chunks) -> str:
+    """Identifies what a README was generated from: the mode and the chunks fed to it."""
+    parts = [req.mode, req.retrieval]
+    parts.extend(sorted(f"{c.get('file_path')}\0{content_hash(c.get('content') or '')}" for c in chunks))
+    return content_hash("\n".join(parts))
+
+
+def _etag(meta) -> str:
+    # Weak: CompressionMiddleware serves the same README as identity, gzip or br,
+    # and those bytes differ; a strong validator would claim they are identical
+    return f'W/"{meta["content_sha256"]}"'
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable`, cancelling it if the client disconnects first.
+
+    Coalesced work (see services.single_flight) is only cancelled once every
+    request waiting on it has gone away. This frees the request's task, its
+    remaining steps and the event loop. It does not stop a blocking call already
+    running in a thread: a model request in progress (run_model) still
+    completes upstream and is billed, and only its result is dropped.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling request")
+                task.cancel()
+                # 499: client closed request (nginx convention); nobody will read it
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/parse_repo")
 async def parse_repo(req: RepoRequest):
     try:
-        print(f"Attempting to parse {req.repo_url}")
-        chunks = await parse_repository(str(req.repo_url), force_reparse=req.force_reparse)
+        logger.info("Attempting to parse %s", req.repo_url)
+        triage, graph = {}, {}
+        chunks = await parse_repository(
+            str(req.repo_url), force_reparse=req.force_reparse, subdir=req.subdir, triage_report=triage,
+            symbol_graph=graph,
+        )
         if chunks:
-            await get_store().index_chunks(chunks)
-        print(f"Successfully parsed {len(chunks)} chunks.")
-        return {"ok": True, "num_chunks": len(chunks)}
+            await get_store().index_chunks(chunks, symbol_graph=graph)
+        logger.info("Successfully parsed %d chunks", len(chunks))
+        # Cap the per-file list; the counts by reason cover the rest
+        triage["skipped"] = triage.get("skipped", [])[:200]
+        return {"ok": True, "num_chunks": len(chunks), "triage": triage}
     except Exception as e:
-        print(f"Error parsing repository: {e}")  # Log the actual error
+        logger.exception("Error parsing repository: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to parse repository: {e}")
 
 
+# Results serialised per write of a streamed NDJSON response
+NDJSON_BATCH_SIZE = 16
+
+
+def _project(results: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if fields is None:
+        return results
+    return [{f: r[f] for f in fields if f in r} for r in results]
+
+
+async def _ndjson_lines(results: List[Dict[str, Any]], fields: Optional[List[str]]) -> AsyncIterator[bytes]:
+    # Framing only: the search has already returned every result (they are top_k-capped
+    # and go through the search cache), so this does not lower time-to-first-byte or peak memory
+    for start in range(0, len(results), NDJSON_BATCH_SIZE):
+        batch = _project(results[start:start + NDJSON_BATCH_SIZE], fields)
+        yield b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in batch)
+        # Let other requests run between batches of a large result set
+        await asyncio.sleep(0)
+
+
+def _log_bulk_failure(task: "asyncio.Task[Any]") -> None:
+    # Per-repo failures are recorded in the state; this is for the batch itself
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Bulk index task failed: %s", task.exception())
+
+
+def _forget_bulk_task(batch_id: str, task: "asyncio.Task[Any]") -> None:
+    # Finished batches are reported from their state file alone
+    if _bulk_tasks.get(batch_id) is task:
+        del _bulk_tasks[batch_id]
+
+
+@app.post("/bulk_index")
+async def bulk_index(req: BulkIndexRequest):
+    """Start (or resume) indexing a batch of repositories in the background; poll GET /bulk_index/{batch_id}."""
+    batch_id = req.batch_id or uuid.uuid4().hex[:12]
+    if not BATCH_ID_RE.match(batch_id):
+        raise HTTPException(status_code=422, detail="batch_id must match [A-Za-z0-9_-]{1,64}")
+    running = _bulk_tasks.get(batch_id)
+    if running is not None and not running.done():
+        raise HTTPException(status_code=409, detail=f"Batch {batch_id} is already running")
+    state = await asyncio.to_thread(
+        BulkIndexState.load_or_create,
+        state_path(batch_id), batch_id, [str(u) for u in req.repo_urls],
+        {"subdir": req.subdir} if req.subdir else {}, req.retry_failed,
+    )
+    task = asyncio.create_task(BulkIndexer(get_store()).run(state))
+    _bulk_tasks[batch_id] = task
+    task.add_done_callback(_log_bulk_failure)
+    task.add_done_callback(functools.partial(_forget_bulk_task, batch_id))
+    return {"ok": True, "batch_id": batch_id, "summary": state.summary()}
+
+
+@app.get("/bulk_index/{batch_id}")
+async def bulk_index_status(batch_id: str):
+    """Per-repo status (pending, cloning, parsing, embedding, done, failed) of a batch."""
+    if not BATCH_ID_RE.match(batch_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    path = state_path(batch_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    data = await asyncio.to_thread(lambda: json.loads(pathlib.Path(path).read_text(encoding="utf-8")))
+    task = _bulk_tasks.get(batch_id)
+    return {"ok": True, "running": task is not None and not task.done(), **data}
+
+
 @app.post("/search_chunks")
-async def search_chunks(req: SearchRequest):
+async def search_chunks(req: SearchRequest, request: Request):
     try:
-        results = await get_store().search_chunks(str(req.repo_url), req.query, top_k=req.top_k)
-        return {"ok": True, "results": results}
+        results = await _cancel_on_disconnect(
+            request, get_store().search_chunks(str(req.repo_url), req.query, top_k=req.top_k)
+        )
+        if req.format == "ndjson":
+            return StreamingResponse(_ndjson_lines(results, req.fields), media_type="application/x-ndjson")
+        # Returned as a response directly, skipping FastAPI's jsonable_encoder pass
+        return ORJSONResponse({"ok": True, "results": _project(results, req.fields)})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/generate_readme")
-async def generate_readme(req: GenerateRequest):
+async def generate_readme(req: GenerateRequest, request: Request):
     try:
-        print(f"Generating README for {req.repo_url}")
-        print("Searching for relevant code chunks...")
-        results = await get_store().search_chunks(str(req.repo_url), query="overview architecture setup usage api", top_k=req.top_k)
+        logger.info("Generating README for %s (mode=%s)", req.repo_url, req.mode)
+        if req.mode in {"hierarchical", "summaries", "draft"}:
+            logger.info("Loading all indexed code chunks")
+            results = await _cancel_on_disconnect(request, get_store().list_chunks(str(req.repo_url)))
+        elif req.retrieval == "sections" or req.mode == "sections":
+            logger.info("Retrieving code chunks per README section")
+            results = await _cancel_on_disconnect(
+                request, retrieve_sections(get_store(), str(req.repo_url), top_k=req.top_k)
+            )
+        else:
+            logger.info("Searching for relevant code chunks")
+            results = await _cancel_on_disconnect(
+                request,
+                get_store().search_chunks(str(req.repo_url), query="overview architecture setup usage api", top_k=req.top_k),
+            )
         if not results:
-            print("No code chunks found. Make sure repository was parsed first.")
+            logger.warning("No code chunks found for %s; parse the repository first", req.repo_url)
             raise HTTPException(status_code=400, detail="No code chunks found. Parse repository first.")
         
-        print(f"Found {len(results)} relevant chunks, generating README...")
-        markdown = await generate_readme_markdown(get_perplexity(), str(req.repo_url), results)
+        logger.info("Found %d relevant chunks, generating README", len(results))
+        if req.mode == "draft":
+            generation = asyncio.to_thread(build_draft_readme, str(req.repo_url), results)
+        elif req.mode == "hierarchical":
+            generation = generate_readme_hierarchical(get_perplexity(), str(req.repo_url), results)
+        elif req.mode == "summaries":
+            generation = generate_readme_from_summaries(
+                get_perplexity(), str(req.repo_url), results, get_summary_cache()
+            )
+        elif req.mode == "sections":
+            generation = generate_readme_sections(get_perplexity(), str(req.repo_url), results)
+        else:
+            generation = generate_readme_markdown(get_perplexity(), str(req.repo_url), results)
+        markdown = await _cancel_on_disconnect(request, generation)
         
-        print("Storing README in history...")
+        if req.mode == "draft":
+            # Drafts are cheap to rebuild and must not become the stored "latest" README
+            return {"ok": True, "readme": markdown, "version": None}
+
+        version = None
         try:
-            get_supabase().insert_readme_history(str(req.repo_url), markdown)
+            meta = await asyncio.to_thread(
+                get_readme_history().record,
+                str(req.repo_url), markdown, _context_hash(req, results), get_perplexity().model,
+            )
+            version = meta["version"]
         except Exception as e:
-            print(f"Non-fatal: Failed to store README history: {e}")
+            logger.warning("Non-fatal: failed to store README history: %s", e)
             pass
         
-        return {"ok": True, "readme": markdown}
+        return {"ok": True, "readme": markdown, "version": version}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error generating README: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/readme")
+async def get_readme(repo_url: HttpUrl, request: Request, response: Response, version: Optional[int] = None):
+    """
+    The latest (or a given) stored README of a repository, without regenerating it.
+
+    Answers If-None-Match with 304 from the version's metadata alone. The latest
+    README must be revalidated on every use; a numbered version never changes.
+    """
+    history = get_readme_history()
+    meta = await asyncio.to_thread(history.get_meta, str(repo_url), version)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="No README stored for this repository")
+    etag = _etag(meta)
+    cache_control = "no-cache" if version is None else "public, max-age=31536000, immutable"
+    # On every response, compressed or not, so caches key the representations apart
+    vary = "Accept-Encoding"
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control, "Vary": vary})
+    try:
+        markdown = await asyncio.to_thread(history.get_text, str(repo_url), meta["version"])
     except Exception as e:
-        print(f"Error generating README: {e}")
+        logger.exception("Error reading README history: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = vary
+    return {"ok": True, "readme": markdown, **meta}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage histograms, chunk/byte/token counters and provider outcomes."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Hit/miss counts of the query-embedding and search-result caches."""
+    return {"ok": True, **get_store().cache_stats()}
+
+
+def _require_profile_token(request: Request) -> None:
+    token = request.headers.get(profiling.PROFILE_HEADER)
+    if not profiling.PROFILE_TOKEN or token != profiling.PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling admin token required")
+
+
+@app.post("/admin/profiling")
+async def set_profiling(req: ProfilingRequest, request: Request):
+    _require_profile_token(request)
+    return {"ok": True, "sample_rate": profiling.set_sample_rate(req.sample_rate)}
+
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    _require_profile_token(request)
+    return {"ok": True, "sample_rate": profiling.get_sample_rate(), "profiles": profiling.list_profiles()}
+
+
+@app.get("/admin/profiles/{name}")
+async def download_profile(name: str, request: Request):
+    """Collapsed-stack profile, loadable in speedscope or flamegraph.pl."""
+    _require_profile_token(request)
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
 
 
 @app.get("/")
@@ -0,0 +1,196 @@
+"""
+Index many repositories in one batch: clone, parse and embed through a shared pool.
+
+Each stage has its own concurrency limit (cloning is network-bound, parsing is
+CPU-bound, embedding is bound by the provider's rate limits), all repositories
+share one EmbeddingStore and so one loaded embedder, and the per-repo progress is
+written to a JSON state file after every transition. Running a batch again with
+the same state skips the repositories that are already done. Each repository's
+index_chunks run id is recorded before embedding starts, so the rows of a run
+killed mid-embedding are deleted before that repository is indexed again.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from services.embedding_store import EmbeddingStore
+from services.summary_cache import CACHE_DIR
+from .extract_code import SPARSE_CHECKOUT, clone_repository, extract_repository_chunks
+
+logger = logging.getLogger(__name__)
+
+BULK_CLONE_CONCURRENCY = int(os.getenv("BULK_CLONE_CONCURRENCY", "4"))
+BULK_PARSE_CONCURRENCY = int(os.getenv("BULK_PARSE_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+BULK_EMBED_CONCURRENCY = int(os.getenv("BULK_EMBED_CONCURRENCY", "2"))
+BULK_STATE_DIR = os.path.join(CACHE_DIR, "bulk_index")
+
+BATCH_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Statuses a repository can be in; the middle three are only seen while a batch runs
+PENDING, CLONING, PARSING, EMBEDDING, DONE, FAILED = "pending", "cloning", "parsing", "embedding", "done", "failed"
+
+
+def state_path(batch_id: str) -> str:
+    if not BATCH_ID_RE.match(batch_id):
+        raise ValueError(f"Invalid batch id: {batch_id!r}")
+    return os.path.join(BULK_STATE_DIR, f"{batch_id}.json")
+
+
+class BulkIndexState:
+    """Per-repo progress of a batch, persisted as JSON (written atomically)."""
+
+    def __init__(self, path: str, batch_id: str, options: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.batch_id = batch_id
+        self.options: Dict[str, Any] = options or {}
+        self.repos: Dict[str, Dict[str, Any]] = {}
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @classmethod
+    def load_or_create(
+        cls, path: str, batch_id: str, repo_urls: List[str], options: Optional[Dict[str, Any]] = None,
+        retry_failed: bool = True,
+    ) -> "BulkIndexState":
+        state = cls(path, batch_id, options)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            state.options = {**data.get("options", {}), **(options or {})}
+            state.repos = data.get("repos", {})
+            state.created_at = data.get("created_at", state.created_at)
+            for entry in state.repos.values():
+                # Interrupted mid-stage: start that repository over
+                if entry["status"] in {CLONING, PARSING, EMBEDDING} or (retry_failed and entry["status"] == FAILED):
+                    entry["status"] = PENDING
+        for url in repo_urls:
+            state.repos.setdefault(url, {"status": PENDING, "attempts": 0, "num_chunks": None, "error": None, "seconds": {}})
+        return state
+
+    def pending(self) -> List[str]:
+        return [url for url, entry in self.repos.items() if entry["status"] == PENDING]
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self.repos.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batch_id": self.batch_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "options": self.options,
+            "summary": self.summary(),
+            "repos": self.repos,
+        }
+
+    def save(self) -> None:
+        self.updated_at = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class BulkIndexer:
+    """Runs a BulkIndexState's pending repositories through clone -> parse -> embed."""
+
+    def __init__(
+        self,
+        store: EmbeddingStore,
+        clone_concurrency: int = BULK_CLONE_CONCURRENCY,
+        parse_concurrency: int = BULK_PARSE_CONCURRENCY,
+        embed_concurrency: int = BULK_EMBED_CONCURRENCY,
+    ) -> None:
+        self.store = store
+        self.clone_concurrency = clone_concurrency
+        self.parse_concurrency = parse_concurrency
+        self.embed_concurrency = embed_concurrency
+
+    async def run(
+        self, state: BulkIndexState, on_update: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> BulkIndexState:
+        loop = asyncio.get_running_loop()
+        clone_slots = asyncio.Semaphore(self.clone_concurrency)
+        parse_slots = asyncio.Semaphore(self.parse_concurrency)
+        embed_slots = asyncio.Semaphore(self.embed_concurrency)
+        # Caps checkouts on disk and parsed chunks in memory: a repo only starts
+        # when one can be held at every stage
+        in_flight = asyncio.Semaphore(self.clone_concurrency + self.parse_concurrency + self.embed_concurrency)
+        save_lock = asyncio.Lock()
+        sparse = state.options.get("sparse", SPARSE_CHECKOUT)
+        subdir = state.options.get("subdir")
+
+        async def transition(url: str, status: str, **fields: Any) -> None:
+            entry = state.repos[url]
+            entry.update(status=status, **fields)
+            async with save_lock:
+                await asyncio.to_thread(state.save)
+            if on_update is not None:
+                on_update(url, entry)
+
+        async def index_repo(url: str, pool: ThreadPoolExecutor) -> None:
+            entry = state.repos[url]
+            seconds: Dict[str, float] = {}
+            checkout = None
+            async with in_flight:
+                try:
+                    entry["attempts"] = entry.get("attempts", 0) + 1
+                    if entry.get("index_run"):
+                        # An earlier attempt got as far as embedding; if its process was
+                        # killed, its own cleanup never ran and its rows are still stored
+                        await self.store.delete_index_run(url, entry["index_run"])
+                        entry["index_run"] = None
+                    async with clone_slots:
+                        await transition(url, CLONING, error=None)
+                        start = time.perf_counter()
+                        checkout = await loop.run_in_executor(pool, clone_repository, url, sparse, subdir)
+                        seconds["clone"] = time.perf_counter() - start
+                    async with parse_slots:
+                        await transition(url, PARSING)
+                        start = time.perf_counter()
+                        graph: Dict[str, Any] = {}
+                        chunks = await loop.run_in_executor(
+                            pool, extract_repository_chunks, checkout, url, subdir, sparse, None, graph
+                        )
+                        seconds["parse"] = time.perf_counter() - start
+                    await loop.run_in_executor(pool, shutil.rmtree, checkout, True)
+                    checkout = None
+                    async with embed_slots:
+                        index_run = uuid.uuid4().hex
+                        await transition(url, EMBEDDING, num_chunks=len(chunks), index_run=index_run)
+                        start = time.perf_counter()
+                        if chunks:
+                            await self.store.index_chunks(chunks, symbol_graph=graph, index_run=index_run)
+                        seconds["embed"] = time.perf_counter() - start
+                    # These rows stay: forget the run so that no later attempt deletes them
+                    await transition(url, DONE, seconds=seconds, index_run=None)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Bulk index of %s failed: %s", url, e)
+                    await transition(url, FAILED, error=f"{type(e).__name__}: {e}", seconds=seconds)
+                finally:
+                    if checkout is not None:
+                        shutil.rmtree(checkout, ignore_errors=True)
+
+        pending = state.pending()
+        logger.info("Bulk index %s: %d repositories to index (%s)", state.batch_id, len(pending), state.summary())
+        await asyncio.to_thread(state.save)
+        # One pool shared by every repository's clone and parse work
+        with ThreadPoolExecutor(
+            max_workers=self.clone_concurrency + self.parse_concurrency, thread_name_prefix="bulk-index"
+        ) as pool:
+            await asyncio.gather(*(index_repo(url, pool) for url in pending))
+        logger.info("Bulk index %s finished: %s", state.batch_id, state.summary())
+        return state
@@ -0,0 +1,183 @@
+"""
+Compact chunks: source bytes in one memory-mapped spool file per parse.
+
+A parsed repository used to be a list of dicts each holding its file's full
+text, an absolute temp path, the repository URL and a metadata dict, all kept
+alive from parsing until the last row was inserted. A Chunk instead holds
+offsets into its parse's ChunkSpool (an unlinked temporary file, mapped once
+parsing is done) and interned ids for the repository URL and language. Text is
+decoded only when something reads chunk["content"]: the symbol graph, dedup
+signatures, and index_chunks one batch at a time.
+
+Chunks read like the old dicts (chunk["content"], chunk.get("metadata"), ...),
+so everything downstream keeps working on either.
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+COMPACT_CHUNKS = os.getenv("COMPACT_CHUNKS", "true").lower() in {"1", "true", "yes"}
+
+CHUNK_KEYS = ("repo_url", "file_path", "content", "metadata")
+# Only the metadata is ever replaced on a chunk (deduplication adds "duplicates")
+_WRITABLE_KEYS = {"metadata"}
+# Linux maps up to this much around a faulting page of a file mapping (fault_around_bytes)
+_FAULT_AROUND_BYTES = max(64 * 1024, mmap.PAGESIZE)
+
+
+def _close(spool_file: Any, mapping: List[Optional[mmap.mmap]]) -> None:
+    if mapping[0] is not None:
+        mapping[0].close()
+    spool_file.close()
+
+
+class ChunkSpool:
+    """Append-only store of the source bytes of one parse, read back through a shared mmap."""
+
+    def __init__(self, root: str = "") -> None:
+        # Chunk paths are stored relative to this directory
+        self.root = root
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._file = tempfile.TemporaryFile(prefix="autodoc_spool_")
+        self._size = 0
+        # One list cell so the finalizer sees the map created after it was registered
+        self._map: List[Optional[mmap.mmap]] = [None]
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _close, self._file, self._map)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def intern(self, value: str) -> int:
+        ident = self._ids.get(value)
+        if ident is None:
+            ident = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return ident
+
+    def append(self, data: bytes) -> int:
+        """Store `data` and return its offset."""
+        if self._map[0] is not None:
+            # Written to after reads began: remap on the next read
+            self._map[0].close()
+            self._map[0] = None
+        offset = self._size
+        self._file.write(data)
+        self._size += len(data)
+        return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        mapping = self._map[0]
+        if mapping is None:
+            with self._lock:
+                mapping = self._map[0]
+                if mapping is None:
+                    self._file.flush()
+                    mapping = self._map[0] = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        data = mapping[offset:offset + length]
+        if hasattr(mapping, "madvise"):
+            # The bytes are copied out; give the mapped pages back instead of keeping
+            # every file the parse has read resident until the spool goes away. A page
+            # fault maps its whole fault-around window, so release whole windows
+            start = offset - offset % _FAULT_AROUND_BYTES
+            end = min(-(-(offset + length) // _FAULT_AROUND_BYTES) * _FAULT_AROUND_BYTES, len(mapping))
+            mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return data
+
+    def add(self, repo_url: str, file_path: str, data: bytes, language: str, parsed_with: str) -> "Chunk":
+        rel = os.path.relpath(file_path, self.root) if self.root else file_path
+        return Chunk(
+            self, self.append(data), len(data), self.intern(repo_url), rel, self.intern(language), self.intern(parsed_with)
+        )
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+class Chunk(Mapping):
+    """
+    One file's chunk, stored as offsets into a ChunkSpool.
+
+    A read-only mapping with the keys of a chunk dict; "content" is decoded from
+    the spool on every access (callers that need it twice keep the string), and
+    "metadata" is built on first access and can be replaced.
+    """
+
+    __slots__ = ("_spool", "_offset", "_length", "_repo", "_path", "_language", "_parsed_with", "_metadata")
+
+    def __init__(
+        self, spool: ChunkSpool, offset: int, length: int, repo: int, path: str, language: int, parsed_with: int
+    ) -> None:
+        self._spool = spool
+        self._offset = offset
+        self._length = length
+        self._repo = repo
+        self._path = path
+        self._language = language
+        self._parsed_with = parsed_with
+        self._metadata: Optional[Dict[str, Any]] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self._length
+
+    @property
+    def content(self) -> str:
+        text = self._spool.read(self._offset, self._length).decode("utf-8", errors="ignore")
+        if self._spool.strings[self._parsed_with] != "tree-sitter":
+            # Read in text mode before chunks were spooled: universal newlines
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            strings = self._spool.strings
+            self._metadata = {"language": strings[self._language], "parsed_with": strings[self._parsed_with]}
+        return self._metadata
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "content":
+            return self.content
+        if key == "metadata":
+            return self.metadata
+        if key == "file_path":
+            return os.path.join(self._spool.root, self._path) if self._spool.root else self._path
+        if key == "repo_url":
+            return self._spool.strings[self._repo]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _WRITABLE_KEYS:
+            raise KeyError(f"Chunk field {key!r} is read-only")
+        self._metadata = dict(value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CHUNK_KEYS)
+
+    def __len__(self) -> int:
+        return len(CHUNK_KEYS)
+
+    def __copy__(self) -> "Chunk":
+        copy = Chunk(
+            self._spool, self._offset, self._length, self._repo, self._path, self._language, self._parsed_with
+        )
+        copy._metadata = None if self._metadata is None else dict(self._metadata)
+        return copy
+
+    def __repr__(self) -> str:
+        return f"Chunk({self['file_path']!r}, {self._length} bytes)"
+
+
+def chunk_nbytes(chunk: Mapping) -> int:
+    """Size of a chunk's source (characters for a dict chunk), without decoding a compact chunk."""
+    if isinstance(chunk, Chunk):
+        return chunk.nbytes
+    return len(chunk["content"])
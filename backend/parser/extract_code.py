@@ -1,8 +1,18 @@
+import asyncio
 import os
+import logging
 import tempfile
 import shutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Mapping, Optional
 from git import Repo
+from git.exc import GitCommandError
+
+from services.metrics import BYTES_TOTAL, CHUNKS_TOTAL, timed
+from .chunks import COMPACT_CHUNKS, ChunkSpool, chunk_nbytes
+from .symbol_graph import annotate_chunks
+from .triage import triage_files
+
+logger = logging.getLogger(__name__)
 
 try:
     from tree_sitter_languages import get_language, get_parser  # type: ignore
@@ -24,96 +34,237 @@ SUPPORTED_EXTS = {
 
 IGNORED_DIRS = {".git", "node_modules", ".venv", "dist", "build", ".next"}
 
+# Fetch only the blobs we actually read: partial clone (--filter=blob:none)
+# plus a sparse checkout of SUPPORTED_EXTS outside IGNORED_DIRS
+SPARSE_CHECKOUT = os.getenv("SPARSE_CHECKOUT", "true").lower() in {"1", "true", "yes"}
+
 
 def _detect_lang(path: str) -> str:
     _, ext = os.path.splitext(path)
     return SUPPORTED_EXTS.get(ext, "")
 
 
-def _extract_chunks_from_file(file_path: str, repo_url: str) -> List[Dict[str, Any]]:
+def _make_chunk(
+    spool: Optional[ChunkSpool], repo_url: str, file_path: str, code: bytes, lang: str, parsed_with: str
+) -> Mapping:
+    if spool is not None:
+        return spool.add(repo_url, file_path, code, lang, parsed_with)
+    content = code.decode("utf-8", errors="ignore")
+    if parsed_with != "tree-sitter":
+        # Same text as reading the file in text mode
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return {
+        "repo_url": repo_url,
+        "file_path": file_path,
+        "content": content,
+        "metadata": {"language": lang, "parsed_with": parsed_with},
+    }
+
+
+def _extract_chunks_from_file(file_path: str, repo_url: str, spool: Optional[ChunkSpool] = None) -> List[Mapping]:
+    """Chunks of one file: compact Chunks backed by `spool` if given, else plain dicts."""
     lang = _detect_lang(file_path)
-    chunks: List[Dict[str, Any]] = []
+    chunks: List[Mapping] = []
     
     # Skip very large files
     if os.path.getsize(file_path) > 1024 * 1024:  # 1MB limit
-        print(f"Skipping large file {file_path}")
+        logger.info("Skipping large file %s", file_path)
         return chunks
         
     try:
+        with open(file_path, "rb") as f:
+            code = f.read()
+        # Skip empty files
+        if not code.decode("utf-8", errors="ignore").strip():
+            return chunks
         if TS_AVAILABLE and lang:
             try:
                 language = get_language(lang)  # noqa: F401
                 parser = get_parser(lang)
-                with open(file_path, "rb") as f:
-                    code = f.read()
                 _ = parser.parse(code)  # We could walk the tree; baseline uses whole file
-                decoded = code.decode("utf-8", errors="ignore")
-                if len(decoded.strip()) > 0:  # Skip empty files
-                    chunks.append({
-                        "repo_url": repo_url,
-                        "file_path": file_path,
-                        "content": decoded,
-                        "metadata": {"language": lang, "parsed_with": "tree-sitter"},
-                    })
+                chunks.append(_make_chunk(spool, repo_url, file_path, code, lang, "tree-sitter"))
             except Exception as e:
-                print(f"Tree-sitter parsing failed for {file_path}: {e}")
+                logger.warning("Tree-sitter parsing failed for %s: %s", file_path, e)
                 # Fallback to basic parsing
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                if len(content.strip()) > 0:  # Skip empty files
-                    chunks.append({
-                        "repo_url": repo_url,
-                        "file_path": file_path,
-                        "content": content,
-                        "metadata": {"language": lang, "parsed_with": "fallback"},
-                    })
+                chunks.append(_make_chunk(spool, repo_url, file_path, code, lang, "fallback"))
         else:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            if len(content.strip()) > 0:  # Skip empty files
-                chunks.append({
-                    "repo_url": repo_url,
-                    "file_path": file_path,
-                    "content": content,
-                    "metadata": {"language": lang or "unknown", "parsed_with": "fallback"},
-                })
+            chunks.append(_make_chunk(spool, repo_url, file_path, code, lang or "unknown", "fallback"))
     except Exception as e:
-        print(f"Error processing {file_path}: {e}")
+        logger.error("Error processing %s: %s", file_path, e)
     return chunks
 
 
-async def parse_repository(repo_url: str, force_reparse: bool = False) -> List[Dict[str, Any]]:
+def _normalize_subdir(subdir: Optional[str]) -> str:
+    if not subdir:
+        return ""
+    normalized = os.path.normpath(subdir.replace("\\", "/")).replace("\\", "/").strip("/")
+    if normalized in {"", "."}:
+        return ""
+    if os.path.isabs(subdir) or normalized.startswith(".."):
+        raise ValueError(f"subdir must be a path inside the repository: {subdir}")
+    return normalized
+
+
+def _is_supported_path(rel: str) -> bool:
+    parts = rel.replace("\\", "/").split("/")
+    if any(part in IGNORED_DIRS for part in parts[:-1]):
+        return False
+    return _detect_lang(rel) != ""
+
+
+def _sparse_patterns(subdir: str) -> List[str]:
+    """Non-cone sparse-checkout patterns selecting SUPPORTED_EXTS outside IGNORED_DIRS."""
+    prefix = f"/{subdir}/**/" if subdir else ""
+    patterns = [f"{prefix}*{ext}" for ext in sorted(SUPPORTED_EXTS)]
+    patterns += [f"!**/{d}/**" for d in sorted(IGNORED_DIRS)]
+    # Read by triage for linguist-generated / linguist-vendored rules
+    patterns.append("/.gitattributes")
+    return patterns
+
+
+def _clone_repository(repo_url: str, dest: str, sparse: bool, subdir: str) -> None:
+    if sparse:
+        try:
+            repo = Repo.clone_from(repo_url, dest, depth=1, filter="blob:none", no_checkout=True)
+            repo.git.sparse_checkout("set", "--no-cone", *_sparse_patterns(subdir))
+            # Blobs for the sparse paths are fetched on demand here
+            repo.git.checkout()
+            return
+        except GitCommandError as e:
+            # Old git or a host without partial-clone support: fall back to a full checkout
+            logger.warning("Sparse clone failed, falling back to full clone: %s", e)
+            shutil.rmtree(dest, ignore_errors=True)
+            os.makedirs(dest, exist_ok=True)
+    Repo.clone_from(repo_url, dest, depth=1)  # depth=1 for faster cloning
+
+
+def _list_files_git(repo_dir: str, subdir: str) -> List[str]:
+    """Tracked, checked-out files via `git ls-files` (skips untracked and skip-worktree entries)."""
+    args = ["-z", "-t"]
+    if subdir:
+        args += ["--", subdir]
+    output = Repo(repo_dir).git.ls_files(*args)
+    files = []
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+        tag, _, rel = entry.partition(" ")
+        if tag != "S":
+            files.append(rel)
+    return files
+
+
+def _list_files_walk(repo_dir: str, subdir: str) -> List[str]:
+    files = []
+    start = os.path.join(repo_dir, subdir) if subdir else repo_dir
+    for root, dirs, names in os.walk(start):
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        for fname in names:
+            files.append(os.path.relpath(os.path.join(root, fname), repo_dir))
+    return files
+
+
+def clone_repository(repo_url: str, sparse: Optional[bool] = None, subdir: Optional[str] = None) -> str:
+    """Clone `repo_url` into a new temporary directory and return it; the caller removes it."""
+    sparse = SPARSE_CHECKOUT if sparse is None else sparse
+    subdir = _normalize_subdir(subdir)
     tmp_dir = tempfile.mkdtemp(prefix="autodoc_")
+    logger.info("Cloning repository %s to %s (sparse=%s, subdir=%s)", repo_url, tmp_dir, sparse, subdir or "/")
     try:
-        print(f"Cloning repository {repo_url} to {tmp_dir}...")
-        # Set a timeout for the clone operation
-        Repo.clone_from(repo_url, tmp_dir, depth=1)  # depth=1 for faster cloning
-        print("Repository cloned successfully")
-        
-        all_chunks: List[Dict[str, Any]] = []
-        for root, dirs, files in os.walk(tmp_dir):
-            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
-            for fname in files:
-                try:
-                    path = os.path.join(root, fname)
-                    rel = os.path.relpath(path, tmp_dir)
-                    # Limit to code-like files
-                    if any(rel.endswith(ext) for ext in SUPPORTED_EXTS.keys()):
-                        chunks = _extract_chunks_from_file(path, repo_url)
-                        if chunks:
-                            all_chunks.extend(chunks)
-                            print(f"Processed {rel}: {len(chunks)} chunks")
-                except Exception as e:
-                    print(f"Error processing {fname}: {e}")
-                    continue
-        
-        print(f"Total chunks extracted: {len(all_chunks)}")
-        return all_chunks
-    except Exception as e:
-        print(f"Error during repository parsing: {e}")
+        with timed("clone"):
+            _clone_repository(repo_url, tmp_dir, sparse, subdir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
         raise
-    finally:
+    logger.info("Repository cloned successfully")
+    return tmp_dir
+
+
+def extract_repository_chunks(
+    repo_dir: str,
+    repo_url: str,
+    subdir: Optional[str] = None,
+    use_git_ls_files: bool = True,
+    triage_report: Optional[Dict[str, Any]] = None,
+    symbol_graph: Optional[Dict[str, Any]] = None,
+    compact: Optional[bool] = None,
+) -> List[Mapping]:
+    """Chunks of the supported source files in a checkout made by clone_repository.
+
+    Each chunk's metadata gets the centrality of its file in the repository's
+    symbol graph; pass `symbol_graph` to receive the graph itself. With `compact`
+    (default: COMPACT_CHUNKS) the chunks are parser.chunks.Chunk objects whose
+    source lives in a spool file, so they outlive the checkout without holding
+    its text in memory.
+    """
+    compact = COMPACT_CHUNKS if compact is None else compact
+    subdir = _normalize_subdir(subdir)
+    with timed("walk"):
+        rel_paths = _list_files_git(repo_dir, subdir) if use_git_ls_files else _list_files_walk(repo_dir, subdir)
+        # Limit to code-like files
+        rel_paths = [rel for rel in rel_paths if _is_supported_path(rel) and os.path.isfile(os.path.join(repo_dir, rel))]
+
+    # Drop binary, minified, generated and vendored files before anything is read in full
+    with timed("triage"):
+        rel_paths, report = triage_files(repo_dir, rel_paths)
+    logger.info("Triage kept %d/%d files, skipped %s", report["kept"], report["considered"], report["skipped_by_reason"])
+    if triage_report is not None:
+        triage_report.update(report)
+
+    all_chunks: List[Mapping] = []
+    spool = ChunkSpool(repo_dir) if compact else None
+    with timed("parse"):
+        for rel in rel_paths:
+            try:
+                path = os.path.join(repo_dir, rel)
+                chunks = _extract_chunks_from_file(path, repo_url, spool)
+                if chunks:
+                    all_chunks.extend(chunks)
+                    logger.debug("Processed %s: %d chunks", rel, len(chunks))
+            except Exception as e:
+                logger.error("Error processing %s: %s", rel, e)
+                continue
+
+    with timed("symbol_graph"):
+        graph = annotate_chunks(all_chunks, repo_dir)
+    if symbol_graph is not None and graph is not None:
+        symbol_graph.update(graph)
+
+    CHUNKS_TOTAL.inc(len(all_chunks), stage="parse")
+    BYTES_TOTAL.inc(sum(chunk_nbytes(c) for c in all_chunks), stage="parse")
+    logger.info("Total chunks extracted: %d", len(all_chunks))
+    return all_chunks
+
+
+async def parse_repository(
+    repo_url: str,
+    force_reparse: bool = False,
+    sparse: Optional[bool] = None,
+    subdir: Optional[str] = None,
+    use_git_ls_files: Optional[bool] = None,
+    triage_report: Optional[Dict[str, Any]] = None,
+    symbol_graph: Optional[Dict[str, Any]] = None,
+) -> List[Mapping]:
+    """Clone `repo_url` and extract chunks from its supported source files.
+
+    sparse: partial clone + sparse checkout of SUPPORTED_EXTS (default: SPARSE_CHECKOUT)
+    subdir: only ingest this directory of the repository (monorepos)
+    use_git_ls_files: enumerate files with `git ls-files` instead of os.walk (default: same as sparse)
+    triage_report: if given, filled with what triage skipped and why
+    symbol_graph: if given, filled with the repository's symbol/dependency graph
+
+    Cloning and parsing run in worker threads, off the event loop.
+    """
+    sparse = SPARSE_CHECKOUT if sparse is None else sparse
+    use_git_ls_files = sparse if use_git_ls_files is None else use_git_ls_files
+    try:
+        tmp_dir = await asyncio.to_thread(clone_repository, repo_url, sparse, subdir)
         try:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
-        except Exception as e:
-            print(f"Warning: Failed to cleanup temporary directory {tmp_dir}: {e}")
+            return await asyncio.to_thread(
+                extract_repository_chunks, tmp_dir, repo_url, subdir, use_git_ls_files, triage_report, symbol_graph
+            )
+        finally:
+            await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
+    except Exception as e:
+        logger.error("Error during repository parsing: %s", e)
+        raise
@@ -0,0 +1,340 @@
+"""
+Per-repository symbol/dependency graph and PageRank centrality of its files.
+
+Definitions, imports and referenced identifiers are extracted from every parsed
+file (with tree-sitter when tree_sitter_languages is installed, else with
+per-language regexes). Files are linked by imports that resolve to another file
+of the repository and by references to names defined in another file; PageRank
+over those links finds the files the rest of the code depends on. The scores are
+computed once at index time and stored with each chunk, so README generation
+only has to look them up.
+"""
+
+import logging
+import os
+import posixpath
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+try:
+    from tree_sitter_languages import get_parser  # type: ignore
+    TS_AVAILABLE = True
+except Exception:
+    TS_AVAILABLE = False
+
+SYMBOL_GRAPH_ENABLED = os.getenv("SYMBOL_GRAPH_ENABLED", "true").lower() in {"1", "true", "yes"}
+PAGERANK_DAMPING = float(os.getenv("PAGERANK_DAMPING", "0.85"))
+PAGERANK_MAX_ITER = 100
+PAGERANK_TOL = 1e-8
+GRAPH_VERSION = 2
+# A name defined in more files than this (get, run, init, ...) says nothing about who depends on whom
+MAX_DEFINERS = 3
+MIN_NAME_LENGTH = 3
+IMPORT_WEIGHT = 1.0
+REFERENCE_WEIGHT = 0.5
+# Stored per file in the graph; the rest are still used for the edges
+MAX_STORED_DEFINES = 100
+
+# Node types that define a name (read from their `name` field), per tree-sitter grammar
+_TS_DEFINITIONS: Dict[str, Set[str]] = {
+    "python": {"function_definition", "class_definition"},
+    "javascript": {"function_declaration", "class_declaration", "method_definition", "generator_function_declaration"},
+    "typescript": {
+        "function_declaration", "class_declaration", "method_definition", "interface_declaration",
+        "type_alias_declaration", "enum_declaration", "abstract_class_declaration",
+    },
+    "go": {"function_declaration", "method_declaration", "type_spec"},
+    "rust": {"function_item", "struct_item", "enum_item", "trait_item", "type_item", "mod_item"},
+    "java": {"class_declaration", "interface_declaration", "enum_declaration", "method_declaration", "record_declaration"},
+    "c_sharp": {
+        "class_declaration", "interface_declaration", "struct_declaration", "enum_declaration",
+        "method_declaration", "record_declaration",
+    },
+}
+_TS_DEFINITIONS["tsx"] = _TS_DEFINITIONS["typescript"]
+_TS_IMPORTS: Dict[str, Set[str]] = {
+    "python": {"import_statement", "import_from_statement"},
+    "javascript": {"import_statement"},
+    "typescript": {"import_statement"},
+    "tsx": {"import_statement"},
+    "go": {"import_spec"},
+    "rust": {"use_declaration"},
+    "java": {"import_declaration"},
+    "c_sharp": {"using_directive"},
+}
+_TS_IDENTIFIERS = {"identifier", "type_identifier", "property_identifier", "field_identifier", "constant"}
+
+_RE_DEFINITIONS = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:public\s+|private\s+|protected\s+|internal\s+|static\s+|abstract\s+|final\s+)*"
+    r"(?:async\s+)?(?:def|class|function\*?|func(?:\s+\([^)]*\))?|fn|struct|enum|trait|interface|type|mod)\s+([A-Za-z_]\w*)",
+    re.MULTILINE,
+)
+_RE_IMPORTS = [
+    re.compile(r"^\s*from\s+(\.*[\w.]*)\s+import\s+([\w.*, ()]+)", re.MULTILINE),
+    re.compile(r"^\s*import\s+([\w.]+)", re.MULTILINE),
+    re.compile(r"""(?:from|import)\s+['"]([^'"]+)['"]"""),
+    re.compile(r"""require\(\s*['"]([^'"]+)['"]\s*\)"""),
+    re.compile(r"^\s*use\s+([\w:]+)", re.MULTILINE),
+    re.compile(r"^\s*using\s+(?:static\s+)?([\w.]+)\s*;", re.MULTILINE),
+    re.compile(r"""^\s*(?:import\s+)?(?:\w+\s+)?"([\w./-]+)"\s*$""", re.MULTILINE),
+]
+# (specifiers, fallback specifier); see extract_symbols
+Import = Tuple[Tuple[str, ...], str]
+
+_RE_IDENTIFIER = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]*\b")
+
+
+def _ts_text(node: Any, source: bytes) -> str:
+    return source[node.start_byte:node.end_byte].decode("utf-8", errors="ignore")
+
+
+def _from_import(base: str, names: Iterable[str]) -> Import:
+    # `from pkg import x` imports module pkg/x or a name defined in pkg; the bare
+    # package is only a fallback, since without an __init__ it resolves to every
+    # file of the directory
+    specs = tuple(base + n if base.endswith(".") else f"{base}.{n}" for n in names)
+    return specs, base
+
+
+def _ts_import_specs(node: Any, source: bytes, language: str) -> List[Import]:
+    if language == "python":
+        if node.type == "import_from_statement":
+            module = node.child_by_field_name("module_name")
+            base = _ts_text(module, source) if module is not None else ""
+            names = [_ts_text(n, source).split(" as ")[0] for n in node.children_by_field_name("name")]
+            return [_from_import(base, names)]
+        return [((_ts_text(n, source).split(" as ")[0],), "") for n in node.children_by_field_name("name")]
+    if language in {"javascript", "typescript", "tsx"}:
+        source_node = node.child_by_field_name("source")
+        return [((_ts_text(source_node, source).strip("'\"`"),), "")] if source_node is not None else []
+    if language == "go":
+        path = node.child_by_field_name("path")
+        return [((_ts_text(path, source).strip('"`'),), "")] if path is not None else []
+    if language == "rust":
+        argument = node.child_by_field_name("argument")
+        return [((_ts_text(argument, source),), "")] if argument is not None else []
+    # java / c#: the qualified name is the only named child besides keywords
+    text = _ts_text(node, source)
+    match = re.search(r"(?:import|using)\s+(?:static\s+)?([\w.]+)", text)
+    return [((match.group(1),), "")] if match else []
+
+
+def _extract_tree_sitter(content: str, language: str) -> Tuple[Set[str], List[Import], Set[str]]:
+    source = content.encode("utf-8")
+    tree = get_parser(language).parse(source)
+    definitions, imports, references = set(), [], set()
+    definition_types = _TS_DEFINITIONS.get(language, set())
+    import_types = _TS_IMPORTS.get(language, set())
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type in definition_types:
+            name = node.child_by_field_name("name")
+            if name is not None:
+                definitions.add(_ts_text(name, source))
+        elif node.type in import_types:
+            imports.extend(_ts_import_specs(node, source, language))
+            continue
+        elif node.type in _TS_IDENTIFIERS:
+            references.add(_ts_text(node, source))
+            continue
+        stack.extend(node.children)
+    return definitions, imports, references - definitions
+
+
+def _extract_regex(content: str) -> Tuple[Set[str], List[Import], Set[str]]:
+    definitions = set(_RE_DEFINITIONS.findall(content))
+    imports: List[Import] = []
+    for pattern in _RE_IMPORTS:
+        for match in pattern.finditer(content):
+            if pattern is _RE_IMPORTS[0]:
+                names = [n.strip(" ()").split(" as ")[0] for n in match.group(2).split(",")]
+                imports.append(_from_import(match.group(1), [n for n in names if n and n != "*"]))
+            else:
+                imports.append(((match.group(1),), ""))
+    references = set(_RE_IDENTIFIER.findall(content)) - definitions
+    return definitions, imports, references
+
+
+def extract_symbols(content: str, language: str) -> Dict[str, Any]:
+    """
+    Definitions, imports and referenced identifiers of one source file.
+
+    Each import is (specifiers, fallback): the files its specifiers resolve to,
+    or those of the fallback specifier when none of them resolves.
+    """
+    if TS_AVAILABLE and language in _TS_DEFINITIONS:
+        try:
+            definitions, imports, references = _extract_tree_sitter(content, language)
+            return {"defines": definitions, "imports": imports, "references": references}
+        except Exception as e:
+            logger.debug("Tree-sitter symbol extraction failed for %s, using regexes: %s", language, e)
+    definitions, imports, references = _extract_regex(content)
+    return {"defines": definitions, "imports": imports, "references": references}
+
+
+class _ModuleIndex:
+    """Resolves import specifiers to repository files by path suffix."""
+
+    def __init__(self, paths: List[str]) -> None:
+        self.paths = set(paths)
+        self.by_suffix: Dict[str, List[int]] = defaultdict(list)
+        self.by_dir_suffix: Dict[str, List[int]] = defaultdict(list)
+        for i, path in enumerate(paths):
+            stem, _ = posixpath.splitext(path)
+            parts = stem.split("/")
+            if parts[-1] in {"__init__", "index", "mod"}:
+                # A package's __init__/index/mod file stands for the package itself
+                parts = parts[:-1]
+            for start in range(len(parts)):
+                self.by_suffix["/".join(parts[start:])].append(i)
+            directory = posixpath.dirname(path).split("/") if posixpath.dirname(path) else []
+            for start in range(len(directory)):
+                self.by_dir_suffix["/".join(directory[start:])].append(i)
+
+    def resolve(self, spec: str, importer: str) -> List[int]:
+        spec = spec.strip()
+        if not spec:
+            return []
+        if spec.startswith("./") or spec.startswith("../"):
+            # JS/TS relative import
+            key = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+            key = posixpath.splitext(key)[0] if posixpath.splitext(key)[1] in {".js", ".ts", ".tsx", ".jsx"} else key
+        elif spec.startswith("."):
+            # Python relative import: one dot per package level
+            level = len(spec) - len(spec.lstrip("."))
+            base = posixpath.dirname(importer).split("/")
+            base = base[: len(base) - (level - 1)] if level > 1 else base
+            key = "/".join(base + [p for p in spec[level:].split(".") if p])
+        else:
+            key = re.sub(r"^(?:crate|self|super)::", "", spec)
+            key = re.sub(r"^@/|^~/", "", key)
+            key = re.sub(r"::|\.", "/", key).strip("/")
+        key = key.strip("/")
+        # Longest match first: the spec itself, then its parents (`pkg.mod.Name` -> `pkg/mod`)
+        parts = key.split("/")
+        for end in range(len(parts), 0, -1):
+            candidate = "/".join(parts[:end])
+            if candidate in self.by_suffix:
+                return self.by_suffix[candidate]
+        # Go packages (and some namespaces) name a directory, under a module path
+        # prefix the checkout does not have: match the spec's trailing components
+        for start in range(len(parts)):
+            candidate = "/".join(parts[start:])
+            if (start == 0 or len(parts) - start >= 2) and candidate in self.by_dir_suffix:
+                return self.by_dir_suffix[candidate]
+        return []
+
+
+def pagerank(
+    n: int, edges: Iterable[Tuple[int, int, float]], damping: float = PAGERANK_DAMPING
+) -> np.ndarray:
+    """Weighted PageRank by power iteration; dangling nodes spread their rank uniformly."""
+    if n == 0:
+        return np.zeros(0)
+    rows, cols, weights = [], [], []
+    for src, dst, weight in edges:
+        rows.append(dst)
+        cols.append(src)
+        weights.append(weight)
+    matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(n, n), dtype=np.float64)
+    out_weight = np.asarray(matrix.sum(axis=0)).ravel()
+    dangling = out_weight == 0
+    scale = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition = matrix @ sparse.diags(scale)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITER):
+        updated = damping * (transition @ rank + rank[dangling].sum() / n) + (1.0 - damping) / n
+        if np.abs(updated - rank).sum() < PAGERANK_TOL:
+            rank = updated
+            break
+        rank = updated
+    return rank
+
+
+def _file_content(entry: Dict[str, Any]) -> str:
+    content = entry["content"]
+    return content() if callable(content) else content
+
+
+def build_symbol_graph(files: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Graph over `files` ({relative path: {"language", "content"}}) with per-file centrality.
+
+    "content" may be a callable returning the text, so only one file's source
+    has to be in memory at a time.
+    Centrality is PageRank scaled by the number of files, so 1.0 is average.
+    """
+    paths = sorted(files)
+    index = {path: i for i, path in enumerate(paths)}
+    symbols = [extract_symbols(_file_content(files[p]), files[p].get("language", "")) for p in paths]
+    modules = _ModuleIndex(paths)
+
+    definers: Dict[str, List[int]] = defaultdict(list)
+    for i, sym in enumerate(symbols):
+        for name in sym["defines"]:
+            definers[name].append(i)
+
+    weights: Dict[Tuple[int, int], float] = defaultdict(float)
+    for i, (path, sym) in enumerate(zip(paths, symbols)):
+        targets = set()
+        for specs, fallback in sym["imports"]:
+            resolved = [t for spec in specs for t in modules.resolve(spec, path)]
+            if not resolved and fallback:
+                resolved = modules.resolve(fallback, path)
+            targets.update(t for t in resolved if t != i)
+        for target in targets:
+            weights[(i, target)] += IMPORT_WEIGHT
+        for name in sym["references"]:
+            owners = definers.get(name)
+            if not owners or len(owners) > MAX_DEFINERS or len(name) < MIN_NAME_LENGTH:
+                continue
+            for owner in owners:
+                if owner != i:
+                    weights[(i, owner)] += REFERENCE_WEIGHT / len(owners)
+
+    edges = [(src, dst, round(w, 4)) for (src, dst), w in weights.items()]
+    rank = pagerank(len(paths), edges) * len(paths)
+    return {
+        "version": GRAPH_VERSION,
+        "files": [
+            {
+                "path": path,
+                "language": files[path].get("language", ""),
+                "centrality": round(float(rank[index[path]]), 4),
+                "defines": sorted(symbols[index[path]]["defines"])[:MAX_STORED_DEFINES],
+            }
+            for path in paths
+        ],
+        "edges": [list(edge) for edge in sorted(edges)],
+    }
+
+
+def annotate_chunks(chunks: List[Mapping], repo_dir: str) -> Optional[Dict[str, Any]]:
+    """Build the graph of a freshly parsed checkout and store each chunk's file centrality in its metadata."""
+    if not SYMBOL_GRAPH_ENABLED or not chunks:
+        return None
+    by_file: Dict[str, List[Mapping]] = defaultdict(list)
+    for chunk in chunks:
+        by_file[os.path.relpath(chunk["file_path"], repo_dir).replace(os.sep, "/")].append(chunk)
+    # A file's text is read when its symbols are extracted, not all up front
+    files = {
+        rel: {
+            "language": (group[0].get("metadata") or {}).get("language", ""),
+            "content": lambda group=group: "".join(c["content"] for c in group),
+        }
+        for rel, group in by_file.items()
+    }
+    graph = build_symbol_graph(files)
+    centrality = {f["path"]: f["centrality"] for f in graph["files"]}
+    for rel, group in by_file.items():
+        for chunk in group:
+            chunk["metadata"]["centrality"] = centrality.get(rel, 1.0)
+    logger.info("Symbol graph: %d files, %d edges", len(graph["files"]), len(graph["edges"]))
+    return graph
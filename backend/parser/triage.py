@@ -0,0 +1,175 @@
+import fnmatch
+import mmap
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.chunk_features import ROLE_WEIGHTS, classify_role
+
+# Only this many leading bytes of each file are inspected
+TRIAGE_HEAD_BYTES = int(os.getenv("TRIAGE_HEAD_BYTES", "8192"))
+MAX_FILE_BYTES = 1024 * 1024  # 1MB limit
+# Per-repository ingestion budget; the highest-priority files are kept
+TRIAGE_MAX_FILES = int(os.getenv("TRIAGE_MAX_FILES", "5000"))
+TRIAGE_MAX_BYTES = int(os.getenv("TRIAGE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Minified code: very long lines on average, or a single gigantic one
+MINIFIED_AVG_LINE = 300
+MINIFIED_MAX_LINE = 2000
+
+GENERATED_NAME_PATTERNS = (
+    "*.min.js", "*.min.ts", "*.bundle.js", "*.chunk.js", "*.d.ts",
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.gw.go", "*_generated.go", "*.g.cs", "*.designer.cs",
+)
+GENERATED_MARKERS = (
+    b"@generated", b"do not edit", b"code generated by", b"autogenerated", b"auto-generated",
+    b"generated by the protocol buffer compiler", b"this file was automatically generated",
+)
+# Only the package-manager and vendoring conventions: names like external/ or deps/
+# often hold first-party code; mark those with .gitattributes linguist-vendored
+VENDORED_DIRS = {"vendor", "vendored", "third_party", "third-party", "node_modules", "bower_components", "site-packages"}
+
+# JSON exported as a JS/TS module; in other languages a table of constants is still code
+DATA_MODULE_EXTS = {".js", ".jsx", ".ts", ".tsx"}
+# Lines that are nothing but a quoted key/value or array item: data, not code
+_DATA_LINE_RE = re.compile(rb"""^\s*(?:["'][^"']*["']\s*[:,]|[-\d.]+\s*,|[\[\]{}],?)\s*""")
+
+
+def _read_head(path: str, size: int) -> bytes:
+    if size == 0:
+        return b""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return m[:TRIAGE_HEAD_BYTES]
+
+
+def load_gitattributes(repo_dir: str) -> List[Tuple[str, str, bool]]:
+    """Parse linguist-generated / linguist-vendored rules as (pattern, attribute, value)."""
+    rules: List[Tuple[str, str, bool]] = []
+    path = os.path.join(repo_dir, ".gitattributes")
+    if not os.path.isfile(path):
+        return rules
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2:
+                continue
+            pattern, attrs = fields[0], fields[1:]
+            for attr in attrs:
+                name = attr.lstrip("-!").split("=", 1)[0]
+                if name not in {"linguist-generated", "linguist-vendored"}:
+                    continue
+                value = not attr.startswith(("-", "!")) and not attr.endswith(("=false", "=0"))
+                rules.append((pattern, name, value))
+    return rules
+
+
+def _attribute_matches(pattern: str, rel: str) -> bool:
+    pattern = pattern.lstrip("/")
+    if pattern.endswith("/**"):
+        return rel.startswith(pattern[:-3] + "/")
+    if "/" not in pattern:
+        return fnmatch.fnmatch(os.path.basename(rel), pattern) or any(
+            fnmatch.fnmatch(part, pattern) for part in rel.split("/")[:-1]
+        )
+    return fnmatch.fnmatch(rel, pattern) or rel.startswith(pattern.rstrip("/") + "/")
+
+
+def _gitattribute(rules: List[Tuple[str, str, bool]], rel: str, name: str) -> Optional[bool]:
+    result = None
+    for pattern, attr, value in rules:  # last matching rule wins, as in git
+        if attr == name and _attribute_matches(pattern, rel):
+            result = value
+    return result
+
+
+def classify_file(rel: str, head: bytes, size: int, rules: List[Tuple[str, str, bool]]) -> Optional[str]:
+    """Return why a file should be skipped, or None if it is worth embedding."""
+    if size == 0 or not head.strip():
+        return "empty"
+    if size > MAX_FILE_BYTES:
+        return "too_large"
+    if b"\0" in head:
+        return "binary"
+
+    generated = _gitattribute(rules, rel, "linguist-generated")
+    vendored = _gitattribute(rules, rel, "linguist-vendored")
+    if vendored or (vendored is None and any(part in VENDORED_DIRS for part in rel.split("/")[:-1])):
+        return "vendored"
+    if generated:
+        return "generated"
+    if generated is None:
+        name = os.path.basename(rel)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_NAME_PATTERNS):
+            return "generated"
+        # Generators put their marker in the first few lines
+        if any(marker in head[:1024].lower() for marker in GENERATED_MARKERS):
+            return "generated"
+
+    lines = head.splitlines() or [head]
+    longest = max(len(line) for line in lines)
+    if longest > MINIFIED_MAX_LINE or (len(lines) > 1 and len(head) / len(lines) > MINIFIED_AVG_LINE):
+        return "minified"
+    if (
+        os.path.splitext(rel)[1] in DATA_MODULE_EXTS
+        and len(lines) >= 50
+        and sum(1 for line in lines if _DATA_LINE_RE.match(line)) > 0.9 * len(lines)
+    ):
+        return "data"
+    return None
+
+
+def _priority(rel: str, size: int) -> float:
+    # Prefer important roles, shallow paths and moderately sized files
+    depth = rel.count("/")
+    return ROLE_WEIGHTS[classify_role(rel)] - 0.25 * depth - size / MAX_FILE_BYTES
+
+
+def triage_files(repo_dir: str, rel_paths: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Decide which files are worth reading and embedding.
+
+    Looks only at file names, .gitattributes and the first TRIAGE_HEAD_BYTES
+    of each file. Files that pass are then ranked by priority and kept while
+    they fit the per-repo TRIAGE_MAX_FILES / TRIAGE_MAX_BYTES budget.
+    Returns the kept paths and a report of everything skipped and why.
+    """
+    rules = load_gitattributes(repo_dir)
+    skipped: List[Dict[str, str]] = []
+    candidates: List[Tuple[float, str, int]] = []
+    for rel in rel_paths:
+        path = os.path.join(repo_dir, rel)
+        try:
+            size = os.path.getsize(path)
+            head = _read_head(path, size)
+        except (OSError, ValueError) as e:
+            skipped.append({"path": rel, "reason": f"unreadable: {e}"})
+            continue
+        reason = classify_file(rel.replace("\\", "/"), head, size, rules)
+        if reason:
+            skipped.append({"path": rel, "reason": reason})
+        else:
+            candidates.append((_priority(rel, size), rel, size))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    kept: List[str] = []
+    kept_bytes = 0
+    for _priority_value, rel, size in candidates:
+        if len(kept) >= TRIAGE_MAX_FILES or kept_bytes + size > TRIAGE_MAX_BYTES:
+            skipped.append({"path": rel, "reason": "over_budget"})
+            continue
+        kept.append(rel)
+        kept_bytes += size
+
+    reasons: Dict[str, int] = {}
+    for entry in skipped:
+        key = entry["reason"].split(":", 1)[0]
+        reasons[key] = reasons.get(key, 0) + 1
+    report = {
+        "considered": len(rel_paths),
+        "kept": len(kept),
+        "kept_bytes": kept_bytes,
+        "skipped_by_reason": reasons,
+        "skipped": skipped,
+    }
+    return sorted(kept), report
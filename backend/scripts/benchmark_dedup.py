@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Measure how many embedding inputs MinHash/LSH deduplication saves on a repository.
+
+Usage: python scripts/benchmark_dedup.py <repo_url> [threshold ...]
+"""
+
+import sys
+import time
+import asyncio
+import pathlib
+
+# Add parent directory to path for imports
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from parser.extract_code import parse_repository
+from services.dedup import deduplicate_chunks
+
+
+async def main(repo_url: str, thresholds) -> int:
+    chunks = await parse_repository(repo_url)
+    total_bytes = sum(len(c["content"]) for c in chunks)
+    print(f"\n=== Deduplication benchmark: {repo_url} ===")
+    print(f"Chunks: {len(chunks)} ({total_bytes / 1e6:.1f} MB of text)")
+    print(f"{'threshold':>9} {'kept':>7} {'collapsed':>9} {'saved':>7} {'bytes saved':>11} {'time':>7}")
+    for threshold in thresholds:
+        start = time.perf_counter()
+        kept, stats = deduplicate_chunks(chunks, threshold=threshold)
+        elapsed = time.perf_counter() - start
+        kept_bytes = sum(len(c["content"]) for c in kept)
+        saved = stats["collapsed"] / max(1, stats["input"])
+        print(
+            f"{threshold:>9.2f} {stats['kept']:>7} {stats['collapsed']:>9} {saved:>6.1%}"
+            f" {(total_bytes - kept_bytes) / max(1, total_bytes):>10.1%} {elapsed:>6.2f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/benchmark_dedup.py <repo_url> [threshold ...]")
+        raise SystemExit(2)
+    thresholds = [float(t) for t in sys.argv[2:]] or [0.95, 0.9, 0.8]
+    raise SystemExit(asyncio.run(main(sys.argv[1], thresholds)))
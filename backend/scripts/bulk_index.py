@@ -0,0 +1,98 @@
+"""
+Index many repositories in one process, sharing one embedder and one worker pool.
+
+Usage (from backend/):
+    python scripts/bulk_index.py --file repos.txt --batch-id onboarding-01
+    python scripts/bulk_index.py https://github.com/a/b https://github.com/c/d
+
+Progress is saved after every step; run the same command again (same --batch-id)
+to resume an interrupted batch. Exits 1 if any repository failed.
+"""
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import uuid
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from parser.bulk_index import (  # noqa: E402
+    BULK_CLONE_CONCURRENCY,
+    BULK_EMBED_CONCURRENCY,
+    BULK_PARSE_CONCURRENCY,
+    DONE,
+    FAILED,
+    BulkIndexer,
+    BulkIndexState,
+    state_path,
+)
+from services.embedding_store import EmbeddingStore  # noqa: E402
+
+
+def _read_urls(args: argparse.Namespace) -> list:
+    urls = list(args.repo_urls)
+    if args.file:
+        for line in pathlib.Path(args.file).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    # Keep the first occurrence of each URL, in order
+    return list(dict.fromkeys(urls))
+
+
+async def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    ap.add_argument("repo_urls", nargs="*")
+    ap.add_argument("--file", help="file with one repository URL per line")
+    ap.add_argument("--batch-id", help="name of the batch; reuse it to resume")
+    ap.add_argument("--state", help="state file (default: <AUTODOC_CACHE_DIR>/bulk_index/<batch-id>.json)")
+    ap.add_argument("--subdir", help="only index this directory of every repository")
+    ap.add_argument("--no-retry-failed", action="store_true", help="on resume, leave failed repositories alone")
+    ap.add_argument("--clone-concurrency", type=int, default=BULK_CLONE_CONCURRENCY)
+    ap.add_argument("--parse-concurrency", type=int, default=BULK_PARSE_CONCURRENCY)
+    ap.add_argument("--embed-concurrency", type=int, default=BULK_EMBED_CONCURRENCY)
+    args = ap.parse_args()
+
+    urls = _read_urls(args)
+    batch_id = args.batch_id or uuid.uuid4().hex[:12]
+    path = args.state or state_path(batch_id)
+    state = BulkIndexState.load_or_create(
+        path, batch_id, urls, {"subdir": args.subdir} if args.subdir else {}, not args.no_retry_failed
+    )
+    if not state.repos:
+        ap.error("no repository URLs given")
+
+    total = len(state.repos)
+    print(f"Batch {batch_id}: {len(state.pending())} of {total} repositories to index (state: {path})")
+
+    def on_update(url: str, entry: dict) -> None:
+        if entry["status"] == DONE:
+            took = sum(entry["seconds"].values())
+            print(f"[done]   {url}: {entry['num_chunks']} chunks in {took:.1f}s", flush=True)
+        elif entry["status"] == FAILED:
+            print(f"[failed] {url}: {entry['error']}", flush=True)
+
+    # One store: the embedder is loaded once for the whole batch
+    indexer = BulkIndexer(
+        EmbeddingStore(),
+        clone_concurrency=args.clone_concurrency,
+        parse_concurrency=args.parse_concurrency,
+        embed_concurrency=args.embed_concurrency,
+    )
+    try:
+        await indexer.run(state, on_update=on_update)
+    except asyncio.CancelledError:
+        print(f"Interrupted; resume with --batch-id {batch_id}")
+        return 130
+    summary = state.summary()
+    print(f"Batch {batch_id} finished: {summary}")
+    return 1 if summary.get(FAILED) else 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume")
+        raise SystemExit(130)
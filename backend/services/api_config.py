@@ -1,5 +1,7 @@
 """API configuration constants"""
 
+import os
+
 # Perplexity API configuration
 PERPLEXITY_MODELS = {
     "default": "sonar-deep-research",  # Best for generating detailed READMEs
@@ -10,7 +12,8 @@ PERPLEXITY_MODELS = {
 }
 
 # API URLs
-PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+# Overridable to point at a proxy or a local stand-in (load tests)
+PERPLEXITY_API_URL = os.getenv("PPLX_API_URL", "https://api.perplexity.ai/chat/completions")
 
 # Default parameters
 DEFAULT_TEMPERATURE = 0.7
@@ -0,0 +1,132 @@
+import math
+import os
+import re
+import tempfile
+from typing import Any, Dict, Optional
+
+# Bump when the feature definitions change so stale metadata is recomputed
+FEATURES_VERSION = 5
+
+# Rough BPE average for source code; good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+# Base value of a chunk by role, higher is more useful README context. With a
+# symbol graph only the entrypoint and test weights apply; see compute_chunk_features
+ROLE_WEIGHTS = {
+    "entrypoint": 6.0,
+    "security": 5.0,
+    "api": 4.0,
+    "data_model": 3.0,
+    "other": 1.0,
+    "test": 0.5,
+}
+
+ENTRYPOINT_NAMES = {"main.py", "app.py", "app.js", "app.ts", "server.js", "server.ts", "index.ts", "index.js", "main.go", "main.rs"}
+TEST_DIRS = {"test", "tests", "__tests__", "spec", "specs"}
+
+# Roles that still weigh in next to centrality: entry points are imported by nothing,
+# so the graph ranks them low, and widely used test helpers are not README material
+GRAPH_ROLES = {"entrypoint", "test"}
+
+# Priority added per doubling of a file's symbol-graph centrality (1.0 = average file)
+CENTRALITY_WEIGHT = float(os.getenv("CENTRALITY_WEIGHT", "1.5"))
+CENTRALITY_CAP = 4.0
+
+# Checkouts made by parser.extract_code.clone_repository; chunk paths start with one
+_CHECKOUT_RE = re.compile(re.escape(tempfile.gettempdir().replace("\\", "/")) + r"/autodoc_[^/]+/")
+
+_DOC_LINE_RE = re.compile(r'^\s*("""|\'\'\'|/\*\*|\*|//|#)')
+_TYPE_HINT_RE = re.compile(r"\)\s*->|\b\w+\s*:\s*(?:str|int|float|bool|List|Dict|Optional|Any)\b|\binterface\s|\btype\s+\w+\s*=|@types")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def repo_relative_path(file_path: str) -> str:
+    """`file_path` without the temporary checkout directory it was parsed from, if any."""
+    path = file_path.replace("\\", "/")
+    match = _CHECKOUT_RE.match(path)
+    return path[match.end():] if match else path
+
+
+def is_test_path(path: str) -> bool:
+    """Test files by naming convention (test_x.py, x_test.go, x.test.ts, x.spec.js, tests/ ...)."""
+    parts = path.split("/")
+    if any(part in TEST_DIRS for part in parts[:-1]):
+        return True
+    name = parts[-1]
+    stem = name.split(".", 1)[0]
+    return (
+        stem in {"test", "tests", "conftest"}
+        or stem.startswith("test_")
+        or stem.endswith(("_test", "_tests"))
+        or ".test." in name
+        or ".spec." in name
+    )
+
+
+def classify_role(file_path: str) -> str:
+    # Only the repository's own path: the checkout's directory (temp dir, user
+    # name, ...) would otherwise give every file of a clone the same role
+    path = repo_relative_path(file_path).lower()
+    name = os.path.basename(path)
+    if is_test_path(path):
+        return "test"
+    if name in ENTRYPOINT_NAMES:
+        return "entrypoint"
+    if any(term in path for term in ("auth", "security", "encrypt")):
+        return "security"
+    if any(term in path for term in ("routes", "api", "controller")):
+        return "api"
+    if any(term in path for term in ("model", "schema", "database")):
+        return "data_model"
+    return "other"
+
+
+def compute_chunk_features(file_path: str, content: str, centrality: Optional[float] = None) -> Dict[str, Any]:
+    """Compute ranking features for one chunk. Called once per chunk at index time.
+
+    centrality: PageRank of the chunk's file in the repository's symbol graph
+    (parser.symbol_graph), scaled so that 1.0 is average; None when unknown.
+    """
+    lines = content.splitlines() or [""]
+    doc_lines = sum(1 for line in lines if _DOC_LINE_RE.match(line))
+    doc_density = doc_lines / len(lines)
+    has_type_hints = _TYPE_HINT_RE.search(content) is not None
+
+    role = classify_role(file_path)
+    if centrality is None or role in GRAPH_ROLES:
+        priority = ROLE_WEIGHTS[role]
+    else:
+        # Centrality replaces the path-keyword roles (auth, routes, models, ...)
+        priority = ROLE_WEIGHTS["other"]
+    # Documented and typed code explains itself better in a README context
+    priority += min(doc_density, 0.5)
+    if has_type_hints:
+        priority += 0.3
+    # Code that much of the repository depends on is the core a README should explain
+    if centrality is not None:
+        priority += CENTRALITY_WEIGHT * min(math.log2(1.0 + centrality), CENTRALITY_CAP)
+
+    return {
+        "version": FEATURES_VERSION,
+        "role": role,
+        "size": len(content),
+        "lines": len(lines),
+        "tokens": estimate_tokens(content),
+        "doc_density": round(doc_density, 4),
+        "has_type_hints": has_type_hints,
+        "centrality": centrality,
+        "priority": round(priority, 4),
+    }
+
+
+def get_chunk_features(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the index-time features of a chunk, computing them for legacy rows."""
+    features = (chunk.get("metadata") or {}).get("features")
+    if features and features.get("version") == FEATURES_VERSION:
+        return features
+    return compute_chunk_features(
+        chunk.get("file_path", ""), chunk.get("content", ""), (chunk.get("metadata") or {}).get("centrality")
+    )
@@ -1,11 +1,17 @@
 import os
 from typing import List
 import cohere
+from .metrics import provider_call
 
 COHERE_MODEL = os.getenv("COHERE_EMBED_MODEL", "embed-multilingual-v3.0")
 
 
 class CohereClient:
+    # Embedding calls are paced by services.rate_limiter; the API takes at most 96 texts per call
+    rate_limit_key = "cohere"
+    embed_batch_size = 96
+    model_name = COHERE_MODEL
+
     def __init__(self) -> None:
         api_key = os.getenv("COHERE_API_KEY")
         if not api_key:
@@ -13,5 +19,6 @@ class CohereClient:
         self.client = cohere.Client(api_key)
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        resp = self.client.embed(texts=texts, model=COHERE_MODEL, input_type="search_document")
+        with provider_call("cohere", "embed"):
+            resp = self.client.embed(texts=texts, model=COHERE_MODEL, input_type="search_document")
         return [list(map(float, v)) for v in resp.embeddings]
@@ -0,0 +1,143 @@
+"""
+Negotiated response compression (brotli or gzip) as pure ASGI middleware.
+
+Unlike Starlette's GZipMiddleware it also speaks brotli (when the `brotli`
+package is installed) and flushes every body chunk of a streamed response, so
+NDJSON lines reach the client as they are produced instead of when the
+compressor's buffer fills.
+"""
+
+import gzip
+import os
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli  # optional: gzip only without it
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli's high levels are too slow for per-request use; 4-5 beats gzip -6 at similar speed
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Already compressed, or pointless to compress
+_SKIP_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "text/event-stream")
+
+Message = Dict[str, Any]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header (honouring q=0), or None."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            weights[coding.strip().lower()] = q
+    supported = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get("*", 0.0))
+        # Ties go to the earlier (denser) coding
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _one_shot(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: Callable[..., Awaitable[None]], minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict((k.lower(), v) for k, v in scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if compressor is None:
+                assert start is not None
+                response_headers: List[Tuple[bytes, bytes]] = list(start.get("headers", []))
+                names = {k.lower() for k, _ in response_headers}
+                content_type = dict((k.lower(), v) for k, v in response_headers).get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in names
+                    or content_type.startswith(_SKIP_TYPES)
+                    or (not more and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                response_headers = [
+                    # A strong ETag names exact bytes, and these are new ones: weaken it
+                    (k, b"W/" + v) if k.lower() == b"etag" and not v.startswith(b"W/") else (k, v)
+                    for k, v in response_headers
+                    if k.lower() != b"content-length"
+                ]
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                vary = [v for k, v in response_headers if k.lower() == b"vary"]
+                if not vary:
+                    response_headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary[0].lower():
+                    response_headers = [(k, v) for k, v in response_headers if k.lower() != b"vary"]
+                    response_headers.append((b"vary", vary[0] + b", Accept-Encoding"))
+                if not more:
+                    # Whole body in one message: one-shot compression, exact length
+                    compressed = _one_shot(encoding, body)
+                    response_headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send(dict(start, headers=response_headers))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                compressor = _Compressor(encoding)
+                await send(dict(start, headers=response_headers))
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more), "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
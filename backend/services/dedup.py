@@ -0,0 +1,118 @@
+import copy
+import os
+import re
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Chunks whose estimated Jaccard similarity reaches this are collapsed into one
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in {"1", "true", "yes"}
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+_rng = np.random.RandomState(1)
+# a, b < 2**32 and shingle hashes < 2**32, so a * h + b never overflows uint64
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    tokens = _TOKEN_RE.findall(text)
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+def minhash_signature(text: str, block: int = 4096) -> np.ndarray:
+    hashes = _shingles(text)
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    # Blocked so that large files do not materialise a (shingles x NUM_PERM) matrix
+    for start in range(0, len(hashes), block):
+        permuted = (np.outer(hashes[start:start + block], _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to `threshold`."""
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def deduplicate_chunks(
+    chunks: List[Dict[str, Any]], threshold: float = DEDUP_THRESHOLD
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Collapse near-identical chunks (MinHash + LSH) into one representative each.
+
+    The representative keeps its own content and lists the other copies' paths
+    in metadata["duplicates"]. Returns the kept chunks and a small stats dict.
+    """
+    if len(chunks) < 2:
+        return chunks, {"input": len(chunks), "kept": len(chunks), "collapsed": 0}
+
+    signatures = np.stack([minhash_signature(c["content"]) for c in chunks])
+    bands, rows = lsh_params(threshold)
+    parent = list(range(len(chunks)))
+    for band in range(bands):
+        buckets: Dict[bytes, int] = {}
+        band_sig = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(len(chunks)):
+            key = band_sig[i].tobytes()
+            j = buckets.setdefault(key, i)
+            if j == i:
+                continue
+            ri, rj = _find(parent, i), _find(parent, j)
+            # LSH only proposes candidates; confirm with the full signature
+            if ri != rj and np.mean(signatures[i] == signatures[j]) >= threshold:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(chunks)):
+        clusters.setdefault(_find(parent, i), []).append(i)
+
+    kept: List[Dict[str, Any]] = []
+    for members in clusters.values():
+        # The shortest path is usually the canonical copy rather than a vendored one
+        members.sort(key=lambda i: (len(chunks[i].get("file_path", "")), chunks[i].get("file_path", "")))
+        while members:
+            # Union-find merges transitively (A~B and B~C joins A and C): only the
+            # members that are near-identical to the representative itself collapse
+            # into it, the rest are grouped again around the next representative
+            agreement = np.mean(signatures[members[1:]] == signatures[members[0]], axis=1)
+            copies = [i for i, a in zip(members[1:], agreement) if a >= threshold]
+            rep = chunks[members[0]]
+            if copies:
+                # copy.copy rather than dict(): a compact Chunk stays compact
+                rep = copy.copy(rep)
+                metadata = dict(rep.get("metadata", {}))
+                metadata["duplicates"] = [chunks[i]["file_path"] for i in copies]
+                rep["metadata"] = metadata
+            kept.append(rep)
+            members = [i for i, a in zip(members[1:], agreement) if a < threshold]
+
+    stats = {"input": len(chunks), "kept": len(kept), "collapsed": len(chunks) - len(kept)}
+    return kept, stats
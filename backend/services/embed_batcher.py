@@ -0,0 +1,104 @@
+"""
+Dynamic micro-batching in front of a local embedder.
+
+Concurrent callers each hand in a few texts; the dispatcher collects them for at
+most EMBED_BATCH_MAX_WAIT_MS (or until EMBED_BATCH_MAX_SIZE texts are waiting),
+runs one `embed_texts` call in a worker thread and fans the vectors back out.
+Batches run one at a time, so requests that arrive during a forward pass simply
+form the next batch.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from .metrics import EMBED_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+EMBED_MICRO_BATCH = os.getenv("EMBED_MICRO_BATCH", "true").lower() in {"1", "true", "yes"}
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "2"))
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: "asyncio.Future[List[List[float]]]"
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_texts: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+        name: str = "",
+    ) -> None:
+        self.embed_texts = embed_texts
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        # Bound to the loop that first used the batcher; rebuilt if that loop goes away
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[_Request]"] = None
+        self._worker: Optional["asyncio.Task[None]"] = None
+        self._last_batch_requests = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        request = _Request(list(texts), loop.create_future())
+        self._queue.put_nowait(request)
+        return await request.future
+
+    async def _collect(self, queue: "asyncio.Queue[_Request]") -> List[_Request]:
+        batch = [await queue.get()]
+        size = len(batch[0].texts)
+        # Only wait for company when the last batch had some: a lone request on an
+        # idle service goes straight through, and a burst's later arrivals batch up
+        # behind its first request anyway
+        wait = self.max_wait if self._last_batch_requests > 1 else 0.0
+        deadline = asyncio.get_running_loop().time() + wait
+        while size < self.max_batch_size:
+            try:
+                request = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _run(self, queue: "asyncio.Queue[_Request]") -> None:
+        while True:
+            batch = [r for r in await self._collect(queue) if not r.future.done()]
+            self._last_batch_requests = len(batch)
+            if not batch:
+                continue
+            # Identical texts (the same query from several clients) are embedded once
+            unique = list(dict.fromkeys(text for r in batch for text in r.texts))
+            EMBED_BATCH_SIZE.observe(len(unique), embedder=self.name)
+            try:
+                vectors = await asyncio.to_thread(self.embed_texts, unique)
+            except Exception as e:
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                continue
+            by_text = dict(zip(unique, vectors))
+            for r in batch:
+                if not r.future.done():
+                    r.future.set_result([by_text[text] for text in r.texts])
@@ -0,0 +1,99 @@
+"""
+A local embedding process that several API workers share.
+
+With `uvicorn main:app --workers N` every worker would load its own copy of a
+local model and batch only its own requests. Instead, run one embedding server
+
+    python -m services.embed_server --port 8765        (from backend/)
+
+and start the API with EMBEDDINGS_PROVIDER=embed_server
+EMBED_SERVER_URL=http://127.0.0.1:8765. The server loads the model selected by
+its own EMBEDDINGS_PROVIDER and micro-batches requests from all workers.
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, List
+
+import httpx
+
+EMBED_SERVER_URL = os.getenv("EMBED_SERVER_URL", "http://127.0.0.1:8765")
+EMBED_SERVER_TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "60"))
+
+
+class EmbedServerClient:
+    """Embedding client backed by an embed_server process."""
+
+    # Remote calls are batched by the server; batching them here too would only add latency
+    micro_batch = False
+
+    def __init__(self, url: str = EMBED_SERVER_URL) -> None:
+        self.url = url.rstrip("/")
+        self._client = httpx.Client(base_url=self.url, timeout=EMBED_SERVER_TIMEOUT)
+        try:
+            info = self._client.get("/info").raise_for_status().json()
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Embedding server at {self.url} is not reachable: {e}") from e
+        self.provider = info["provider"]
+        # Same identity rules as in-process: only named models are cacheable across processes
+        self.model_name = f"{info['provider']}/{info['model_name']}" if info["model_name"] else ""
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        resp = self._client.post("/embed", json={"texts": texts})
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+
+def create_app() -> Any:
+    from fastapi import FastAPI
+    from fastapi.responses import ORJSONResponse
+    from pydantic import BaseModel
+
+    from .embed_batcher import EmbeddingBatcher
+    from .embedding_store import create_embedder, embedder_identity
+
+    if os.getenv("EMBEDDINGS_PROVIDER", "").lower() == "embed_server":
+        raise RuntimeError("The embedding server needs a real EMBEDDINGS_PROVIDER, not 'embed_server'")
+    embedder = create_embedder()
+    provider, model_name = embedder_identity(embedder)
+    # Embedders that fit on their first call (tf-idf, the small NN) opt out of batching
+    batcher = EmbeddingBatcher(embedder.embed_texts, name=provider) if getattr(embedder, "micro_batch", True) else None
+    app = FastAPI(title="AutoDoc.AI embedding server", default_response_class=ORJSONResponse)
+
+    class EmbedRequest(BaseModel):
+        texts: List[str]
+
+    @app.get("/info")
+    async def info() -> Dict[str, Any]:
+        return {"provider": provider, "model_name": model_name, "max_batch_size": batcher.max_batch_size if batcher else None}
+
+    @app.post("/embed")
+    async def embed(req: EmbedRequest) -> Any:
+        # Requests larger than a batch are a batch on their own
+        if batcher is None or len(req.texts) >= batcher.max_batch_size:
+            vectors = await asyncio.to_thread(embedder.embed_texts, req.texts)
+        else:
+            vectors = await batcher.embed(req.texts)
+        return ORJSONResponse({"embeddings": vectors})
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Shared local embedding server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    # One process on purpose: a single model copy and a single batching queue
+    uvicorn.run(create_app(), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
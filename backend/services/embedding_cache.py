@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .summary_cache import CACHE_DIR
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+# Evict down to this fraction of the cap so that eviction does not run on every insert
+EVICT_TO = 0.9
+# Approximate per-row cost on top of the vector blob (key columns, index entries)
+ROW_OVERHEAD_BYTES = 160
+
+
+class EmbeddingCache:
+    """
+    Persistent store of document embeddings, shared across repos and re-parses.
+
+    Entries are keyed by (provider, model, dimension, content hash) and stored as
+    float16 blobs. The file is bounded to EMBEDDING_CACHE_MAX_MB by evicting the
+    least recently used entries.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(CACHE_DIR, "embeddings.sqlite3")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute(
+                "create table if not exists embeddings ("
+                " provider text not null,"
+                " model text not null,"
+                " dim integer not null,"
+                " content_hash text not null,"
+                " vector blob not null,"
+                " last_used real not null,"
+                " primary key (provider, model, dim, content_hash))"
+            )
+            self._conn.execute("create index if not exists embeddings_last_used on embeddings (last_used)")
+            self._conn.commit()
+            row = self._conn.execute("select count(*), coalesce(sum(length(vector)), 0) from embeddings").fetchone()
+        self._bytes = row[1] + row[0] * ROW_OVERHEAD_BYTES
+
+    def latest_dim(self, provider: str, model: str) -> Optional[int]:
+        """Dimension of the most recently used vectors of this model, if any are cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "select dim from embeddings where provider = ? and model = ? order by last_used desc limit 1",
+                (provider, model),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, hashes: Iterable[str], provider: str, model: str, dim: int) -> Dict[str, List[float]]:
+        keys = list(set(hashes))
+        found: Dict[str, List[float]] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"select content_hash, vector from embeddings where provider = ? and model = ? and dim = ?"
+                    f" and content_hash in ({placeholders})",
+                    [provider, model, dim, *batch],
+                ).fetchall()
+            for h, blob in rows:
+                found[h] = np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+        if found:
+            now = time.time()
+            with self._lock:
+                self._conn.executemany(
+                    "update embeddings set last_used = ? where provider = ? and model = ? and dim = ? and content_hash = ?",
+                    [(now, provider, model, dim, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, Sequence[float]]], provider: str, model: str) -> None:
+        now = time.time()
+        rows = []
+        for h, vector in entries:
+            blob = np.asarray(vector, dtype=np.float16).tobytes()
+            rows.append((provider, model, len(blob) // 2, h, blob, now))
+        if not rows:
+            return
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "insert or ignore into embeddings (provider, model, dim, content_hash, vector, last_used)"
+                " values (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            inserted = self._conn.total_changes - before
+            # Rows in one batch share a dimension, so the new bytes are easy to estimate
+            self._bytes += inserted * (len(rows[0][4]) + ROW_OVERHEAD_BYTES)
+            if self._bytes > self.max_bytes:
+                self._evict(len(rows[0][4]) + ROW_OVERHEAD_BYTES)
+
+    def _evict(self, row_bytes: int) -> None:
+        """Drop least recently used rows until the cache is back under EVICT_TO of its cap. Caller holds the lock."""
+        excess = self._bytes - int(self.max_bytes * EVICT_TO)
+        count = max(1, excess // row_bytes)
+        self._conn.execute(
+            "delete from embeddings where rowid in (select rowid from embeddings order by last_used limit ?)", (count,)
+        )
+        self._conn.commit()
+        row = self._conn.execute("select count(*), coalesce(sum(length(vector)), 0) from embeddings").fetchone()
+        self._bytes = row[1] + row[0] * ROW_OVERHEAD_BYTES
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,94 +1,362 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Mapping, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
 import os
+import uuid
+import numpy as np
 from .supabase_client import SupabaseClient
+from .chunk_features import compute_chunk_features, estimate_tokens
+from .dedup import DEDUP_ENABLED, deduplicate_chunks
+from .embed_batcher import EMBED_MICRO_BATCH, EmbeddingBatcher
+from .embedding_cache import EMBEDDING_CACHE_ENABLED, EmbeddingCache
+from .lru_cache import LRUCache
+from .metrics import BYTES_TOTAL, CACHE_REQUESTS_TOTAL, CHUNKS_TOTAL, timed
+from .rate_limiter import get_scheduler
+from .single_flight import SingleFlight
+from .summary_cache import content_hash
 
+logger = logging.getLogger(__name__)
 
-class EmbeddingStore:
-    def __init__(self) -> None:
-        provider = os.getenv("EMBEDDINGS_PROVIDER", "hf").lower()
-        # provider: 'hf' (huggingface inference/local), 'openai', 'cohere', 'nn', 'tfidf'
-        if provider == "cohere":
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+# Bounds staleness when another instance re-indexes a repo; local re-indexing invalidates immediately
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# 'postgrest': match_code_chunks RPC via supabase-py; 'postgres': pooled async
+# queries straight against SUPABASE_DB_URL (services.pg_search)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgrest").lower()
+# Chunks embedded and inserted per batch while indexing, and batches in flight at once
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+INDEX_CONCURRENCY = int(os.getenv("INDEX_CONCURRENCY", "4"))
+
+
+def embedder_identity(embedder: Any) -> Tuple[str, str]:
+    """(provider, model) of an embedding client, for cache keys."""
+    return type(embedder).__name__, str(getattr(embedder, "model_name", ""))
+
+
+def create_embedder() -> Any:
+    """Build the embedding client selected by EMBEDDINGS_PROVIDER."""
+    provider = os.getenv("EMBEDDINGS_PROVIDER", "hf").lower()
+    # provider: 'hf' (huggingface inference/local), 'openai', 'cohere', 'nn', 'tfidf', 'embed_server'
+    if provider == "cohere":
+        try:
+            from .cohere_client import CohereClient  # type: ignore
+
+            return CohereClient()
+        except Exception as e:
+            raise RuntimeError(
+                "Cohere provider selected but cohere client is unavailable. Install 'cohere' or switch EMBEDDINGS_PROVIDER."
+            ) from e
+    elif provider == "openai":
+        try:
+            from .openai_client import OpenAIClient  # type: ignore
+
+            return OpenAIClient()
+        except Exception as e:
+            raise RuntimeError("OPENAI_API_KEY is required for OpenAI provider") from e
+    elif provider in {"hf", "huggingface"}:
+        # Prefer HF inference client if available, else try local sentence-transformers
+        try:
+            from .hf_client import HuggingFaceEmbeddingClient  # type: ignore
+
+            return HuggingFaceEmbeddingClient()
+        except Exception:
+            # Fallback to OpenAI if HF not configured or local packages missing
             try:
-                from .cohere_client import CohereClient  # type: ignore
+                from .openai_client import OpenAIClient  # type: ignore
 
-                self.embedder = CohereClient()
+                return OpenAIClient()
             except Exception as e:
                 raise RuntimeError(
-                    "Cohere provider selected but cohere client is unavailable. Install 'cohere' or switch EMBEDDINGS_PROVIDER."
+                    "Hugging Face client unavailable and OPENAI_API_KEY not set. Configure HF or OpenAI."
                 ) from e
-        elif provider == "openai":
+    elif provider == "nn":
+        try:
+            from .simple_nn_client import SimpleNNEmbeddingClient  # type: ignore
+
+            embedding_dim = int(os.getenv("NN_EMBEDDING_DIM", "128"))
+            return SimpleNNEmbeddingClient(embedding_dim=embedding_dim)
+        except Exception as e:
+            raise RuntimeError("NN provider selected but required client is unavailable.") from e
+    elif provider == "embed_server":
+        # A local embedding process shared by several uvicorn workers (services.embed_server)
+        from .embed_server import EmbedServerClient
+
+        return EmbedServerClient()
+    elif provider == "tfidf":
+        try:
+            from .tfidf_client import TFIDFEmbeddingClient  # type: ignore
+
+            return TFIDFEmbeddingClient()
+        except Exception as e:
+            raise RuntimeError("TF-IDF provider selected but required client is unavailable.") from e
+    else:
+        # default: try HF then OpenAI
+        try:
+            from .hf_client import HuggingFaceEmbeddingClient  # type: ignore
+
+            return HuggingFaceEmbeddingClient()
+        except Exception:
             try:
                 from .openai_client import OpenAIClient  # type: ignore
 
-                self.embedder = OpenAIClient()
+                return OpenAIClient()
             except Exception as e:
-                raise RuntimeError("OPENAI_API_KEY is required for OpenAI provider") from e
-        elif provider in {"hf", "huggingface"}:
-            # Prefer HF inference client if available, else try local sentence-transformers
-            try:
-                from .hf_client import HuggingFaceEmbeddingClient  # type: ignore
-
-                self.embedder = HuggingFaceEmbeddingClient()
-            except Exception:
-                # Fallback to OpenAI if HF not configured or local packages missing
-                try:
-                    from .openai_client import OpenAIClient  # type: ignore
-
-                    self.embedder = OpenAIClient()
-                except Exception as e:
-                    raise RuntimeError(
-                        "Hugging Face client unavailable and OPENAI_API_KEY not set. Configure HF or OpenAI."
-                    ) from e
-        elif provider == "nn":
-            try:
-                from .simple_nn_client import SimpleNNEmbeddingClient  # type: ignore
+                raise RuntimeError("No embedding provider is available. Configure HF or OpenAI.") from e
 
-                embedding_dim = int(os.getenv("NN_EMBEDDING_DIM", "128"))
-                self.embedder = SimpleNNEmbeddingClient(embedding_dim=embedding_dim)
-            except Exception as e:
-                raise RuntimeError("NN provider selected but required client is unavailable.") from e
-        elif provider == "tfidf":
-            try:
-                from .tfidf_client import TFIDFEmbeddingClient  # type: ignore
 
-                self.embedder = TFIDFEmbeddingClient()
+class EmbeddingStore:
+    def __init__(
+        self,
+        embedder: Optional[Any] = None,
+        supabase: Optional[SupabaseClient] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ) -> None:
+        # All can be injected (benchmarks, batch jobs sharing one loaded model)
+        self.embedder = embedder if embedder is not None else create_embedder()
+        self.supabase = supabase if supabase is not None else SupabaseClient()
+        # Only named models give the same vector for the same text in every process;
+        # tf-idf and the small NN are fitted per corpus, so their vectors are not reusable
+        if embedding_cache is None and EMBEDDING_CACHE_ENABLED and embedder_identity(self.embedder)[1]:
+            embedding_cache = EmbeddingCache()
+        self.embedding_cache = embedding_cache
+        self.pg_search = None
+        if SEARCH_BACKEND == "postgres":
+            dsn = os.getenv("SUPABASE_DB_URL")
+            if not dsn:
+                raise RuntimeError("SUPABASE_DB_URL is required when SEARCH_BACKEND=postgres")
+            from .pg_search import PostgresSearch
+
+            self.pg_search = PostgresSearch(dsn)
+        self._embedding_dim: Optional[int] = None
+        # Small local embedding calls from concurrent requests share forward passes
+        self._batcher: Optional[EmbeddingBatcher] = None
+        if (
+            EMBED_MICRO_BATCH
+            and getattr(self.embedder, "rate_limit_key", None) is None
+            and getattr(self.embedder, "micro_batch", True)
+        ):
+            self._batcher = EmbeddingBatcher(self.embedder.embed_texts, name=embedder_identity(self.embedder)[0])
+        # Identical concurrent searches share one embedding + RPC round trip
+        self._search_flight = SingleFlight()
+        self._query_embeddings = LRUCache("query_embedding", QUERY_EMBEDDING_CACHE_SIZE)
+        self._search_results = LRUCache("search_results", SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # Bumped whenever a repo is (re-)indexed; part of the search cache key, so
+        # older results, including ones still in flight, are never served again
+        self._repo_generation: Dict[str, int] = {}
+
+    async def index_chunks(
+        self,
+        chunks: Sequence[Mapping],
+        symbol_graph: Optional[Dict[str, Any]] = None,
+        index_run: Optional[str] = None,
+    ) -> None:
+        """
+        Embed and insert chunks; `symbol_graph` (from parse_repository) is stored alongside them.
+
+        Chunks go through in batches of INDEX_BATCH_SIZE, INDEX_CONCURRENCY at a
+        time, so only those batches' texts, vectors and rows are in memory at once.
+        If any batch fails, or the call is cancelled, the rows it already inserted
+        are deleted again (they carry its id as metadata.index_run) before the
+        error is raised. Callers that must clean up after a killed process pass
+        (and record) their own `index_run`; see delete_index_run.
+        """
+        if DEDUP_ENABLED:
+            # Near-identical copies (vendored forks, generated clients, ...) are
+            # embedded once; the representative lists the others in metadata
+            with timed("dedup"):
+                # MinHash over the whole repository is CPU-bound: keep it off the event loop
+                chunks, stats = await asyncio.to_thread(deduplicate_chunks, chunks)
+            logger.info("Deduplicated %d chunks to %d", stats["input"], stats["kept"])
+        if not chunks:
+            return
+        tenant = chunks[0]["repo_url"]
+        batch_size = max(1, INDEX_BATCH_SIZE)
+        if getattr(self.embedder, "fitted", True) is False:
+            # TF-IDF and the small NN fit on their first call: it has to see the whole corpus
+            batch_size = len(chunks)
+        slots = asyncio.Semaphore(max(1, INDEX_CONCURRENCY))
+        index_run = index_run or uuid.uuid4().hex
+
+        async def index_batch(batch: List[Mapping]) -> None:
+            async with slots:
+                # Compact chunks decode their text here; it is dropped with the batch's rows
+                texts = [c["content"] for c in batch]
+                with timed("embed"):
+                    vectors = await self._embed_documents(texts, tenant=tenant)
+                CHUNKS_TOTAL.inc(len(texts), stage="embed")
+                BYTES_TOTAL.inc(sum(len(t) for t in texts), stage="embed")
+                rows = []
+                for chunk, text, vec in zip(batch, texts, vectors):
+                    # Ranking features are computed once here so README generation
+                    # only has to look them up
+                    metadata = dict(chunk.get("metadata", {}))
+                    metadata["features"] = compute_chunk_features(chunk["file_path"], text, metadata.get("centrality"))
+                    metadata["index_run"] = index_run
+                    rows.append(
+                        {
+                            "repo_url": chunk["repo_url"],
+                            "file_path": chunk["file_path"],
+                            "content": text,
+                            "metadata": metadata,
+                            "embedding": vec,
+                        }
+                    )
+                # Large inserts take seconds (HTTP or COPY); keep them off the event loop.
+                # A thread cannot be cancelled, so the insert is shielded: a cancelled
+                # run still waits for it to land before deleting the run's rows
+                insert = asyncio.ensure_future(asyncio.to_thread(self.supabase.insert_code_chunks, rows))
+                inserts.append(insert)
+                await asyncio.shield(insert)
+
+        inserts: List["asyncio.Future[None]"] = []
+        repo_urls = {c["repo_url"] for c in chunks}
+        try:
+            # Let every batch finish before acting on a failure, so none inserts after the cleanup
+            results = await asyncio.gather(
+                *(index_batch(chunks[i:i + batch_size]) for i in range(0, len(chunks), batch_size)),
+                return_exceptions=True,
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+        except BaseException:
+            # Failed or cancelled (shutdown, client disconnect): shielded so that a
+            # second cancellation cannot interrupt the cleanup
+            await asyncio.shield(self._remove_index_run(repo_urls, index_run, inserts))
+            raise
+        finally:
+            # Even a failed run may have changed the stored rows for a while
+            for repo_url in repo_urls:
+                self._repo_generation[repo_url] = self._repo_generation.get(repo_url, 0) + 1
+        if symbol_graph:
+            # Centrality already lives in the chunk metadata; the stored graph is for inspection only
+            try:
+                await asyncio.to_thread(self.supabase.upsert_symbol_graph, tenant, symbol_graph)
             except Exception as e:
-                raise RuntimeError("TF-IDF provider selected but required client is unavailable.") from e
-        else:
-            # default: try HF then OpenAI
+                logger.warning("Storing the symbol graph of %s failed: %s", tenant, e)
+
+    async def delete_index_run(self, repo_url: str, index_run: str) -> None:
+        """Delete the rows an index_chunks run stored for `repo_url`, e.g. one whose process was killed."""
+        await asyncio.to_thread(self.supabase.delete_index_run, repo_url, index_run)
+        self._repo_generation[repo_url] = self._repo_generation.get(repo_url, 0) + 1
+
+    async def _remove_index_run(
+        self, repo_urls: Set[str], index_run: str, inserts: Sequence["asyncio.Future[None]"]
+    ) -> None:
+        """Delete the rows of an index_chunks run that did not complete, once its in-flight inserts are done."""
+        await asyncio.gather(*inserts, return_exceptions=True)
+        for repo_url in repo_urls:
             try:
-                from .hf_client import HuggingFaceEmbeddingClient  # type: ignore
-
-                self.embedder = HuggingFaceEmbeddingClient()
-            except Exception:
-                try:
-                    from .openai_client import OpenAIClient  # type: ignore
-
-                    self.embedder = OpenAIClient()
-                except Exception as e:
-                    raise RuntimeError("No embedding provider is available. Configure HF or OpenAI.") from e
-
-        self.supabase = SupabaseClient()
-
-    async def index_chunks(self, chunks: List[Dict[str, Any]]) -> None:
-        texts = [c["content"] for c in chunks]
-        vectors = self.embedder.embed_texts(texts)
-        rows = []
-        for chunk, vec in zip(chunks, vectors):
-            rows.append(
-                {
-                    "repo_url": chunk["repo_url"],
-                    "file_path": chunk["file_path"],
-                    "content": chunk["content"],
-                    "metadata": chunk.get("metadata", {}),
-                    "embedding": vec,
-                }
+                await asyncio.to_thread(self.supabase.delete_index_run, repo_url, index_run)
+            except Exception as e:
+                logger.warning("Removing the partial index of %s (run %s) failed: %s", repo_url, index_run, e)
+
+    async def _embed_documents(self, texts: List[str], tenant: str) -> List[List[float]]:
+        """Embed chunk texts, reusing cached vectors of identical content; only misses reach the provider."""
+        if self.embedding_cache is None or not texts:
+            return await self._embed(texts, tenant)
+        cache = self.embedding_cache
+        provider, model = embedder_identity(self.embedder)
+        hashes = [content_hash(t) for t in texts]
+        if self._embedding_dim is None:
+            self._embedding_dim = await asyncio.to_thread(cache.latest_dim, provider, model)
+        cached: Dict[str, List[float]] = {}
+        if self._embedding_dim is not None:
+            cached = await asyncio.to_thread(cache.get_many, hashes, provider, model, self._embedding_dim)
+
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached:
+                missing.setdefault(h, text)
+        CACHE_REQUESTS_TOTAL.inc(len(texts) - len(missing), cache="embedding", outcome="hit")
+        CACHE_REQUESTS_TOTAL.inc(len(missing), cache="embedding", outcome="miss")
+        logger.info("Embedding cache: %d hits, %d misses", len(texts) - len(missing), len(missing))
+        if missing:
+            fresh = dict(zip(missing, await self._embed(list(missing.values()), tenant)))
+            self._embedding_dim = len(next(iter(fresh.values())))
+            await asyncio.to_thread(cache.put_many, fresh.items(), provider, model)
+            cached.update(fresh)
+        return [cached[h] for h in hashes]
+
+    async def _embed(self, texts: List[str], tenant: str) -> List[List[float]]:
+        provider = getattr(self.embedder, "rate_limit_key", None)
+        if provider is None:
+            # Local models: few texts join a shared micro-batch, many are already a batch;
+            # either way the forward pass runs off the event loop
+            if self._batcher is not None and len(texts) < self._batcher.max_batch_size:
+                return await self._batcher.embed(texts)
+            return await asyncio.to_thread(self.embedder.embed_texts, texts)
+        # Remote providers: batches go through the shared scheduler, which paces
+        # them and interleaves them fairly with other repos' batches
+        scheduler = get_scheduler(provider)
+        size = getattr(self.embedder, "embed_batch_size", 64)
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(
+            *(
+                scheduler.run(self.embedder.embed_texts, batch, tokens=sum(map(estimate_tokens, batch)), tenant=tenant)
+                for batch in batches
             )
-        self.supabase.insert_code_chunks(rows)
+        )
+        return [vector for result in results for vector in result]
+
+    async def list_chunks(self, repo_url: str, limit: int = 5000) -> List[Dict[str, Any]]:
+        """All indexed chunks of a repo, for generation modes that cover the whole tree."""
+        return await asyncio.to_thread(self.supabase.fetch_code_chunks, repo_url, limit)
+
+    async def _embed_queries(self, queries: List[str], tenant: str) -> List[List[float]]:
+        """Embed queries through the LRU cache; all misses go to the provider in one batch."""
+        with timed("embed_query"):
+            identity = embedder_identity(self.embedder)
+            vectors: Dict[str, List[float]] = {}
+            for query in queries:
+                cached = self._query_embeddings.get((*identity, query))
+                if cached is not None:
+                    vectors[query] = cached.tolist()
+            missing = list(dict.fromkeys(q for q in queries if q not in vectors))
+            if missing:
+                for query, vec in zip(missing, await self._embed(missing, tenant=tenant)):
+                    vectors[query] = vec
+                    # float32 arrays are ~8x smaller than lists of Python floats
+                    self._query_embeddings.put((*identity, query), np.asarray(vec, dtype=np.float32))
+            return [vectors[q] for q in queries]
+
+    async def search_many(
+        self, repo_url: str, queries: List[str], top_k: int = 20, include_embeddings: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several queries against one repo: one embedding batch, then concurrent searches."""
+        vectors = await self._embed_queries(queries, tenant=repo_url)
+        return await asyncio.gather(*(self._search(repo_url, vec, top_k, include_embeddings) for vec in vectors))
+
+    async def _search(
+        self, repo_url: str, vector: List[float], top_k: int, include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        if self.pg_search is not None:
+            return await self.pg_search.search_code_chunks(repo_url, vector, top_k, include_embeddings)
+        # supabase-py is blocking; keep the RPC off the event loop
+        return await asyncio.to_thread(self.supabase.search_code_chunks, repo_url, vector, top_k, include_embeddings)
+
+    async def close(self) -> None:
+        if self.pg_search is not None:
+            await self.pg_search.close()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"query_embedding": self._query_embeddings.stats(), "search_results": self._search_results.stats()}
 
     async def search_chunks(self, repo_url: str, query: str, top_k: int = 20) -> List[Dict[str, Any]]:
-        q_vec = self.embedder.embed_texts([query])[0]
-        candidates = self.supabase.search_code_chunks(repo_url, q_vec, top_k=200)
+        key = (repo_url, self._repo_generation.get(repo_url, 0), query, top_k)
+        results = self._search_results.get(key)
+        if results is None:
+            results = await self._search_flight.do(key, lambda: self._search_chunks(repo_url, query, top_k))
+            self._search_results.put(key, results)
+        # Waiters and cache hits share the result list; hand each caller its own copy
+        return list(results)
+
+    async def _search_chunks(self, repo_url: str, query: str, top_k: int) -> List[Dict[str, Any]]:
+        # The embedder and the search both run off the event loop so that
+        # concurrent callers can actually overlap (and be coalesced)
+        q_vec = (await self._embed_queries([query], tenant=repo_url))[0]
+        candidates = await self._search(repo_url, q_vec, 200)
         if not candidates:
             return []
         return candidates[:top_k]
@@ -1,11 +1,15 @@
 import os
 from typing import List
+from .metrics import provider_call
 
 HF_DEFAULT_MODEL = os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 HF_USE_INFERENCE = os.getenv("HF_USE_INFERENCE", "false").lower() in {"1", "true", "yes"}
 
 
 class HuggingFaceEmbeddingClient:
+    # Set for the hosted Inference API, whose calls are paced by services.rate_limiter
+    rate_limit_key = None
+
     def __init__(self) -> None:
         self.model_name = HF_DEFAULT_MODEL
         if HF_USE_INFERENCE:
@@ -16,6 +20,9 @@ class HuggingFaceEmbeddingClient:
             # Uses hosted Inference API, feature-extraction task
             self.client = InferenceClient(api_key=token)
             self.mode = "inference"
+            self.rate_limit_key = "hf-inference"
+            # One HTTP request per text, so one text per scheduled call
+            self.embed_batch_size = 1
         else:
             from sentence_transformers import SentenceTransformer  # lazy import
             self.model = SentenceTransformer(self.model_name)
@@ -25,13 +32,15 @@ class HuggingFaceEmbeddingClient:
         if not texts:
             return []
         if self.mode == "local":
-            embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+            with provider_call("hf-local", "embed"):
+                embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
             return embeddings.tolist()
         # Inference API: use feature-extraction
         # The client returns list[list[float]] per input when using feature_extraction
         features: List[List[float]] = []
         for t in texts:
-            vec = self.client.feature_extraction(t, model=self.model_name)
+            with provider_call("hf-inference", "embed"):
+                vec = self.client.feature_extraction(t, model=self.model_name)
             # Some models return nested structure (sequence). If nested, average pool.
             if isinstance(vec, list) and vec and isinstance(vec[0], list):
                 # simple mean pooling across tokens
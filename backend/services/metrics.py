@@ -0,0 +1,187 @@
+"""
+Process-wide metrics with Prometheus text exposition, plus per-request stage timings.
+
+Stage timings recorded with `timed()` go both into the `autodoc_stage_seconds`
+histogram and into the current request's timing map (a context variable), which
+main.py turns into a `Server-Timing` response header.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{v}"'.replace("\n", " ") for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {state[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    "autodoc_stage_seconds",
+    "Duration of pipeline stages (clone, walk, triage, parse, dedup, embed, insert, embed_query, search, format_context, generate).",
+    ["stage"],
+)
+HTTP_REQUEST_SECONDS = Histogram("autodoc_http_request_seconds", "HTTP request duration.", ["method", "path", "status"])
+CHUNKS_TOTAL = Counter("autodoc_chunks_total", "Chunks processed per stage.", ["stage"])
+BYTES_TOTAL = Counter("autodoc_bytes_total", "Bytes of source text processed per stage.", ["stage"])
+TOKENS_TOTAL = Counter("autodoc_tokens_total", "Model tokens by provider and kind (prompt, completion, embedding).", ["provider", "kind"])
+PROVIDER_REQUESTS_TOTAL = Counter(
+    "autodoc_provider_requests_total", "Calls to external providers by outcome.", ["provider", "operation", "outcome"]
+)
+PROVIDER_SECONDS = Histogram("autodoc_provider_seconds", "Latency of external provider calls.", ["provider", "operation"])
+PROVIDER_THROTTLED_TOTAL = Counter("autodoc_provider_throttled_total", "Throttling responses (429/503) from providers.", ["provider"])
+CACHE_REQUESTS_TOTAL = Counter("autodoc_cache_requests_total", "In-process cache lookups by outcome (hit, miss).", ["cache", "outcome"])
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "autodoc_rate_limit_wait_seconds", "Time provider calls spent queued by the rate limiter.", ["provider"]
+)
+EMBED_BATCH_SIZE = Histogram(
+    "autodoc_embed_batch_size", "Texts per micro-batched local embedding call.", ["embedder"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "autodoc_request_timings", default=None
+)
+
+
+def start_request_timings() -> Tuple[Dict[str, float], contextvars.Token]:
+    timings: Dict[str, float] = {}
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token: contextvars.Token) -> None:
+    _request_timings.reset(token)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def provider_call(provider: str, operation: str) -> Iterator[None]:
+    """Count and time one call to an external provider, tracking its error rate."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=provider, operation=operation)
+        PROVIDER_REQUESTS_TOTAL.inc(provider=provider, operation=operation, outcome=outcome)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
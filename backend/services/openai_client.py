@@ -1,12 +1,18 @@
 import os
 from typing import List
 from openai import OpenAI
+from .metrics import TOKENS_TOTAL, provider_call
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 
 
 class OpenAIClient:
+    # Embedding calls are paced by services.rate_limiter
+    rate_limit_key = "openai"
+    embed_batch_size = 256
+    model_name = EMBEDDING_MODEL
+
     def __init__(self) -> None:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -14,17 +20,24 @@ class OpenAIClient:
         self.client = OpenAI(api_key=api_key)
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        # Batches are small for simplicity
-        response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        # The rate limiter owns retries (and needs to see the 429s), so the SDK's are off
+        with provider_call("openai", "embed"):
+            response = self.client.with_options(max_retries=0).embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        if response.usage:
+            TOKENS_TOTAL.inc(response.usage.total_tokens, provider="openai", kind="embedding")
         return [item.embedding for item in response.data]
 
     def generate_markdown(self, system_prompt: str, user_prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
-        )
+        with provider_call("openai", "generate"):
+            response = self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.2,
+            )
+        if response.usage:
+            TOKENS_TOTAL.inc(response.usage.prompt_tokens, provider="openai", kind="prompt")
+            TOKENS_TOTAL.inc(response.usage.completion_tokens, provider="openai", kind="completion")
         return response.choices[0].message.content or ""
@@ -1,7 +1,9 @@
 import os
 import time
+import logging
 import httpx
 from typing import Optional
+from .metrics import TOKENS_TOTAL, provider_call
 from .api_config import (
     PERPLEXITY_MODELS,
     PERPLEXITY_API_URL,
@@ -10,6 +12,8 @@ from .api_config import (
     MAX_OUTPUT_TOKENS
 )
 
+logger = logging.getLogger(__name__)
+
 
 class PerplexityClient:
     def __init__(self) -> None:
@@ -50,7 +54,7 @@ class PerplexityClient:
         # Truncate prompts if they're too long
         max_prompt_length = 32000
         if len(user_prompt) > max_prompt_length:
-            print(f"Truncating user prompt from {len(user_prompt)} to {max_prompt_length} characters")
+            logger.warning("Truncating user prompt from %d to %d characters", len(user_prompt), max_prompt_length)
             user_prompt = user_prompt[:max_prompt_length] + "..."
 
         # Format messages according to Perplexity API requirements
@@ -77,84 +81,18 @@ class PerplexityClient:
                     pool=30.0         # Pool timeout
                 )
                 
-                with httpx.Client(timeout=timeout) as client:
-                    print(f"\nAttempt {attempt + 1}/{max_retries}")
-                    print(f"Making request to Perplexity API...")
-                    print(f"URL: {PERPLEXITY_API_URL}")
-                    print(f"Model: {self.model}")
-                    print(f"System prompt length: {len(system_prompt)}")
-                    print(f"User prompt length: {len(user_prompt)}")
-                    print("Sending request...")
-                    
-                    resp = client.post(PERPLEXITY_API_URL, headers=headers, json=payload)
-                    print(f"Received response with status: {resp.status_code}")
-                    
-                    if resp.status_code != 200:
-                        error_text = resp.text
-                        print(f"Error response: {error_text}")
-                        try:
-                            error_json = resp.json()
-                            if 'error' in error_json:
-                                error_text = str(error_json['error'])
-                        except Exception:
-                            pass
-                        raise RuntimeError(f"Perplexity API error: {error_text}")
-                    
-                    print("Parsing response...")
-                    data = resp.json()
-                    content = (
-                        data.get("choices", [{}])[0]
-                        .get("message", {})
-                        .get("content", "")
+                with httpx.Client(timeout=timeout) as client, provider_call("perplexity", "generate"):
+                    logger.info(
+                        "Perplexity request attempt %d/%d: model=%s system_prompt=%d chars user_prompt=%d chars",
+                        attempt + 1, max_retries, self.model, len(system_prompt), len(user_prompt),
                     )
                     
-                    if not content:
-                        raise RuntimeError("No content received from Perplexity API")
-                    
-                    print(f"Successfully generated README with {len(content)} characters")
-                    return content
-                    
-            except httpx.TimeoutException as e:
-                print(f"\nTimeout on attempt {attempt + 1}: {str(e)}")
-                if attempt < max_retries - 1:
-                    wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
-                    print(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    raise RuntimeError(f"Failed after {max_retries} attempts: {str(e)}")
-                    
-            except Exception as e:
-                print(f"Error on attempt {attempt + 1}: {str(e)}")
-                raise
-        
-        max_retries = 3
-        retry_delay = 5
-        
-        for attempt in range(max_retries):
-            try:
-                # Increase timeout for longer generations
-                timeout = httpx.Timeout(
-                    connect=30.0,     # Connection timeout
-                    read=600.0,       # Read timeout (10 minutes)
-                    write=30.0,       # Write timeout
-                    pool=30.0         # Pool timeout
-                )
-                
-                with httpx.Client(timeout=timeout) as client:
-                    print(f"\nAttempt {attempt + 1}/{max_retries}")
-                    print(f"Making request to Perplexity API...")
-                    print(f"URL: {PERPLEXITY_API_URL}")
-                    print(f"Model: {self.model}")
-                    print(f"System prompt length: {len(system_prompt)}")
-                    print(f"User prompt length: {len(user_prompt)}")
-                    print("Sending request...")
-                    
                     resp = client.post(PERPLEXITY_API_URL, headers=headers, json=payload)
-                    print(f"Received response with status: {resp.status_code}")
+                    logger.debug("Received response with status: %s", resp.status_code)
                     
                     if resp.status_code != 200:
                         error_text = resp.text
-                        print(f"Error response: {error_text}")
+                        logger.error("Perplexity error response: %s", error_text)
                         try:
                             error_json = resp.json()
                             if 'error' in error_json:
@@ -163,7 +101,6 @@ class PerplexityClient:
                             pass
                         raise RuntimeError(f"Perplexity API error: {error_text}")
                     
-                    print("Parsing response...")
                     data = resp.json()
                     content = (
                         data.get("choices", [{}])[0]
@@ -174,17 +111,21 @@ class PerplexityClient:
                     if not content:
                         raise RuntimeError("No content received from Perplexity API")
                     
-                    print(f"Successfully generated README with {len(content)} characters")
+                    usage = data.get("usage") or {}
+                    TOKENS_TOTAL.inc(usage.get("prompt_tokens", 0), provider="perplexity", kind="prompt")
+                    TOKENS_TOTAL.inc(usage.get("completion_tokens", 0), provider="perplexity", kind="completion")
+                    logger.info("Successfully generated README with %d characters", len(content))
                     return content
                     
             except httpx.TimeoutException as e:
-                print(f"\nTimeout on attempt {attempt + 1}: {str(e)}")
+                logger.warning("Timeout on attempt %d: %s", attempt + 1, e)
                 if attempt < max_retries - 1:
                     wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
-                    print(f"Retrying in {wait_time} seconds...")
+                    logger.info("Retrying in %d seconds...", wait_time)
                     time.sleep(wait_time)
                 else:
                     raise RuntimeError(f"Failed after {max_retries} attempts: {str(e)}")
+                    
             except Exception as e:
-                print(f"\nError on attempt {attempt + 1}: {str(e)}")
+                logger.error("Error on attempt %d: %s", attempt + 1, e)
                 raise
@@ -0,0 +1,104 @@
+"""
+Direct Postgres ingestion of code chunks with COPY ... FROM STDIN (FORMAT BINARY).
+
+Used by SupabaseClient.insert_code_chunks when INGEST_BACKEND=copy. Rows skip
+PostgREST and JSON entirely: embeddings go over the wire as pgvector's binary
+representation, built straight from a NumPy buffer.
+"""
+
+import json
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+COPY_COLUMNS = ("repo_url", "file_path", "content", "metadata", "embedding")
+COPY_SQL = f"COPY public.code_chunks ({', '.join(COPY_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+# Rows encoded per write to the COPY stream
+COPY_BLOCK_ROWS = 500
+
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_TRAILER = struct.pack("!h", -1)
+_FIELD_COUNT = struct.pack("!h", len(COPY_COLUMNS))
+_NULL = struct.pack("!i", -1)
+# jsonb's binary format is a version byte followed by the JSON text
+_JSONB_VERSION = b"\x01"
+
+
+def _field(data: bytes) -> bytes:
+    return struct.pack("!i", len(data)) + data
+
+
+def encode_vectors(vectors: Sequence[Sequence[float]]) -> List[bytes]:
+    """pgvector binary values (uint16 dim, uint16 unused, big-endian float4s), one per row."""
+    if not vectors:
+        return []
+    matrix = np.asarray(vectors, dtype=">f4")
+    prefix = struct.pack("!HH", matrix.shape[1], 0)
+    return [prefix + row.tobytes() for row in matrix]
+
+
+def encode_copy_rows(rows: Sequence[Dict[str, Any]]) -> bytes:
+    """Binary COPY tuples (without header or trailer) for code_chunks rows."""
+    with_vectors = [r for r in rows if r.get("embedding") is not None]
+    vectors = iter(encode_vectors([r["embedding"] for r in with_vectors]))
+    out = bytearray()
+    for row in rows:
+        out += _FIELD_COUNT
+        out += _field(row["repo_url"].encode("utf-8"))
+        out += _field(row["file_path"].encode("utf-8"))
+        out += _field(row["content"].encode("utf-8"))
+        out += _field(_JSONB_VERSION + json.dumps(row.get("metadata") or {}).encode("utf-8"))
+        out += _field(next(vectors)) if row.get("embedding") is not None else _NULL
+    return bytes(out)
+
+
+def copy_stream(rows: Sequence[Dict[str, Any]], block_rows: int = COPY_BLOCK_ROWS) -> Iterator[bytes]:
+    """The whole binary COPY stream, in blocks of `block_rows` rows."""
+    yield _HEADER
+    for i in range(0, len(rows), block_rows):
+        yield encode_copy_rows(rows[i:i + block_rows])
+    yield _TRAILER
+
+
+class PostgresCopyWriter:
+    """Bulk-inserts code_chunks rows over one reused connection, one transaction per repo."""
+
+    def __init__(self, dsn: str) -> None:
+        import psycopg  # lazy import: only needed for the direct-database backend
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self._lock = threading.Lock()
+        self._conn: Optional[Any] = None
+
+    def _connection(self) -> Any:
+        if self._conn is None or self._conn.closed:
+            self._conn = self._psycopg.connect(self.dsn, autocommit=True)
+        return self._conn
+
+    def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        by_repo: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_repo.setdefault(row["repo_url"], []).append(row)
+        with self._lock:
+            conn = self._connection()
+            try:
+                for repo_rows in by_repo.values():
+                    # A call's rows for a repo land together or not at all (a failed
+                    # index_chunks run deletes its other batches by metadata.index_run)
+                    with conn.transaction(), conn.cursor() as cur, cur.copy(COPY_SQL) as copy:
+                        for block in copy_stream(repo_rows):
+                            copy.write(block)
+            except self._psycopg.OperationalError:
+                # Broken connection: reconnect on the next call
+                conn.close()
+                self._conn = None
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
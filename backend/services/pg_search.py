@@ -0,0 +1,133 @@
+"""
+Async vector search straight against Postgres, bypassing PostgREST.
+
+Used by EmbeddingStore when SEARCH_BACKEND=postgres. Queries run on a
+psycopg_pool.AsyncConnectionPool as server-side prepared statements, the query
+vector is sent in pgvector's binary format, and ivfflat.probes / hnsw.ef_search
+can be set per query (transaction-local).
+"""
+
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import provider_call, timed
+
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+# Index search breadth; unset keeps the server defaults
+PG_IVFFLAT_PROBES = os.getenv("PG_IVFFLAT_PROBES")
+PG_HNSW_EF_SEARCH = os.getenv("PG_HNSW_EF_SEARCH")
+MATCH_THRESHOLD = 0.7
+
+# Same semantics as the match_code_chunks SQL function, but ordered by the
+# distance operator itself so the planner can use the ivfflat/hnsw index
+_MATCH_SQL = """
+select id, repo_url, file_path, content, metadata, {extra}1 - (embedding <=> %(query)s) as similarity
+from code_chunks
+where repo_url = %(repo_url)s and 1 - (embedding <=> %(query)s) > %(threshold)s
+order by embedding <=> %(query)s
+limit %(top_k)s
+"""
+MATCH_SQL = _MATCH_SQL.format(extra="")
+MATCH_WITH_EMBEDDINGS_SQL = _MATCH_SQL.format(extra="embedding, ")
+
+
+def _vector_adapters(vector_oid: int):
+    """psycopg binary dumper/loader classes for pgvector's `vector` type."""
+    from psycopg.adapt import Dumper, Loader
+    from psycopg.pq import Format
+
+    class VectorBinaryDumper(Dumper):
+        format = Format.BINARY
+        oid = vector_oid
+
+        def dump(self, obj: Any) -> bytes:
+            values = np.asarray(obj, dtype=">f4")
+            return struct.pack("!HH", values.shape[0], 0) + values.tobytes()
+
+    class VectorBinaryLoader(Loader):
+        format = Format.BINARY
+
+        def load(self, data: Any) -> List[float]:
+            dim, _ = struct.unpack_from("!HH", data)
+            return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32).tolist()
+
+    return VectorBinaryDumper, VectorBinaryLoader
+
+
+class PostgresSearch:
+    def __init__(self, dsn: str, min_size: int = PG_POOL_MIN_SIZE, max_size: int = PG_POOL_MAX_SIZE) -> None:
+        from psycopg_pool import AsyncConnectionPool  # lazy import: only needed for this backend
+
+        self.pool = AsyncConnectionPool(
+            dsn, min_size=min_size, max_size=max_size, configure=self._configure, open=False
+        )
+        self._opened = False
+
+    @staticmethod
+    async def _configure(conn: Any) -> None:
+        from psycopg.types import TypeInfo
+
+        info = await TypeInfo.fetch(conn, "vector")
+        if info is None:
+            raise RuntimeError("pgvector's 'vector' type is not installed in this database")
+        dumper, loader = _vector_adapters(info.oid)
+        conn.adapters.register_dumper(np.ndarray, dumper)
+        conn.adapters.register_loader(info.oid, loader)
+        # Statements outside an explicit transaction commit at once, so idle pooled
+        # connections never hold a transaction open
+        await conn.set_autocommit(True)
+
+    async def open(self) -> None:
+        if not self._opened:
+            await self.pool.open(wait=True)
+            self._opened = True
+
+    async def close(self) -> None:
+        if self._opened:
+            await self.pool.close()
+            self._opened = False
+
+    async def search_code_chunks(
+        self,
+        repo_url: str,
+        embedding: Sequence[float],
+        top_k: int,
+        include_embeddings: bool = False,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        await self.open()
+        probes = probes if probes is not None else PG_IVFFLAT_PROBES
+        ef_search = ef_search if ef_search is not None else PG_HNSW_EF_SEARCH
+        params = {
+            "repo_url": repo_url,
+            "query": np.asarray(embedding, dtype=np.float32),
+            "threshold": MATCH_THRESHOLD,
+            "top_k": top_k,
+        }
+        sql = MATCH_WITH_EMBEDDINGS_SQL if include_embeddings else MATCH_SQL
+        with timed("search"), provider_call("postgres", "search"):
+            async with self.pool.connection() as conn:
+                # Pipelined: the settings and the query go out together, with no
+                # round trip per statement. set_config(..., true) only lasts
+                # until the end of this transaction.
+                async with conn.pipeline(), conn.transaction():
+                    if probes is not None:
+                        await conn.execute("select set_config('ivfflat.probes', %s, true)", (str(probes),))
+                    if ef_search is not None:
+                        await conn.execute("select set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+                    cur = conn.cursor(binary=True)
+                    await cur.execute(sql, params, prepare=True)
+                    rows = await cur.fetchall()
+                    columns = [c.name for c in cur.description]
+        results = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            # Match PostgREST's JSON shape
+            record["id"] = str(record["id"])
+            results.append(record)
+        return results
@@ -0,0 +1,143 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .summary_cache import CACHE_DIR
+
+# Requests carrying this header value are profiled (empty token: header disabled)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "x-autodoc-profile"
+# Fraction of requests profiled without the header; 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+_PROFILE_ID_RE = re.compile(r"^[\w.-]+\.collapsed$")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Keep the last two path components: enough to tell modules apart
+    short = "/".join(filename.replace("\\", "/").rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over every thread in the process.
+
+    A single background thread snapshots all stacks (sys._current_frames) every
+    `interval` seconds while at least one profile is active, so work handed to
+    asyncio.to_thread / executor pools is captured alongside the event loop.
+    Samples are process-wide: concurrent requests show up in each other's
+    profiles. Nothing runs while no profile is active.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000.0) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[str, Counter] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile_id: str) -> None:
+        with self._lock:
+            self._active[profile_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="autodoc-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile_id: str) -> Counter:
+        with self._lock:
+            return self._active.pop(profile_id, Counter())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks.append(";".join(reversed(labels)))
+            with self._lock:
+                for counter in self._active.values():
+                    counter.update(stacks)
+            time.sleep(self.interval)
+
+
+_profiler = SamplingProfiler()
+_sample_rate = PROFILE_SAMPLE_RATE
+
+
+def set_sample_rate(rate: float) -> float:
+    global _sample_rate
+    _sample_rate = min(1.0, max(0.0, rate))
+    return _sample_rate
+
+
+def get_sample_rate() -> float:
+    return _sample_rate
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    if header_value and PROFILE_TOKEN and header_value == PROFILE_TOKEN:
+        return True
+    return _sample_rate > 0 and random.random() < _sample_rate
+
+
+def start_profile() -> str:
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    _profiler.start(profile_id)
+    return profile_id
+
+
+def finish_profile(profile_id: str, label: str) -> str:
+    """Stop a profile and store it in collapsed-stack format; returns its file name."""
+    samples = _profiler.stop(profile_id)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_label = re.sub(r"[^\w-]+", "_", label).strip("_")[:60]
+    name = f"{profile_id}-{safe_label}.collapsed"
+    with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    _prune()
+    return name
+
+
+def _prune() -> None:
+    names = sorted(list_profiles(), reverse=True)
+    for name in names[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[str]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    return sorted((n for n in os.listdir(PROFILE_DIR) if _PROFILE_ID_RE.match(n)), reverse=True)
+
+
+def profile_path(name: str) -> Optional[str]:
+    if not _PROFILE_ID_RE.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,226 @@
+"""
+Shared scheduler for calls to rate-limited embedding providers.
+
+Every remote embedding call goes through the provider's ProviderScheduler, which
+- paces requests and tokens per minute with token buckets,
+- adapts how many calls are in flight (AIMD: grows by one per round of successful
+  calls, halves on 429/503 and backs off gently when latency climbs),
+- pauses the provider for `Retry-After` (or an exponential backoff) and retries,
+- hands out slots round-robin between repos, so a huge repository queues behind
+  its own batches instead of starving everyone else's indexing.
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .metrics import PROVIDER_THROTTLED_TOTAL, RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = {429, 503}
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+MAX_BACKOFF_SECONDS = 60.0
+# Buckets start full and allow this many seconds' worth of burst
+BURST_SECONDS = 10.0
+# A call slower than this multiple of the best recent latency counts as congestion
+LATENCY_TOLERANCE = 2.0
+
+# provider: (requests/minute, tokens/minute, max concurrency); 0 disables a limit.
+# Override with e.g. OPENAI_RPM, OPENAI_TPM, OPENAI_MAX_CONCURRENCY.
+PROVIDER_LIMITS: Dict[str, Tuple[int, int, int]] = {
+    "openai": (3000, 1_000_000, 16),
+    "cohere": (2000, 0, 8),
+    "hf-inference": (300, 0, 4),
+}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount`, going into debt if needed; returns how long to wait before using it."""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class AIMDLimit:
+    """Additive-increase / multiplicative-decrease concurrency limit."""
+
+    def __init__(self, maximum: int, minimum: int = 1) -> None:
+        self.maximum = float(maximum)
+        self.minimum = float(minimum)
+        self.limit = max(self.minimum, self.maximum / 2)
+        self.best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+
+    def on_success(self, latency: float) -> None:
+        # The baseline creeps up by 1% per call so one lucky sample does not pin it
+        best = self.best_latency
+        self.best_latency = latency if best is None else min(latency, best * 1.01)
+        if best is not None and latency > LATENCY_TOLERANCE * best:
+            self._decrease(0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        self._decrease(0.5)
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        # At most once per round trip: calls already in flight were sent under the old limit
+        if now - self._last_decrease < (self.best_latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def throttle_delay(exc: BaseException) -> Optional[float]:
+    """Retry-After seconds if `exc` is a provider throttling error (0.0 without the header), else None.
+
+    Works with the openai, cohere, huggingface_hub (requests) and httpx error types,
+    which expose the status and headers either on the exception or on its response.
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status not in THROTTLE_STATUSES:
+        return None
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None) or {}
+    retry_after = parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    if retry_after is None and headers.get("retry-after-ms"):
+        retry_after = parse_retry_after(headers["retry-after-ms"])
+        retry_after = retry_after / 1000.0 if retry_after is not None else None
+    return retry_after or 0.0
+
+
+class ProviderScheduler:
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 8) -> None:
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AIMDLimit(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        # tenant -> waiting futures; the head tenant is served next, then rotated to the back
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, tokens: int = 0, tenant: str = "") -> Any:
+        """Run blocking `fn(*args)` in a worker thread once the provider has capacity, retrying throttled calls."""
+        for attempt in range(MAX_RETRIES + 1):
+            queued = time.monotonic()
+            await self._acquire(tenant)
+            try:
+                wait = self._reserve(tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                RATE_LIMIT_WAIT_SECONDS.observe(time.monotonic() - queued, provider=self.name)
+                start = time.monotonic()
+                result = await asyncio.to_thread(fn, *args)
+                self.concurrency.on_success(time.monotonic() - start)
+                return result
+            except Exception as e:
+                retry_after = throttle_delay(e)
+                if retry_after is None or attempt == MAX_RETRIES:
+                    raise
+                self._throttled(retry_after, attempt)
+            finally:
+                self._release()
+
+    def _reserve(self, tokens: int) -> float:
+        wait = self.requests.reserve(1) if self.requests else 0.0
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def _throttled(self, retry_after: float, attempt: int) -> None:
+        PROVIDER_THROTTLED_TOTAL.inc(provider=self.name)
+        self.concurrency.on_throttle()
+        delay = retry_after or min(MAX_BACKOFF_SECONDS, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.warning(
+            "%s throttled (retry %d/%d): pausing %.1fs, concurrency limit now %.1f",
+            self.name, attempt + 1, MAX_RETRIES, delay, self.concurrency.limit,
+        )
+
+    async def _acquire(self, tenant: str) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(tenant, deque()).append(fut)
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted just as we were cancelled: give the slot back
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            if self._timer is None and self._queues:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+            return
+        while self._queues and self.in_flight < max(1, int(self.concurrency.limit)):
+            tenant, queue = next(iter(self._queues.items()))
+            fut = queue.popleft()
+            if queue:
+                self._queues.move_to_end(tenant)
+            else:
+                del self._queues[tenant]
+            if fut.done():
+                continue  # cancelled while queued
+            fut.set_result(None)
+            self.in_flight += 1
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """The process-wide scheduler for `provider`, created from PROVIDER_LIMITS and env overrides."""
+    scheduler = _schedulers.get(provider)
+    if scheduler is None:
+        rpm, tpm, concurrency = PROVIDER_LIMITS.get(provider, (0, 0, 8))
+        prefix = provider.upper().replace("-", "_")
+        scheduler = _schedulers[provider] = ProviderScheduler(
+            provider,
+            rpm=int(os.getenv(f"{prefix}_RPM", rpm)),
+            tpm=int(os.getenv(f"{prefix}_TPM", tpm)),
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", concurrency)),
+        )
+    return scheduler
@@ -0,0 +1,177 @@
+"""
+Versioned README history, stored compressed in the readme_history table.
+
+Each generated README becomes the next version of its repository. Content is
+zstd-compressed; between keyframes it is compressed with the previous version as
+a raw-content dictionary, so a regenerated README that mostly matches the last
+one costs a few hundred bytes. Every README_HISTORY_KEYFRAME_INTERVAL-th version
+is self-contained, which bounds how many rows a read has to decode.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import zstandard
+
+from .lru_cache import LRUCache
+from .summary_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+README_HISTORY_KEYFRAME_INTERVAL = int(os.getenv("README_HISTORY_KEYFRAME_INTERVAL", "20"))
+README_HISTORY_ZSTD_LEVEL = int(os.getenv("README_HISTORY_ZSTD_LEVEL", "19"))
+README_HISTORY_CACHE_SIZE = int(os.getenv("README_HISTORY_CACHE_SIZE", "256"))
+
+# Columns needed to answer a conditional request without touching the content
+META_COLUMNS = "repo_url,version,content_sha256,context_hash,model,created_at"
+CONTENT_COLUMNS = META_COLUMNS + ",codec,base_version,content,generated_readme"
+# Postgres unique_violation: another writer took this version number first
+_UNIQUE_VIOLATION = "23505"
+_INSERT_ATTEMPTS = 3
+
+
+def is_keyframe(version: int, interval: int = README_HISTORY_KEYFRAME_INTERVAL) -> bool:
+    return interval <= 1 or (version - 1) % interval == 0
+
+
+def encode_bytea(data: bytes) -> str:
+    # PostgREST takes and returns bytea in Postgres' hex format
+    return "\\x" + data.hex()
+
+
+def decode_bytea(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    return bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+
+
+def compress_version(markdown: str, previous: Optional[str] = None, level: int = README_HISTORY_ZSTD_LEVEL) -> bytes:
+    """zstd frame of `markdown`, using `previous` as a raw-content dictionary when given."""
+    dict_data = None
+    if previous:
+        dict_data = zstandard.ZstdCompressionDict(
+            previous.encode("utf-8"), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(markdown.encode("utf-8"))
+
+
+def decompress_version(blob: bytes, previous: Optional[str] = None) -> str:
+    dict_data = None
+    if previous:
+        dict_data = zstandard.ZstdCompressionDict(
+            previous.encode("utf-8"), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(blob).decode("utf-8")
+
+
+def decode_chain(rows: List[Dict[str, Any]]) -> str:
+    """Markdown of the last row, given rows from its keyframe onwards in version order."""
+    text: Optional[str] = None
+    for row in rows:
+        codec = row.get("codec")
+        if codec is None:
+            # Written before compression was introduced
+            text = row["generated_readme"]
+            continue
+        if codec != "zstd":
+            raise RuntimeError(f"Unknown readme_history codec: {codec}")
+        previous = None
+        if row.get("base_version") is not None:
+            if text is None:
+                raise RuntimeError(f"readme_history version {row['version']} is missing its base version")
+            previous = text
+        text = decompress_version(decode_bytea(row["content"]), previous)
+    if text is None:
+        raise RuntimeError("No readme_history rows to decode")
+    return text
+
+
+class ReadmeHistory:
+    """Writes and reads README versions through a SupabaseClient (or a stand-in with the same surface)."""
+
+    def __init__(self, client: Any, cache_size: int = README_HISTORY_CACHE_SIZE) -> None:
+        self.client = client
+        # (repo_url, version) -> markdown; versions are immutable, so entries never go stale
+        self._texts = LRUCache("readme_history", cache_size)
+
+    def record(
+        self, repo_url: str, markdown: str, context_hash: Optional[str] = None, model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Store `markdown` as the next version of `repo_url`; returns the row metadata."""
+        attempt = 0
+        while True:
+            attempt += 1
+            latest = self.client.fetch_readme_versions(repo_url, columns="version", limit=1)
+            version = latest[0]["version"] + 1 if latest else 1
+            previous = None
+            if not is_keyframe(version) and latest:
+                try:
+                    previous = self.get_text(repo_url, latest[0]["version"])
+                except Exception as e:
+                    # Fall back to a self-contained version rather than failing the write
+                    logger.warning("Could not load README version %d of %s: %s", version - 1, repo_url, e)
+            blob = compress_version(markdown, previous)
+            row = {
+                "repo_url": repo_url,
+                "version": version,
+                "codec": "zstd",
+                "base_version": version - 1 if previous is not None else None,
+                "content": encode_bytea(blob),
+                "content_sha256": content_hash(markdown),
+                "context_hash": context_hash,
+                "model": model,
+            }
+            try:
+                self.client.insert_readme_version(row)
+            except Exception as e:
+                if getattr(e, "code", None) == _UNIQUE_VIOLATION and attempt < _INSERT_ATTEMPTS:
+                    continue
+                raise
+            self._texts.put((repo_url, version), markdown)
+            logger.debug(
+                "Stored README version %d of %s: %d -> %d bytes (%s)",
+                version, repo_url, len(markdown.encode("utf-8")), len(blob),
+                "delta" if previous is not None else "keyframe",
+            )
+            return {k: v for k, v in row.items() if k in META_COLUMNS.split(",")}
+
+    def get_meta(self, repo_url: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Metadata (incl. content_sha256) of the latest or a given version, without its content."""
+        rows = self.client.fetch_readme_versions(
+            repo_url, columns=META_COLUMNS, limit=1,
+            min_version=version, max_version=version,
+        )
+        return rows[0] if rows else None
+
+    def get_text(self, repo_url: str, version: int) -> str:
+        cached = self._texts.get((repo_url, version))
+        if cached is not None:
+            return cached
+        # Rows from the version's keyframe up to it, usually in one request. The
+        # keyframe is found by following base_version rather than derived from the
+        # interval, which may have been different when these versions were written
+        window = max(1, README_HISTORY_KEYFRAME_INTERVAL)
+        rows: Dict[int, Dict[str, Any]] = {}
+        needed, upper = version, version
+        while True:
+            lower = max(1, min(needed, upper) - window + 1)
+            fetched = self.client.fetch_readme_versions(
+                repo_url, columns=CONTENT_COLUMNS, min_version=lower, max_version=upper, descending=False,
+            )
+            rows.update((row["version"], row) for row in fetched)
+            if version not in rows:
+                raise KeyError(version)
+            while needed in rows and rows[needed].get("base_version") is not None:
+                needed = rows[needed]["base_version"]
+            if needed in rows:
+                break
+            if lower == 1:
+                raise RuntimeError(f"readme_history version {version} of {repo_url} has no self-contained base")
+            upper = lower - 1
+        chain = [rows[version]]
+        while chain[-1]["version"] != needed:
+            chain.append(rows[chain[-1]["base_version"]])
+        text = decode_chain(chain[::-1])
+        self._texts.put((repo_url, version), text)
+        return text
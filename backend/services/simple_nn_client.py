@@ -12,6 +12,10 @@ class SimpleNNEmbeddingClient:
     A simple neural network embedding model trained from scratch.
     Uses TF-IDF features as input and learns dense embeddings.
     """
+
+    # Fits on its first call, which must see the corpus alone: never merge
+    # concurrent callers' texts into it (EmbeddingStore's micro-batcher)
+    micro_batch = False
     
     def __init__(self, embedding_dim: int = 128):
         self.embedding_dim = embedding_dim
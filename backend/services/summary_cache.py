@@ -0,0 +1,75 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Directory for local, rebuildable caches (summaries, embeddings, ...)
+CACHE_DIR = os.getenv("AUTODOC_CACHE_DIR", ".autodoc_cache")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent store of per-file and per-module summaries.
+
+    Entries are keyed by (content hash, model, prompt version), so a summary is
+    reused across regenerations, re-parses and forks for as long as the file
+    content, the summarising model and the prompt stay the same.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.getenv("SUMMARY_CACHE_PATH") or os.path.join(CACHE_DIR, "summaries.sqlite3")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute(
+                "create table if not exists summaries ("
+                " content_hash text not null,"
+                " model text not null,"
+                " prompt_version text not null,"
+                " summary text not null,"
+                " created_at real not null,"
+                " primary key (content_hash, model, prompt_version))"
+            )
+            self._conn.commit()
+
+    def get_many(self, hashes: Iterable[str], model: str, prompt_version: str) -> Dict[str, str]:
+        keys = list(set(hashes))
+        found: Dict[str, str] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"select content_hash, summary from summaries where model = ? and prompt_version = ?"
+                    f" and content_hash in ({placeholders})",
+                    [model, prompt_version, *batch],
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, str]], model: str, prompt_version: str) -> None:
+        now = time.time()
+        rows = [(h, model, prompt_version, summary, now) for h, summary in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "insert or replace into summaries (content_hash, model, prompt_version, summary, created_at)"
+                " values (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,12 @@
+import json
 import os
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional
 from supabase import create_client, Client
+from .metrics import CHUNKS_TOTAL, provider_call, timed
+
+# 'postgrest': inserts go through supabase-py as JSON; 'copy': binary COPY straight
+# into Postgres at SUPABASE_DB_URL (bulk indexing)
+INGEST_BACKEND = os.getenv("INGEST_BACKEND", "postgrest").lower()
 
 
 class SupabaseClient:
@@ -10,23 +16,106 @@ class SupabaseClient:
         if not url or not anon:
             raise RuntimeError("SUPABASE_URL and SUPABASE_[ANON|SERVICE]_KEY are required")
         self.client: Client = create_client(url, anon)
+        self._copy_writer = None
+        if INGEST_BACKEND == "copy":
+            dsn = os.getenv("SUPABASE_DB_URL")
+            if not dsn:
+                raise RuntimeError("SUPABASE_DB_URL is required when INGEST_BACKEND=copy")
+            from .pg_ingest import PostgresCopyWriter
+
+            self._copy_writer = PostgresCopyWriter(dsn)
 
     def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
         if not rows:
             return
-        self.client.table("code_chunks").insert(rows).execute()
-
-    def search_code_chunks(self, repo_url: str, embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
-        res = self.client.rpc(
-            "match_code_chunks",
-            {
-                "repo_url_filter": repo_url,
-                "query_embedding": embedding,
-                "match_threshold": 0.7,
-                "match_count": top_k,
-            },
-        ).execute()
-        return res.data or []
+        if self._copy_writer is not None:
+            with timed("insert"), provider_call("postgres", "copy"):
+                self._copy_writer.insert_code_chunks(rows)
+        else:
+            with timed("insert"), provider_call("supabase", "insert"):
+                self.client.table("code_chunks").insert(rows).execute()
+        CHUNKS_TOTAL.inc(len(rows), stage="insert")
+
+    def delete_index_run(self, repo_url: str, index_run: str) -> None:
+        """Delete the rows one index_chunks call inserted (tagged with metadata.index_run)."""
+        # Rows are visible here whichever backend inserted them: COPY commits per call
+        with timed("delete"), provider_call("supabase", "delete"):
+            self.client.table("code_chunks").delete().eq("repo_url", repo_url).eq(
+                "metadata->>index_run", index_run
+            ).execute()
+
+    def search_code_chunks(
+        self, repo_url: str, embedding: List[float], top_k: int, include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        function = "match_code_chunks_with_embeddings" if include_embeddings else "match_code_chunks"
+        with timed("search"), provider_call("supabase", "search"):
+            res = self.client.rpc(
+                function,
+                {
+                    "repo_url_filter": repo_url,
+                    "query_embedding": embedding,
+                    "match_threshold": 0.7,
+                    "match_count": top_k,
+                },
+            ).execute()
+        rows = res.data or []
+        for row in rows:
+            # PostgREST renders pgvector values as text, e.g. "[0.1,0.2,...]"
+            if isinstance(row.get("embedding"), str):
+                row["embedding"] = json.loads(row["embedding"])
+        return rows
 
-    def insert_readme_history(self, repo_url: str, markdown: str) -> None:
-        self.client.table("readme_history").insert({"repo_url": repo_url, "generated_readme": markdown}).execute()
+    def fetch_code_chunks(self, repo_url: str, limit: int = 5000, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Fetch indexed chunks of a repo (without embeddings), paging past PostgREST's row cap."""
+        rows: List[Dict[str, Any]] = []
+        while len(rows) < limit:
+            start = len(rows)
+            end = min(start + page_size, limit) - 1
+            with provider_call("supabase", "fetch"):
+                res = (
+                    self.client.table("code_chunks")
+                    .select("id,repo_url,file_path,content,metadata")
+                    .eq("repo_url", repo_url)
+                    .order("file_path")
+                    .range(start, end)
+                    .execute()
+                )
+            page = res.data or []
+            rows.extend(page)
+            if len(page) < end - start + 1:
+                break
+        return rows
+
+    def upsert_symbol_graph(self, repo_url: str, graph: Dict[str, Any]) -> None:
+        """Replace the stored symbol/dependency graph of a repo (see parser.symbol_graph)."""
+        with provider_call("supabase", "upsert_graph"):
+            self.client.table("repo_symbol_graphs").upsert(
+                {"repo_url": repo_url, "graph": graph}, on_conflict="repo_url"
+            ).execute()
+
+    def insert_readme_version(self, row: Dict[str, Any]) -> None:
+        """Insert one readme_history row (see services.readme_history for the encoding)."""
+        with provider_call("supabase", "insert_history"):
+            self.client.table("readme_history").insert(row).execute()
+
+    def fetch_readme_versions(
+        self,
+        repo_url: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        min_version: Optional[int] = None,
+        max_version: Optional[int] = None,
+        descending: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """readme_history rows of a repo, ordered by version (newest first by default)."""
+        query = self.client.table("readme_history").select(columns).eq("repo_url", repo_url)
+        if min_version is not None:
+            query = query.gte("version", min_version)
+        if max_version is not None:
+            query = query.lte("version", max_version)
+        query = query.order("version", desc=descending)
+        if limit is not None:
+            query = query.limit(limit)
+        with provider_call("supabase", "fetch_history"):
+            res = query.execute()
+        return res.data or []
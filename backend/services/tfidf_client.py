@@ -10,6 +10,10 @@ TFIDF_NGRAM_RANGE = (1, 2)  # unigrams and bigrams
 
 
 class TFIDFEmbeddingClient:
+    # Fits on its first call, which must see the corpus alone: never merge
+    # concurrent callers' texts into it (EmbeddingStore's micro-batcher)
+    micro_batch = False
+
     def __init__(self) -> None:
         self.vectorizer = TfidfVectorizer(
             max_features=TFIDF_MAX_FEATURES,
@@ -0,0 +1,5 @@
+import sys
+import pathlib
+
+# Tests import the backend packages the same way main.py does
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
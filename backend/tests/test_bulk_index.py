@@ -0,0 +1,67 @@
+"""Resuming a bulk index: a repository interrupted mid-embedding loses its partial rows before it is indexed again."""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List
+
+from parser import bulk_index
+from parser.bulk_index import DONE, EMBEDDING, BulkIndexer, BulkIndexState
+from services.embedding_store import EmbeddingStore
+
+REPO = "https://example.com/acme/widgets"
+
+
+class ConstantEmbedder:
+    micro_batch = False
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class RowStore:
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.rows.extend(rows)
+
+    def delete_index_run(self, repo_url: str, index_run: str) -> None:
+        with self._lock:
+            self.rows = [
+                r for r in self.rows if r["repo_url"] != repo_url or r["metadata"].get("index_run") != index_run
+            ]
+
+    def upsert_symbol_graph(self, repo_url: str, graph: Dict[str, Any]) -> None:
+        pass
+
+
+def test_resumed_repository_replaces_the_killed_runs_rows(tmp_path, monkeypatch):
+    checkout = tmp_path / "checkout"
+    checkout.mkdir()
+    chunks = [
+        {"repo_url": REPO, "file_path": f"f{i}.py", "content": f"x = {i}\n", "metadata": {"language": "python"}}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(bulk_index, "clone_repository", lambda url, sparse, subdir: str(checkout))
+    monkeypatch.setattr(bulk_index, "extract_repository_chunks", lambda *args: [dict(c) for c in chunks])
+
+    rows = RowStore()
+    # Left by the killed process: part of its run, and an earlier, complete index
+    rows.insert_code_chunks([{"repo_url": REPO, "file_path": "f0.py", "metadata": {"index_run": "killed"}}])
+    rows.insert_code_chunks([{"repo_url": REPO, "file_path": "old.py", "metadata": {"index_run": "earlier"}}])
+    path = tmp_path / "batch.json"
+    path.write_text(json.dumps({"repos": {REPO: {"status": EMBEDDING, "attempts": 1, "index_run": "killed"}}}))
+
+    state = BulkIndexState.load_or_create(str(path), "batch", [REPO])
+    store = EmbeddingStore(embedder=ConstantEmbedder(), supabase=rows)
+    asyncio.run(BulkIndexer(store).run(state))
+
+    entry = json.loads(path.read_text())["repos"][REPO]
+    assert entry["status"] == DONE and entry["index_run"] is None
+    runs = [r["metadata"]["index_run"] for r in rows.rows]
+    assert "killed" not in runs
+    assert runs.count("earlier") == 1
+    assert sorted(r["file_path"] for r in rows.rows) == ["f0.py", "f1.py", "f2.py", "old.py"]
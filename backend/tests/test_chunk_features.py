@@ -0,0 +1,40 @@
+"""Chunk roles and ranking priority."""
+
+import os
+import tempfile
+
+import pytest
+
+from services.chunk_features import ROLE_WEIGHTS, classify_role, compute_chunk_features, repo_relative_path
+
+
+@pytest.mark.parametrize("path", ["latest.py", "src/attestation.py", "web/contest_utils.ts"])
+def test_names_containing_test_are_not_tests(path):
+    assert classify_role(path) != "test"
+
+
+@pytest.mark.parametrize(
+    "path", ["test_api.py", "pkg/api_test.go", "web/a.test.ts", "web/b.spec.js", "tests/helpers.py", "src/__tests__/x.js", "conftest.py"]
+)
+def test_test_files_by_convention(path):
+    assert classify_role(path) == "test"
+
+
+def test_centrality_replaces_path_keywords():
+    content = "x = 1\n"
+    auth = compute_chunk_features("app/auth/tokens.py", content, centrality=1.0)
+    plain = compute_chunk_features("app/util/tokens.py", content, centrality=1.0)
+    assert auth["role"] == "security" and auth["priority"] == plain["priority"]
+    # Without a graph the path keywords are all there is
+    assert compute_chunk_features("app/auth/tokens.py", content)["priority"] == ROLE_WEIGHTS["security"]
+    # Entry points keep their weight: nothing imports them
+    assert compute_chunk_features("main.py", content, centrality=1.0)["priority"] > plain["priority"]
+
+
+@pytest.mark.parametrize("checkout", ["api_worker", "authz", "models"])
+def test_roles_ignore_the_checkout_directory(checkout):
+    # clone_repository's temp dir can contain any keyword (TMPDIR, user name, random suffix)
+    root = os.path.join(tempfile.gettempdir(), f"autodoc_{checkout}")
+    assert classify_role(os.path.join(root, "src", "util.py")) == "other"
+    assert classify_role(os.path.join(root, "src", "routes.py")) == "api"
+    assert repo_relative_path(os.path.join(root, "tests", "x.py")) == "tests/x.py"
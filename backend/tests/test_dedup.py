@@ -0,0 +1,46 @@
+"""Near-duplicate collapsing: only copies close to their representative are folded into it."""
+
+import numpy as np
+
+from services.dedup import DEDUP_THRESHOLD, deduplicate_chunks, minhash_signature
+
+
+def source(prefix: bool = False, suffix: bool = False, n: int = 400, k: int = 14) -> str:
+    tokens = [f"w{i}" for i in range(n)]
+    if prefix:
+        tokens[:k] = [f"a{i}" for i in range(k)]
+    if suffix:
+        tokens[-k:] = [f"c{i}" for i in range(k)]
+    return " ".join(tokens)
+
+
+def chunk(path: str, content: str) -> dict:
+    return {"repo_url": "https://example.com/acme/widgets", "file_path": path, "content": content, "metadata": {}}
+
+
+def similarity(a: str, b: str) -> float:
+    return float(np.mean(minhash_signature(a) == minhash_signature(b)))
+
+
+def test_exact_copies_collapse_into_the_shortest_path():
+    kept, stats = deduplicate_chunks([chunk("vendor/lib/util.py", source()), chunk("util.py", source())])
+    assert [c["file_path"] for c in kept] == ["util.py"]
+    assert kept[0]["metadata"]["duplicates"] == ["vendor/lib/util.py"]
+    assert stats == {"input": 2, "kept": 1, "collapsed": 1}
+
+
+def test_chain_of_near_duplicates_is_not_merged_transitively():
+    a, b, c = source(prefix=True), source(), source(suffix=True)
+    # a ~ b and b ~ c, but a and c are further apart than the threshold
+    assert similarity(a, b) >= DEDUP_THRESHOLD and similarity(b, c) >= DEDUP_THRESHOLD
+    assert similarity(a, c) < DEDUP_THRESHOLD
+
+    kept, stats = deduplicate_chunks([chunk("a.py", a), chunk("bb.py", b), chunk("ccc.py", c)])
+    assert {k["file_path"]: k["metadata"].get("duplicates") for k in kept} == {"a.py": ["bb.py"], "ccc.py": None}
+    assert stats["kept"] == 2
+
+
+def test_distinct_chunks_are_all_kept():
+    chunks = [chunk(f"m{i}.py", " ".join(f"t{i}_{j}" for j in range(50))) for i in range(5)]
+    kept, stats = deduplicate_chunks(chunks)
+    assert kept == chunks and stats["collapsed"] == 0
@@ -0,0 +1,93 @@
+"""Micro-batching of local embeddings: coalescing, per-caller ordering, and the embedders that opt out."""
+
+import asyncio
+import threading
+from typing import List
+
+from fastapi.testclient import TestClient
+
+from services import embedding_store
+from services.embed_batcher import EMBED_BATCH_MAX_SIZE, EmbeddingBatcher
+from services.embed_server import create_app
+from services.embedding_store import EmbeddingStore
+from services.tfidf_client import TFIDFEmbeddingClient
+
+
+class RecordingEmbedder:
+    """Embeds a text as [its length, its first character]; records each call's texts."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls.append(list(texts))
+        return [[float(len(t)), float(ord(t[0]))] for t in texts]
+
+
+def vector(text: str) -> List[float]:
+    return [float(len(text)), float(ord(text[0]))]
+
+
+def test_concurrent_callers_share_one_call_and_get_their_own_vectors_in_order():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder.embed_texts, max_batch_size=64, max_wait_ms=5)
+    requests = [["b", "aa"], ["ccc"], ["aa", "dddd", "b"]]
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(texts) for texts in requests))
+
+    results = asyncio.run(run())
+    assert results == [[vector(t) for t in texts] for texts in requests]
+    # One forward pass, and the texts several callers asked for are embedded once
+    assert embedder.calls == [["b", "aa", "ccc", "dddd"]]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder.embed_texts, max_batch_size=2, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed([t]) for t in ["a", "bb", "ccc", "dddd", "eeeee"]))
+
+    assert asyncio.run(run()) == [[vector(t)] for t in ["a", "bb", "ccc", "dddd", "eeeee"]]
+    assert all(len(call) <= 2 for call in embedder.calls) and len(embedder.calls) == 3
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fail(texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("model crashed")
+
+    batcher = EmbeddingBatcher(fail, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(run())] == ["model crashed", "model crashed"]
+
+
+def test_embedders_that_fit_on_their_first_call_are_not_micro_batched():
+    class Supabase:
+        pass
+
+    store = EmbeddingStore(embedder=TFIDFEmbeddingClient(), supabase=Supabase())
+    assert store._batcher is None
+    assert EmbeddingStore(embedder=RecordingEmbedder(), supabase=Supabase())._batcher is not None
+
+
+def test_embed_server_returns_vectors_in_request_order(monkeypatch):
+    embedder = RecordingEmbedder()
+    monkeypatch.setattr(embedding_store, "create_embedder", lambda: embedder)
+    with TestClient(create_app()) as client:
+        assert client.get("/info").json()["max_batch_size"] == EMBED_BATCH_MAX_SIZE
+        resp = client.post("/embed", json={"texts": ["ccc", "a", "bb"]})
+    assert resp.json()["embeddings"] == [vector(t) for t in ["ccc", "a", "bb"]]
+
+
+def test_embed_server_skips_batching_for_fitting_embedders(monkeypatch):
+    monkeypatch.setattr(embedding_store, "create_embedder", TFIDFEmbeddingClient)
+    with TestClient(create_app()) as client:
+        assert client.get("/info").json()["max_batch_size"] is None
+        resp = client.post("/embed", json={"texts": ["parse the config file", "open a socket"]})
+    assert len(resp.json()["embeddings"]) == 2
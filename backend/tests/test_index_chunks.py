@@ -0,0 +1,108 @@
+"""Batched indexing: a failed batch leaves no rows of its run behind, and search results are invalidated."""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from services import embedding_store
+from services.embedding_store import EmbeddingStore
+
+REPO = "https://example.com/acme/widgets"
+
+
+class ConstantEmbedder:
+    micro_batch = False
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class RowStore:
+    """The SupabaseClient calls index_chunks makes; inserts containing `fail_on` raise."""
+
+    def __init__(self, fail_on: str = "", slow_on: str = "") -> None:
+        self.fail_on = fail_on
+        self.slow_on = slow_on
+        self.slow_started = threading.Event()
+        self.rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def insert_code_chunks(self, rows: List[Dict[str, Any]]) -> None:
+        if self.fail_on and any(self.fail_on in r["file_path"] for r in rows):
+            raise RuntimeError("insert failed")
+        if self.slow_on and any(self.slow_on in r["file_path"] for r in rows):
+            self.slow_started.set()
+            time.sleep(0.2)
+        with self._lock:
+            self.rows.extend(rows)
+
+    def delete_index_run(self, repo_url: str, index_run: str) -> None:
+        with self._lock:
+            self.rows = [
+                r for r in self.rows if r["repo_url"] != repo_url or r["metadata"]["index_run"] != index_run
+            ]
+
+    def upsert_symbol_graph(self, repo_url: str, graph: Dict[str, Any]) -> None:
+        pass
+
+
+def chunks(prefix: str, n: int) -> List[Dict[str, Any]]:
+    return [
+        {"repo_url": REPO, "file_path": f"{prefix}/f{i}.py", "content": f"x = {i}\n", "metadata": {"language": "python"}}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(embedding_store, "INDEX_BATCH_SIZE", 2)
+    monkeypatch.setattr(embedding_store, "DEDUP_ENABLED", False)
+
+
+def test_failed_batch_removes_the_runs_rows_and_bumps_the_generation():
+    rows = RowStore(fail_on="new/f5.py")
+    store = EmbeddingStore(embedder=ConstantEmbedder(), supabase=rows)
+    asyncio.run(store.index_chunks(chunks("old", 3)))
+    assert len(rows.rows) == 3
+    generation = store._repo_generation[REPO]
+
+    with pytest.raises(RuntimeError, match="insert failed"):
+        asyncio.run(store.index_chunks(chunks("new", 8)))
+
+    # The earlier index stays; none of the failed run's batches do
+    assert sorted(r["file_path"] for r in rows.rows) == [f"old/f{i}.py" for i in range(3)]
+    assert store._repo_generation[REPO] == generation + 1
+
+
+def test_cancelled_run_removes_its_rows_including_inserts_still_in_flight():
+    rows = RowStore(slow_on="new/f5.py")
+    store = EmbeddingStore(embedder=ConstantEmbedder(), supabase=rows)
+
+    async def run() -> None:
+        await store.index_chunks(chunks("old", 3))
+        task = asyncio.create_task(store.index_chunks(chunks("new", 8)))
+        while not rows.slow_started.is_set():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    # The slow insert landed after the cancellation and was deleted with the rest
+    assert sorted(r["file_path"] for r in rows.rows) == [f"old/f{i}.py" for i in range(3)]
+    assert store._repo_generation[REPO] == 2
+
+
+def test_rows_of_one_call_share_an_index_run():
+    rows = RowStore()
+    store = EmbeddingStore(embedder=ConstantEmbedder(), supabase=rows)
+    asyncio.run(store.index_chunks(chunks("a", 5)))
+    asyncio.run(store.index_chunks(chunks("b", 5)))
+    runs = {r["file_path"][0]: set() for r in rows.rows}
+    for r in rows.rows:
+        runs[r["file_path"][0]].add(r["metadata"]["index_run"])
+    assert all(len(ids) == 1 for ids in runs.values())
+    assert runs["a"] != runs["b"]
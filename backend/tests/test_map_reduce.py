@@ -0,0 +1,117 @@
+"""generate_readme_hierarchical against a local fake model client."""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from generator.generate_readme import SYSTEM_PROMPT
+from generator.map_reduce import (
+    MAP_SYSTEM_PROMPT,
+    MAX_REDUCE_LEVELS,
+    REDUCE_SYSTEM_PROMPT,
+    generate_readme_hierarchical,
+)
+
+REPO_URL = "https://example.com/acme/widgets"
+
+
+class FakeModelClient:
+    """MarkdownModelClient that answers with summaries of a fixed size and records every call."""
+
+    model = "fake"
+
+    def __init__(self, summary_tokens: int = 50, latency: float = 0.0) -> None:
+        self.summary_tokens = summary_tokens
+        self.latency = latency
+        self.calls: List[tuple] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_markdown(self, system_prompt: str, user_prompt: str) -> str:
+        with self._lock:
+            self.calls.append((system_prompt, user_prompt))
+            number = len(self.calls)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if system_prompt == SYSTEM_PROMPT:
+                return "# README\n"
+            text = f"- summary {number} "
+            return text + "x" * (self.summary_tokens * 4 - len(text))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def prompts(self, system_prompt: str) -> List[str]:
+        return [user for system, user in self.calls if system == system_prompt]
+
+
+def make_chunks(dirs: int, files_per_dir: int, tokens_per_file: int) -> List[Dict[str, Any]]:
+    line = "x = 1\n"
+    content = line * (tokens_per_file * 4 // len(line))
+    return [
+        {
+            "repo_url": REPO_URL,
+            "file_path": f"/tmp/autodoc_test/pkg{d}/module_{f}.py",
+            "content": content,
+            "metadata": {"language": "python"},
+        }
+        for d in range(dirs)
+        for f in range(files_per_dir)
+    ]
+
+
+def generate(client: FakeModelClient, chunks: List[Dict[str, Any]], **kwargs: Any) -> str:
+    asyncio.run(generate_readme_hierarchical(client, REPO_URL, chunks, **kwargs))
+    return client.calls[-1][1]
+
+
+def test_small_repository_uses_a_single_prompt():
+    client = FakeModelClient()
+    final = generate(client, make_chunks(dirs=1, files_per_dir=3, tokens_per_file=100), token_budget=6000)
+    assert [system for system, _ in client.calls] == [SYSTEM_PROMPT]
+    assert "Relevant code context" in final
+
+
+def test_large_repository_fans_out_into_directory_groups():
+    client = FakeModelClient()
+    # 10 files of ~300 tokens per directory: each directory needs two groups of 2,000 tokens
+    chunks = make_chunks(dirs=4, files_per_dir=10, tokens_per_file=300)
+    generate(client, chunks, token_budget=2000)
+
+    map_prompts = client.prompts(MAP_SYSTEM_PROMPT)
+    assert len(map_prompts) == 8
+    parts = [re.search(r"^Part: (.+)$", prompt, re.MULTILINE).group(1) for prompt in map_prompts]
+    assert sorted(set(parts)) == [f"pkg{d}" for d in range(4)]
+    for chunk in chunks:
+        path = chunk["file_path"].split("autodoc_test/")[1]
+        assert sum(path in prompt for prompt in map_prompts) == 1
+    assert client.calls[-1][0] == SYSTEM_PROMPT
+
+
+def test_reduce_levels_are_capped(caplog):
+    # One ~396-token file per group and ~190-token summaries: every reduce level
+    # only halves the summaries, so 200 groups would need 8 levels
+    client = FakeModelClient(summary_tokens=190)
+    with caplog.at_level(logging.INFO, logger="generator.map_reduce"):
+        final = generate(client, make_chunks(dirs=200, files_per_dir=1, tokens_per_file=380), token_budget=400)
+
+    levels = [int(level) for level in re.findall(r"Reduce level (\d+)", caplog.text)]
+    assert levels and max(levels) == MAX_REDUCE_LEVELS
+    assert "stalled" in caplog.text
+    assert client.prompts(REDUCE_SYSTEM_PROMPT)
+    # 200 -> 100 -> 50 -> 25 -> 13 -> 7 -> 4: the 4 left are trimmed, none dropped
+    assert len(re.findall(r"^### ", final, re.MULTILINE)) == 4
+    assert "trimming each" in caplog.text
+
+
+def test_calls_in_flight_never_exceed_concurrency():
+    client = FakeModelClient(latency=0.02)
+    generate(client, make_chunks(dirs=12, files_per_dir=1, tokens_per_file=380), token_budget=400, concurrency=3)
+    assert len(client.prompts(MAP_SYSTEM_PROMPT)) == 12
+    assert 1 < client.max_in_flight <= 3
@@ -0,0 +1,59 @@
+"""GET /readme validators: one weak ETag for every encoding, and Vary on every response."""
+
+from typing import Any, Dict, Optional
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+import main
+from services.compression import CompressionMiddleware
+
+README = "# Widgets\n\n" + "A library of widgets.\n" * 200
+META = {"version": 3, "content_sha256": "abc123", "created_at": "2026-01-01T00:00:00Z"}
+
+
+class History:
+    def get_meta(self, repo_url: str, version: Optional[int]) -> Dict[str, Any]:
+        return META
+
+    def get_text(self, repo_url: str, version: int) -> str:
+        return README
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "get_readme_history", History)
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip", "br"])
+def test_every_representation_carries_the_same_weak_etag_and_vary(client, encoding):
+    resp = client.get("/readme", params={"repo_url": "https://example.com/acme/widgets"},
+                      headers={"Accept-Encoding": encoding})
+    assert resp.status_code == 200 and resp.json()["readme"] == README
+    assert resp.headers["etag"] == 'W/"abc123"'
+    assert resp.headers.get("content-encoding", "identity") == encoding
+    assert "accept-encoding" in resp.headers["vary"].lower()
+
+
+@pytest.mark.parametrize("validator", ['W/"abc123"', '"abc123"'])
+def test_revalidation_uses_weak_comparison(client, validator):
+    resp = client.get("/readme", params={"repo_url": "https://example.com/acme/widgets"},
+                      headers={"If-None-Match": validator})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == 'W/"abc123"' and resp.headers["vary"] == "Accept-Encoding"
+
+
+def test_compression_weakens_strong_etags():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/doc")
+    def doc():
+        return Response("x" * 4096, media_type="text/plain", headers={"ETag": '"strong"'})
+
+    with TestClient(app) as client:
+        assert client.get("/doc", headers={"Accept-Encoding": "gzip"}).headers["etag"] == 'W/"strong"'
+        assert client.get("/doc", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"strong"'
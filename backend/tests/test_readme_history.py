@@ -0,0 +1,73 @@
+"""README history reads across a change of README_HISTORY_KEYFRAME_INTERVAL."""
+
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from services import readme_history
+from services.readme_history import ReadmeHistory
+
+REPO_URL = "https://example.com/acme/widgets"
+
+
+class HistoryStore:
+    """The readme_history surface of SupabaseClient, in memory; counts fetches."""
+
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+        self.fetches = 0
+
+    def insert_readme_version(self, row: Dict[str, Any]) -> None:
+        self.rows.append(dict(row))
+
+    def fetch_readme_versions(
+        self, repo_url: str, columns: str = "*", limit: Optional[int] = None,
+        min_version: Optional[int] = None, max_version: Optional[int] = None, descending: bool = True,
+    ) -> List[Dict[str, Any]]:
+        self.fetches += 1
+        rows = [
+            r for r in self.rows
+            if r["repo_url"] == repo_url
+            and (min_version is None or r["version"] >= min_version)
+            and (max_version is None or r["version"] <= max_version)
+        ]
+        rows.sort(key=lambda r: r["version"], reverse=descending)
+        return rows[:limit] if limit is not None else rows
+
+
+def readme(version: int) -> str:
+    return f"# Widgets\n\nVersion {version} of the README.\n" + "Shared section.\n" * 20
+
+
+def write_versions(store: HistoryStore, monkeypatch, interval: int, count: int) -> None:
+    monkeypatch.setattr(readme_history, "README_HISTORY_KEYFRAME_INTERVAL", interval)
+    monkeypatch.setattr(readme_history.is_keyframe, "__defaults__", (interval,))
+    history = ReadmeHistory(store)
+    for _ in range(count):
+        version = len(store.rows) + 1
+        history.record(REPO_URL, readme(version))
+
+
+@pytest.mark.parametrize("written, read", [(20, 10), (10, 20), (20, 3)])
+def test_versions_written_under_another_interval_decode(monkeypatch, written, read):
+    store = HistoryStore()
+    write_versions(store, monkeypatch, written, 45)
+    monkeypatch.setattr(readme_history, "README_HISTORY_KEYFRAME_INTERVAL", read)
+    history = ReadmeHistory(store)
+    for version in range(1, 46):
+        assert history.get_text(REPO_URL, version) == readme(version)
+
+
+def test_one_request_when_the_interval_is_unchanged(monkeypatch):
+    store = HistoryStore()
+    write_versions(store, monkeypatch, 10, 25)
+    store.fetches = 0
+    assert ReadmeHistory(store).get_text(REPO_URL, 19) == readme(19)
+    assert store.fetches == 1
+
+
+def test_missing_version_raises_key_error(monkeypatch):
+    store = HistoryStore()
+    write_versions(store, monkeypatch, 10, 3)
+    with pytest.raises(KeyError):
+        ReadmeHistory(store).get_text(REPO_URL, 7)
@@ -0,0 +1,102 @@
+"""Coalesced calls: shared results and errors, and cancellation only once every waiter has left."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from services.single_flight import SingleFlight
+
+
+class Work:
+    """An awaitable computation that counts its starts and can be released or failed by the test."""
+
+    def __init__(self) -> None:
+        self.starts = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def __call__(self) -> str:
+        self.starts += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return "result"
+
+
+def test_identical_concurrent_calls_share_one_computation():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        calls = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert len(flight) == 1
+        work.release.set()
+        results = await asyncio.gather(*calls)
+        return results, work.starts, len(flight)
+
+    assert asyncio.run(run()) == (["result", "result"], 1, 0)
+
+
+def test_an_error_reaches_every_waiter():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        work.error = RuntimeError("model unavailable")
+        calls = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(run())] == ["model unavailable", "model unavailable"]
+
+
+def test_one_waiter_cancelling_leaves_the_computation_to_the_others():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        leaving = asyncio.create_task(flight.do("key", work))
+        staying = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        work.release.set()
+        return await staying, work.cancelled
+
+    assert asyncio.run(run()) == ("result", False)
+
+
+def test_the_last_waiter_cancelling_cancels_the_computation():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        calls = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        await asyncio.sleep(0)
+        return work.cancelled, len(flight)
+
+    assert asyncio.run(run()) == (True, 0)
+
+
+class DisconnectingRequest:
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def test_a_disconnected_client_cancels_its_request(monkeypatch):
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    async def run():
+        work = Work()
+        with pytest.raises(HTTPException) as exc:
+            await main._cancel_on_disconnect(DisconnectingRequest(), work())
+        await asyncio.sleep(0)
+        return exc.value.status_code, work.cancelled
+
+    assert asyncio.run(run()) == (499, True)
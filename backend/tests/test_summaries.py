@@ -0,0 +1,75 @@
+"""Cached file summaries: keyed by content only, and kept when part of a batch fails."""
+
+import asyncio
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from generator.generate_readme import SYSTEM_PROMPT
+from generator.summaries import FILE_PROMPT_VERSION, generate_readme_from_summaries, heuristic_summary, model_name
+from services.summary_cache import SummaryCache, content_hash
+
+
+class SummarisingClient:
+    """MarkdownModelClient that summarises by echoing a line count; fails on prompts containing `fail_on`."""
+
+    model = "fake"
+
+    def __init__(self, fail_on: str = "") -> None:
+        self.fail_on = fail_on
+        self.calls: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def generate_markdown(self, system_prompt: str, user_prompt: str) -> str:
+        with self._lock:
+            self.calls.append((system_prompt, user_prompt))
+        if self.fail_on and self.fail_on in user_prompt:
+            raise RuntimeError("model unavailable")
+        if system_prompt == SYSTEM_PROMPT:
+            return "# README\n"
+        return f"- {user_prompt.count(chr(10))} lines of code"
+
+    def file_prompts(self) -> List[str]:
+        return [user for system, user in self.calls if system != SYSTEM_PROMPT]
+
+
+def chunk(repo_url: str, path: str, content: str) -> Dict[str, Any]:
+    return {"repo_url": repo_url, "file_path": path, "content": content, "metadata": {"language": "python"}}
+
+
+def run(client: SummarisingClient, repo_url: str, chunks: List[Dict[str, Any]], cache: SummaryCache) -> str:
+    asyncio.run(generate_readme_from_summaries(client, repo_url, chunks, cache))
+    return client.calls[-1][1]
+
+
+def test_summaries_do_not_carry_the_path_or_repository():
+    cache = SummaryCache(":memory:")
+    content = "def handler(event):\n    return event\n"
+    first = SummarisingClient()
+    final = run(first, "https://example.com/a/one", [chunk("https://example.com/a/one", "/tmp/r1/src/api.py", content),
+                                                        chunk("https://example.com/a/one", "/tmp/r1/lib/other.py", "x = 1\n")], cache)
+    assert all("api.py" not in p and "example.com" not in p for p in first.file_prompts())
+    assert "### src/api.py" in final
+
+    # The same content in a fork, under another name: reused from the cache, labelled with its own path
+    second = SummarisingClient()
+    final = run(second, "https://example.com/b/fork", [chunk("https://example.com/b/fork", "/tmp/r2/pkg/routes.py", content),
+                                                          chunk("https://example.com/b/fork", "/tmp/r2/lib/other.py", "x = 1\n")], cache)
+    assert second.file_prompts() == []
+    assert "### pkg/routes.py" in final and "api.py" not in final
+
+
+def test_heuristic_summary_has_no_path():
+    assert heuristic_summary('"""Handlers."""\ndef handler():\n    pass\n').startswith("- 3 lines")
+
+
+def test_fresh_summaries_survive_a_failed_one():
+    cache = SummaryCache(":memory:")
+    client = SummarisingClient(fail_on="BROKEN")
+    contents = ["a = 1\n", "b = 2\n", "c = 3  # BROKEN\n"]
+    chunks = [chunk("https://example.com/a/one", f"/tmp/r/m{i}.py", c) for i, c in enumerate(contents)]
+    with pytest.raises(RuntimeError):
+        run(client, "https://example.com/a/one", chunks, cache)
+    cached = cache.get_many([content_hash(c) for c in contents], model_name(client), FILE_PROMPT_VERSION)
+    assert set(cached) == {content_hash(c) for c in contents[:2]}
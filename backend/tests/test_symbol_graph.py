@@ -0,0 +1,32 @@
+"""Symbol graph edges from Python `from pkg import name` imports."""
+
+import pytest
+
+from parser import symbol_graph
+from parser.symbol_graph import build_symbol_graph
+
+FILES = {
+    "app.py": "from pkg import b\n",
+    "svc.py": "from pkg import helper\n",
+    "pkg/b.py": "def run_b():\n    pass\n",
+    "pkg/core.py": "def core_thing():\n    pass\n",
+}
+
+
+def edges(graph):
+    paths = [f["path"] for f in graph["files"]]
+    return {(paths[src], paths[dst]) for src, dst, _ in graph["edges"]}
+
+
+@pytest.mark.parametrize("tree_sitter", [True, False])
+def test_from_import_falls_back_to_the_package_only_when_no_name_resolves(monkeypatch, tree_sitter):
+    if tree_sitter and not symbol_graph.TS_AVAILABLE:
+        pytest.skip("tree_sitter_languages is not installed")
+    monkeypatch.setattr(symbol_graph, "TS_AVAILABLE", tree_sitter)
+    graph = build_symbol_graph({path: {"language": "python", "content": text} for path, text in FILES.items()})
+    found = edges(graph)
+    # pkg has no __init__: `from pkg import b` is pkg/b.py and nothing else
+    assert ("app.py", "pkg/b.py") in found
+    assert ("app.py", "pkg/core.py") not in found
+    # `helper` is not a module: the package directory is all that is left
+    assert {("svc.py", "pkg/b.py"), ("svc.py", "pkg/core.py")} <= found
@@ -0,0 +1,33 @@
+"""File triage: the data-module heuristic only applies to JS/TS; vendored code by convention or .gitattributes."""
+
+from parser.triage import classify_file
+
+DATA_LINES = b"".join(b'  "key_%d": "value",\n' % i for i in range(60))
+
+
+def test_js_data_module_is_skipped():
+    head = b"export default {\n" + DATA_LINES
+    assert classify_file("src/fixtures.js", head, len(head), []) == "data"
+
+
+def test_python_constant_table_is_kept():
+    head = b"TABLE = {\n" + DATA_LINES + b"}\n"
+    assert classify_file("app/constants.py", head, len(head), []) is None
+
+
+def test_go_fixture_is_kept():
+    head = b"package fixtures\n\nvar names = []string{\n" + b"".join(b'\t"name_%d",\n' % i for i in range(60))
+    assert classify_file("fixtures/names.go", head, len(head), []) is None
+
+
+def test_conventional_vendor_dirs_are_skipped():
+    head = b"def f():\n    return 1\n"
+    assert classify_file("vendor/lib/util.py", head, len(head), []) == "vendored"
+    assert classify_file("web/node_modules/x/index.js", head, len(head), []) == "vendored"
+
+
+def test_external_dir_is_first_party_unless_marked():
+    head = b"def f():\n    return 1\n"
+    assert classify_file("external/client/api.py", head, len(head), []) is None
+    rules = [("external/**", "linguist-vendored", True)]
+    assert classify_file("external/client/api.py", head, len(head), rules) == "vendored"
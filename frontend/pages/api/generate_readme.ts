@@ -2,9 +2,30 @@ import type { NextApiRequest, NextApiResponse } from 'next'
 
 const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
 
+// GET: latest stored README (conditional on If-None-Match), without generating
+async function getStored(req: NextApiRequest, res: NextApiResponse) {
+  const params = new URLSearchParams()
+  for (const key of ['repo_url', 'version']) {
+    const value = req.query[key]
+    if (typeof value === 'string') params.set(key, value)
+  }
+  const headers: Record<string, string> = {}
+  if (req.headers['if-none-match']) headers['If-None-Match'] = String(req.headers['if-none-match'])
+  const resp = await fetch(`${backendUrl}/readme?${params}`, { headers })
+  for (const name of ['etag', 'cache-control']) {
+    const value = resp.headers.get(name)
+    if (value) res.setHeader(name, value)
+  }
+  if (resp.status === 304) return res.status(304).end()
+  const data = await resp.json().catch(() => ({}))
+  if (!resp.ok) return res.status(resp.status).json({ ok: false, error: data.detail || 'README not found' })
+  res.status(200).json(data)
+}
+
 export default async function handler(req: NextApiRequest, res: NextApiResponse) {
-  if (req.method !== 'POST') return res.status(405).json({ ok: false, error: 'Method not allowed' })
+  if (req.method !== 'POST' && req.method !== 'GET') return res.status(405).json({ ok: false, error: 'Method not allowed' })
   try {
+    if (req.method === 'GET') return await getStored(req, res)
     const resp = await fetch(`${backendUrl}/generate_readme`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -8,12 +8,31 @@ export default function Home() {
   const [loading, setLoading] = useState(false)
   const [markdown, setMarkdown] = useState('')
   const [error, setError] = useState('')
+  // Set when the preview shows a stored README rather than a fresh one
+  const [stored, setStored] = useState<{ repoUrl: string; version: number } | null>(null)
+  // Set while the preview shows the extractive draft and the full README is still being written
+  const [draft, setDraft] = useState(false)
 
-  const onGenerate = async (repoUrl: string) => {
+  const onGenerate = async (repoUrl: string, regenerate = false) => {
     setError('')
     setLoading(true)
     setMarkdown('')
+    setStored(null)
+    setDraft(false)
     try {
+      if (!regenerate) {
+        // The browser revalidates with If-None-Match, so a repeat visit costs a 304
+        const storedRes = await fetch(`/api/generate_readme?repo_url=${encodeURIComponent(repoUrl)}`)
+        if (storedRes.ok) {
+          const data = await storedRes.json().catch(() => ({}))
+          if (data.readme) {
+            setMarkdown(data.readme)
+            setStored({ repoUrl, version: data.version })
+            return
+          }
+        }
+      }
+
       const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000';
       const parseRes = await fetch(`${backendUrl}/parse_repo`, {
         method: 'POST',
@@ -23,14 +42,29 @@ export default function Home() {
       const parseJson = await parseRes.json().catch(() => ({}));
       if (!parseRes.ok) throw new Error(parseJson.error || 'Failed to parse repository');
 
-      const genRes = await fetch(`${backendUrl}/generate_readme`, {
+      const generate = (mode: string) => fetch(`${backendUrl}/generate_readme`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ repo_url: repoUrl })
+        body: JSON.stringify({ repo_url: repoUrl, mode })
       });
+      // The draft needs no model call and returns in well under a second; show it until the full README arrives
+      let finished = false
+      generate('draft')
+        .then((res) => (res.ok ? res.json() : null))
+        .then((data) => {
+          if (!finished && data?.readme) {
+            setMarkdown(data.readme)
+            setDraft(true)
+          }
+        })
+        .catch(() => {})
+
+      const genRes = await generate('single');
+      finished = true
       const data = await genRes.json().catch(() => ({}));
       if (!genRes.ok) throw new Error(data.error || 'Failed to generate README');
       setMarkdown(data.readme || '');
+      setDraft(false)
     } catch (e: any) {
       setError(e.message)
     } finally {
@@ -53,6 +87,24 @@ export default function Home() {
 
           <RepoInput loading={loading} onGenerate={onGenerate} />
           {error && <div className="text-red-400 text-sm mt-4">{error}</div>}
+          {draft && loading && (
+            <div className="text-muted text-sm mt-4">Showing a quick draft while the full README is generated…</div>
+          )}
+          {draft && !loading && (
+            <div className="text-muted text-sm mt-4">Showing the quick draft; the full README could not be generated.</div>
+          )}
+          {stored && (
+            <div className="text-muted text-sm mt-4">
+              Showing stored README (version {stored.version}).{' '}
+              <button
+                onClick={() => onGenerate(stored.repoUrl, true)}
+                disabled={loading}
+                className="underline hover:text-white disabled:opacity-50"
+              >
+                Regenerate
+              </button>
+            </div>
+          )}
 
           <MarkdownPreview markdown={markdown} />
         </motion.div>
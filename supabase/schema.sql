@@ -16,13 +16,44 @@ create index if not exists code_chunks_path_idx on public.code_chunks (file_path
 create index if not exists code_chunks_embedding_idx on public.code_chunks using ivfflat (embedding vector_cosine_ops) with (lists = 100);
 
 -- Table: readme_history
+-- One row per generated README version. New rows hold zstd-compressed `content`
+-- (codec 'zstd'), delta-encoded against `base_version` when that is set; rows
+-- from before versioning keep their text in `generated_readme` (codec null).
 create table if not exists public.readme_history (
   id uuid primary key default gen_random_uuid(),
   repo_url text not null,
-  generated_readme text not null,
+  generated_readme text,
   created_at timestamptz not null default now()
 );
+alter table public.readme_history alter column generated_readme drop not null;
+alter table public.readme_history add column if not exists version int;
+alter table public.readme_history add column if not exists codec text;
+alter table public.readme_history add column if not exists base_version int;
+alter table public.readme_history add column if not exists content bytea;
+alter table public.readme_history add column if not exists content_sha256 text;
+alter table public.readme_history add column if not exists context_hash text;
+alter table public.readme_history add column if not exists model text;
+-- Number pre-existing rows per repository in creation order
+update public.readme_history h
+set version = v.version, content_sha256 = encode(sha256(convert_to(h.generated_readme, 'UTF8')), 'hex')
+from (
+  select id, row_number() over (partition by repo_url order by created_at, id) as version
+  from public.readme_history
+  where version is null
+) v
+where h.id = v.id;
+alter table public.readme_history alter column version set not null;
 create index if not exists readme_repo_idx on public.readme_history (repo_url);
+create unique index if not exists readme_history_version_idx on public.readme_history (repo_url, version);
+
+-- Table: repo_symbol_graphs
+-- Per-repository file dependency graph (definitions, import/reference edges and
+-- PageRank centrality per file), replaced on every index; see backend/parser/symbol_graph.py
+create table if not exists public.repo_symbol_graphs (
+  repo_url text primary key,
+  graph jsonb not null,
+  updated_at timestamptz not null default now()
+);
 
 -- Function: match_code_chunks
 create or replace function match_code_chunks (
@@ -55,3 +86,39 @@ as $$
   order by similarity desc
   limit match_count;
 $$;
+
+-- Function: match_code_chunks_with_embeddings
+-- Same as match_code_chunks, also returning the stored embedding so callers can
+-- re-rank for diversity (MMR) without re-embedding the candidates
+create or replace function match_code_chunks_with_embeddings (
+  repo_url_filter text,
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int
+)
+returns table (
+  id uuid,
+  repo_url text,
+  file_path text,
+  content text,
+  metadata jsonb,
+  embedding vector(1536),
+  similarity float
+)
+language sql stable
+as $$
+  select
+    code_chunks.id,
+    code_chunks.repo_url,
+    code_chunks.file_path,
+    code_chunks.content,
+    code_chunks.metadata,
+    code_chunks.embedding,
+    1 - (code_chunks.embedding <=> query_embedding) as similarity
+  from code_chunks
+  where
+    code_chunks.repo_url = repo_url_filter and
+    1 - (code_chunks.embedding <=> query_embedding) > match_threshold
+  order by similarity desc
+  limit match_count;
+$$;